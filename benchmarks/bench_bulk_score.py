@@ -0,0 +1,74 @@
+"""
+Throughput of parallel bulk scoring as the worker count grows.
+
+    python benchmarks/bench_bulk_score.py [--rows 400000] [--workers 1 2 4 8] [--chunk-size 10000]
+
+Writes a synthetic JSONL export to a temporary directory, scores it with
+services.bulk_score at each worker count and reports rows/sec, speedup and
+parallel efficiency relative to one worker, plus peak RSS of the parent and
+of the largest worker.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from services import prediction
+from services.bulk_score import score_file
+
+
+def write_synthetic_cases(path, n, seed=0):
+    rng = np.random.default_rng(seed)
+    dispute_types = prediction.dispute_encoder.classes_.tolist()
+    jurisdictions = prediction.state_encoder.classes_.tolist()
+    with open(path, "w") as f:
+        for i in range(n):
+            f.write(json.dumps({
+                "case_id": f"BENCH_{i}",
+                "claim_amount": round(float(rng.uniform(10_000, 5_000_000)), 2),
+                "delay_days": int(rng.integers(0, 900)),
+                "document_count": int(rng.integers(0, 5)),
+                "dispute_type": dispute_types[rng.integers(len(dispute_types))],
+                "jurisdiction": jurisdictions[rng.integers(len(jurisdictions))],
+            }) + "\n")
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1)))
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=400_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--contributions", choices=["approx", "none"], default="approx")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "cases.jsonl")
+        write_synthetic_cases(input_path, args.rows)
+        print(f"{args.rows} rows, chunk size {args.chunk_size}, {cpus} CPU(s), "
+              f"contributions={args.contributions}")
+        print(f"{'workers':>8} {'rows/s':>10} {'speedup':>8} {'efficiency':>10} "
+              f"{'parent RSS':>11} {'worker RSS':>11}")
+
+        baseline = None
+        for workers in args.workers:
+            summary = score_file(
+                input_path, os.path.join(tmp, f"scores_{workers}.jsonl"),
+                chunk_size=args.chunk_size, contributions=args.contributions,
+                workers=workers, progress=False,
+            )
+            rate = summary["rows_per_second"]
+            baseline = baseline or rate
+            worker_rss = summary["workers_peak_rss_mb"]
+            print(f"{workers:>8} {rate:>10,.0f} {rate / baseline:>7.2f}x {rate / baseline / workers:>9.0%} "
+                  f"{summary['peak_rss_mb']:>8} MB {worker_rss if worker_rss is not None else '-':>8} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Batch conversion wall-clock versus conversion worker count.
+
+    python benchmarks/bench_conversion_pool.py [--files 20] [--pages 3] [--workers 1 2 4]
+    python benchmarks/bench_conversion_pool.py --dir path/to/pdfs --workers 1 2 4
+
+Converts the same batch through ``services.document.convert_batch`` once
+sequentially in this process and once per worker count through a fresh
+ConversionPool, after warming every worker (worker start-up and model
+loading are reported separately). Without ``--dir`` the batch is
+synthetic text PDFs generated with reportlab. The conversion cache is
+disabled so every run converts every file.
+"""
+import os
+import sys
+import time
+import argparse
+
+os.environ["CONVERSION_CACHE_BYTES"] = "0"  # read by config, also in the spawned workers
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def synthetic_pdf(index, pages):
+    from io import BytesIO
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buf = BytesIO()
+    pdf = canvas.Canvas(buf, pagesize=A4)
+    for page in range(pages):
+        pdf.drawString(72, 800, f"Invoice dispute {index}, page {page + 1}")
+        for line in range(40):
+            pdf.drawString(72, 770 - line * 18,
+                           f"Line {line}: invoice INV-{index:04d}-{line:02d} outstanding for {30 + line} days, "
+                           f"amount Rs. {(index + 1) * 1000 + line * 17:,}")
+        pdf.showPage()
+    pdf.save()
+    return buf.getvalue()
+
+
+def load_files(args):
+    if args.dir:
+        names = sorted(n for n in os.listdir(args.dir) if n.lower().endswith(".pdf"))[:args.files]
+        files = []
+        for name in names:
+            with open(os.path.join(args.dir, name), "rb") as f:
+                files.append((f.read(), name))
+        return files
+    return [(synthetic_pdf(i, args.pages), f"case-{i}.pdf") for i in range(args.files)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--dir", default=None, help="benchmark real PDFs from this directory")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--ocr", action="store_true", help="convert with OCR (default: text layer only)")
+    args = parser.parse_args()
+
+    from config import config
+    from services.conversion_pool import ConversionPool
+    from services.document import convert_batch
+
+    files = load_files(args)
+    print(f"{len(files)} files, {sum(len(data) for data, _ in files) / 1e6:.1f} MB, "
+          f"OCR {'on' if args.ocr else 'off'}, {os.cpu_count()} CPUs")
+
+    config.CONVERSION_WORKERS = 0
+    convert_batch(files[:1], args.ocr)  # load the in-process converter
+    start = time.perf_counter()
+    results = convert_batch(files, args.ocr)
+    sequential = time.perf_counter() - start
+    failed = sum(not r["success"] for r in results)
+    print(f"{'sequential':>12}: {sequential:7.2f} s{f'  ({failed} failed)' if failed else ''}")
+
+    for workers in args.workers:
+        pool = ConversionPool(workers, config.CONVERSION_TIMEOUT_SECONDS)
+        try:
+            start = time.perf_counter()
+            pool.map(files[:1] * workers, args.ocr, "markdown")  # spawn and warm every worker
+            warm = time.perf_counter() - start
+            start = time.perf_counter()
+            results = pool.map(files, args.ocr, "markdown")
+            elapsed = time.perf_counter() - start
+        finally:
+            pool.shutdown()
+        failed = sum(not r["success"] for r in results)
+        print(f"{workers:>4} workers: {elapsed:7.2f} s  speedup {sequential / elapsed:4.2f}x  "
+              f"(warm-up {warm:.1f} s){f'  ({failed} failed)' if failed else ''}")
+
+
+if __name__ == "__main__":
+    main()
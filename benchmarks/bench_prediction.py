@@ -0,0 +1,236 @@
+"""
+Prediction hot-path benchmark with a stored JSON baseline.
+
+    python benchmarks/bench_prediction.py --save benchmarks/prediction_baseline.json
+    python benchmarks/bench_prediction.py --compare benchmarks/prediction_baseline.json [--tolerance 0.25]
+
+Measures single ``run_xgb_prediction`` latency (full response, cache
+misses), ``run_xgb_prediction_batch`` throughput at 1 / 100 / 10k rows
+(``--contributions approx`` by default, as for bulk runs; exact SHAP costs
+~3 ms per row on one core), cold start (importing services.prediction in a fresh interpreter, and one
+model bundle load) and peak RSS. Inputs are synthetic but deterministic:
+a seeded generator over the model's dispute types and jurisdictions (the
+dataset's categories) and the dataset's value ranges.
+
+``--compare`` re-runs the suite and exits with status 1 when any metric is
+worse than the baseline by more than ``--tolerance`` (a fraction), so it
+can gate model or dependency upgrades. Baselines are machine-specific:
+record one on the machine that runs the comparison.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import platform
+import resource
+import subprocess
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BATCH_SIZES = (1, 100, 10_000)
+
+# Run in a fresh interpreter so imports and artifact loading are really cold.
+_COLD_START = """
+import json, resource, sys, time
+sys.path.insert(0, {base_dir!r})
+start = time.perf_counter()
+from services import prediction
+import_s = time.perf_counter() - start
+start = time.perf_counter()
+bundle = prediction.model_registry.load_active() or prediction._load_legacy_bundle()
+load_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({{"import_s": import_s, "load_ms": load_ms,
+                  "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+
+def synthetic_cases(n, dispute_types, jurisdictions, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "claim_amount": round(float(rng.uniform(10_000, 5_000_000)), 2),
+            "delay_days": int(rng.integers(0, 900)),
+            "document_count": int(rng.integers(0, 5)),
+            "dispute_type": dispute_types[rng.integers(len(dispute_types))],
+            "jurisdiction": jurisdictions[rng.integers(len(jurisdictions))],
+        }
+        for _ in range(n)
+    ]
+
+
+def _metric(value, unit, better):
+    return {"value": round(float(value), 3), "unit": unit, "better": better}
+
+
+def bench_single(prediction, cases):
+    """Per-call latency of run_xgb_prediction; every case is distinct, so all are cache misses."""
+    prediction.run_xgb_prediction(**cases[0])  # warm-up
+    timings = []
+    for case in cases[1:]:
+        start = time.perf_counter()
+        prediction.run_xgb_prediction(**case)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "single_p50_ms": _metric(np.percentile(timings, 50), "ms", "lower"),
+        "single_p95_ms": _metric(np.percentile(timings, 95), "ms", "lower"),
+    }
+
+
+def bench_batch(prediction, cases, repeat, contributions):
+    results = {}
+    for size in BATCH_SIZES:
+        batch = cases[:size]
+        prediction.run_xgb_prediction_batch(batch, contributions)
+        best = min(_timed(prediction.run_xgb_prediction_batch, batch, contributions) for _ in range(repeat))
+        results[f"batch_{size}_rows_per_s"] = _metric(size / best, "rows/s", "higher")
+    return results
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def bench_cold_start():
+    out = subprocess.run(
+        [sys.executable, "-c", _COLD_START.format(base_dir=BASE_DIR)],
+        capture_output=True, text=True, check=True, cwd=BASE_DIR,
+    )
+    cold = json.loads(out.stdout.strip().splitlines()[-1])
+    return {
+        "cold_import_s": _metric(cold["import_s"], "s", "lower"),
+        "model_load_ms": _metric(cold["load_ms"], "ms", "lower"),
+        "cold_peak_rss_mb": _metric(cold["peak_rss_mb"], "MB", "lower"),
+    }
+
+
+def run_suite(single_calls=200, repeat=5, contributions="approx", seed=0):
+    """
+    Run every benchmark.
+
+    Returns:
+        dict: {"meta": environment and model, "metrics": {name: {value, unit, better}}}
+    """
+    import xgboost
+    from services import prediction
+
+    bundle = prediction.get_active_bundle()
+    cases = synthetic_cases(
+        max(max(BATCH_SIZES), single_calls + 1),
+        bundle.dispute_encoder.classes_.tolist(), bundle.state_encoder.classes_.tolist(), seed,
+    )
+
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep benchmark calls out of the real audit log.
+        audit_file = prediction.audit_logger.log_file
+        prediction.audit_logger.log_file = os.path.join(tmp, "prediction_audit.jsonl")
+        try:
+            with contextlib.redirect_stdout(open(os.devnull, "w")):  # per-call log lines
+                metrics.update(bench_single(prediction, cases[:single_calls + 1]))
+        finally:
+            prediction.audit_logger.log_file = audit_file
+    metrics.update(bench_batch(prediction, cases, repeat, contributions))
+    metrics.update(bench_cold_start())
+    metrics["peak_rss_mb"] = _metric(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, "MB", "lower")
+
+    return {
+        "meta": {
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "xgboost": xgboost.__version__,
+            "numpy": np.__version__,
+            "cpus": os.cpu_count(),
+            "machine": platform.machine(),
+            "model_version": bundle.version,
+            "model_fingerprint": bundle.fingerprint,
+            "backend": prediction.PREDICTION_BACKEND,
+            "batch_contributions": contributions,
+            "seed": seed,
+        },
+        "metrics": metrics,
+    }
+
+
+def compare(baseline, current, tolerance):
+    """
+    Metric-by-metric comparison against a baseline.
+
+    Args:
+        tolerance (float): allowed relative slowdown, e.g. 0.25 for 25%.
+
+    Returns:
+        list[dict]: one row per metric present in both runs, with the
+        relative ``change`` (positive = worse) and ``regressed`` flag.
+    """
+    rows = []
+    for name, base in baseline["metrics"].items():
+        if name not in current["metrics"] or not base["value"]:
+            continue
+        value = current["metrics"][name]["value"]
+        change = (value - base["value"]) / base["value"]
+        if base["better"] == "higher":
+            change = -change
+        rows.append({
+            "metric": name,
+            "baseline": base["value"],
+            "current": value,
+            "unit": base["unit"],
+            "change": round(change, 4),
+            "regressed": change > tolerance,
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--save", metavar="PATH", help="write the results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative slowdown before a metric is flagged (default 0.25)")
+    parser.add_argument("--single-calls", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--contributions", choices=["exact", "approx", "none"], default="approx",
+                        help="contribution mode of the batch benchmarks")
+    args = parser.parse_args(argv)
+
+    results = run_suite(single_calls=args.single_calls, repeat=args.repeat, contributions=args.contributions)
+    for name, metric in results["metrics"].items():
+        print(f"{name:<26} {metric['value']:>12,.3f} {metric['unit']}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        changed = {k: (v, results["meta"].get(k)) for k, v in baseline["meta"].items()
+                   if k not in ("recorded_at",) and results["meta"].get(k) != v}
+        for key, (old, new) in changed.items():
+            print(f"note: {key} differs from the baseline ({old} -> {new})")
+
+        rows = compare(baseline, results, args.tolerance)
+        print(f"\n{'metric':<26} {'baseline':>12} {'current':>12} {'change':>8}")
+        for row in rows:
+            flag = "  REGRESSION" if row["regressed"] else ""
+            print(f"{row['metric']:<26} {row['baseline']:>12,.3f} {row['current']:>12,.3f} "
+                  f"{row['change']:>+7.1%}{flag}")
+        regressions = [row["metric"] for row in rows if row["regressed"]]
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"\nNo regressions beyond {args.tolerance:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
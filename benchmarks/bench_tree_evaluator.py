@@ -0,0 +1,81 @@
+"""
+Parity and speed of the NumPy tree evaluator against the native booster.
+
+    python benchmarks/bench_tree_evaluator.py [--rows 1 100 10000] [--repeat 20]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from services import prediction
+from services.tree_evaluator import CompiledForest
+
+
+def synthetic_matrix(n, seed=0):
+    rng = np.random.default_rng(seed)
+    document_count = rng.integers(0, 5, n)
+    return np.column_stack([
+        rng.uniform(10_000, 5_000_000, n),
+        rng.integers(0, 900, n),
+        document_count,
+        document_count / 4,
+        rng.integers(0, len(prediction.dispute_encoder.classes_), n),
+        rng.integers(0, len(prediction.state_encoder.classes_), n),
+    ]).astype(np.float32)
+
+
+def best_of(fn, repeat):
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 100, 10_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    booster = prediction.xgb_model.get_booster()
+    start = time.perf_counter()
+    forest = CompiledForest.from_booster(booster)
+    print(f"compile: {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"({forest.n_trees} trees, max depth {forest.max_depth})")
+
+    X = synthetic_matrix(max(args.rows))
+    dmat = xgb.DMatrix(X, feature_names=prediction.FEATURES)
+    margin, contribs = forest.predict_margin(X, return_contribs=True)
+    print(f"parity: max |margin diff| = "
+          f"{np.abs(margin - booster.predict(dmat, output_margin=True)).max():.2e}, "
+          f"max |contrib diff| = "
+          f"{np.abs(contribs - booster.predict(dmat, pred_contribs=True, approx_contribs=True)).max():.2e}")
+
+    print(f"{'rows':>8} {'predict_proba(df)':>18} {'inplace_predict':>16} {'numpy':>10} "
+          f"{'approx_contribs':>16} {'numpy+contribs':>15}   (ms per call)")
+    for n in args.rows:
+        Xn = X[:n]
+        frame = pd.DataFrame(Xn, columns=prediction.FEATURES)
+        timings = [
+            best_of(lambda: prediction.xgb_model.predict_proba(frame), args.repeat),
+            best_of(lambda: booster.inplace_predict(Xn), args.repeat),
+            best_of(lambda: forest.predict_proba(Xn), args.repeat),
+            best_of(lambda: booster.predict(xgb.DMatrix(Xn, feature_names=prediction.FEATURES),
+                                            pred_contribs=True, approx_contribs=True), args.repeat),
+            best_of(lambda: forest.predict_margin(Xn, return_contribs=True), args.repeat),
+        ]
+        print(f"{n:>8} " + " ".join(f"{t * 1000:>{w}.3f}" for t, w in zip(timings, (18, 16, 10, 16, 15))))
+
+
+if __name__ == "__main__":
+    main()
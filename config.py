@@ -1,3 +1,4 @@
+import os
 from typing import List
 from dataclasses import dataclass, field
 
@@ -13,6 +14,27 @@ class AppConfig:
     MAX_FILE_SIZE: int = 20_971_520  # 20 MB
     UPLOAD_FOLDER: str = "uploads"
     RESULT_FOLDER: str = "results"
+    # Uploads up to this size are converted from memory; larger ones via a temp file
+    MAX_STREAM_BYTES: int = 16_777_216  # 16 MB
+    UPLOAD_MAX_AGE_SECONDS: int = 3600  # the janitor deletes older files in UPLOAD_FOLDER
+    UPLOAD_JANITOR_INTERVAL: int = 600
+    # Disk budget of converted documents under RESULT_FOLDER/conversion_cache (0 disables)
+    CONVERSION_CACHE_BYTES: int = int(os.environ.get("CONVERSION_CACHE_BYTES", 1_073_741_824))  # 1 GB
+    # Worker processes converting /api/convert/batch files in parallel (0 = in the
+    # request thread). Each worker loads its own Docling models.
+    CONVERSION_WORKERS: int = int(os.environ.get("CONVERSION_WORKERS", min(4, os.cpu_count() or 1)))
+    CONVERSION_TIMEOUT_SECONDS: int = 600  # per file in a batch
+    # Asynchronous conversion jobs (services/jobs.py), queued in RESULT_FOLDER/jobs/
+    JOB_WORKERS: int = int(os.environ.get("JOB_WORKERS", 0))  # processes started by the web app (0 = run `python -m services.jobs worker`)
+    JOB_PAGE_CHUNK: int = 10  # PDF pages converted between progress updates
+    JOB_LEASE_SECONDS: int = 900  # a running job without progress for this long is retried
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETENTION_SECONDS: int = 7 * 86400  # finished jobs and their files are deleted after this
+    MAX_PREDICT_BATCH: int = 50_000  # cases per /api/predict/batch request
+    MAX_SENSITIVITY_GRID: int = 10_000  # points per /api/predict/sensitivity surface
+    MAX_SIMILAR_CASES: int = 100  # k per /api/similar-cases request
+    # Required in X-Admin-Token for /api/admin/*; when unset only localhost may call them
+    ADMIN_TOKEN: str = os.environ.get("ADMIN_TOKEN", "")
 
 
 config = AppConfig()
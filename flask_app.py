@@ -1,13 +1,12 @@
 import os
 import json
-import yaml
 import uuid
 from io import BytesIO
 from pathlib import Path
 from typing import Dict, List
 from dataclasses import dataclass, field
 
-from flask import Flask, request, jsonify, render_template, send_file, abort, make_response
+from flask import Flask, Response, request, jsonify, render_template, send_file, abort, make_response
 from datetime import datetime
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
@@ -22,11 +21,32 @@ from textprocessor import TextProcessor
 from config import config
 from services.prediction import (
     run_xgb_prediction,
+    run_xgb_prediction_batch,
+    BATCH_CONTRIBUTION_MODES,
+    UNKNOWN_POLICIES,
+    prediction_cache_stats,
+    latency_stats,
+    latency_registry,
+    drift_report,
+    drift_monitor,
+    reload_model,
+    sensitivity_surface,
+    find_similar_cases,
+    active_model_info,
     generate_settlement_draft_text,
     dispute_types,
     jurisdictions,
 )
-from services.document import convert_document
+from services.document import (
+    convert_document,
+    convert_batch,
+    iter_convert_batch,
+    conversion_cache_stats,
+    format_output,
+    start_conversion_pool,
+    start_upload_janitor,
+)
+from services.jobs import JobRunner, JobStore
 from services.negotiation_engine import NegotiationSessionManager
 
 negotiation_manager = NegotiationSessionManager()
@@ -48,24 +68,36 @@ os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(config.RESULT_FOLDER, exist_ok=True)
 
 
+def start_background_services():
+    """
+    Start the upload janitor, spawn the batch conversion pool and the
+    JOB_WORKERS conversion job workers.
+
+    Call this once in the process that serves requests (see ``__main__``
+    below; under a WSGI server, from its post-fork hook), never at import:
+    spawned pool workers re-import the main module, and a pool started while
+    a worker is bootstrapping kills it. Without this call the pool is
+    spawned on the first batch instead, and conversion jobs are only worked
+    by ``python -m services.jobs worker``.
+    """
+    start_upload_janitor()
+    start_conversion_pool()
+    JobRunner().start()  # no-op with JOB_WORKERS=0
+
+
+# Asynchronous conversion jobs: the queue lives in RESULT_FOLDER/jobs/ and is
+# worked by `python -m services.jobs worker` (or JOB_WORKERS processes started
+# by start_background_services), outside the request threads.
+_job_store = None
+
+
+def get_job_store():
+    """The job queue, opened (and created on disk) on first use rather than at import."""
+    global _job_store
+    if _job_store is None:
+        _job_store = JobStore()
+    return _job_store
 
-# Text extraction process
-def format_output(result, output_format: str):
-    """Return (content_string, mimetype, extension)."""
-    fmt = output_format.lower()
-    if fmt == "markdown":
-        content = result.document.export_to_markdown()
-        return content, "text/markdown", "md"
-    elif fmt == "json":
-        data = result.document.export_to_dict()
-        content = json.dumps(data, indent=2, default=str)
-        return content, "application/json", "json"
-    elif fmt == "yaml":
-        data = result.document.export_to_dict()
-        content = yaml.safe_dump(data, default_flow_style=False)
-        return content, "text/yaml", "yaml"
-    else:
-        raise ValueError(f"Unsupported output format: {fmt}")
 
 
 # ---------------------------------------------------------------------------
@@ -163,8 +195,12 @@ def api_convert_batch():
         files[]         – one or more documents to convert (required)
         output_format   – markdown | json | yaml  (default: markdown)
         use_ocr         – true | false             (default: true)
+        stream          – true | false             (default: false)
 
-    Returns JSON with results for each file.
+    Returns JSON with results for each file. With stream=true (form field
+    or query parameter) the response is NDJSON instead: one line per file
+    as soon as it is converted (with its "index" in the upload, so lines
+    may arrive out of order), then a summary line {"done", "total", "failed"}.
     """
     files = request.files.getlist("files[]")
     if not files or all(f.filename == "" for f in files):
@@ -175,8 +211,10 @@ def api_convert_batch():
         return jsonify({"error": f"Unsupported output format: {output_format}"}), 400
 
     use_ocr = request.form.get("use_ocr", "true").lower() in ("true", "1", "yes")
+    stream = request.values.get("stream", "false").lower() in ("true", "1", "yes")
 
     results = []
+    to_convert = []  # (position in results, file bytes, filename)
     for uploaded in files:
         if uploaded.filename == "":
             continue
@@ -190,28 +228,120 @@ def api_convert_batch():
             })
             continue
 
-        try:
-            file_bytes = uploaded.read()
-            result = convert_document(file_bytes, uploaded.filename, use_ocr)
-            content, mimetype, out_ext = format_output(result, output_format)
+        to_convert.append((len(results), uploaded.read(), uploaded.filename))
+        results.append(None)
 
-            results.append({
-                "original_filename": uploaded.filename,
-                "filename": f"{uploaded.filename.rsplit('.', 1)[0]}.{out_ext}",
+    def batch_entry(filename, outcome):
+        if outcome["success"]:
+            return {
+                "original_filename": filename,
+                "filename": f"{filename.rsplit('.', 1)[0]}.{outcome['ext']}",
                 "format": output_format,
-                "content": content if isinstance(content, str) else json.loads(content),
+                "content": outcome["content"],
                 "success": True,
-            })
-        except Exception as e:
-            results.append({
-                "original_filename": uploaded.filename,
-                "success": False,
-                "error": str(e),
-            })
+            }
+        return {
+            "original_filename": filename,
+            "success": False,
+            "error": outcome["error"],
+        }
+
+    items = [(data, name) for _, data, name in to_convert]
+    if stream:
+        rejected = [(position, entry) for position, entry in enumerate(results) if entry is not None]
+
+        def generate():
+            # Only the entry being sent is held; each output is dropped once written.
+            failed = len(rejected)
+            for position, entry in rejected:
+                yield json.dumps({"index": position, **entry}) + "\n"
+            for i, outcome in iter_convert_batch(items, use_ocr, output_format):
+                position, _, filename = to_convert[i]
+                failed += not outcome["success"]
+                yield json.dumps({"index": position, **batch_entry(filename, outcome)}) + "\n"
+            yield json.dumps({"done": True, "total": len(results), "failed": failed}) + "\n"
+
+        # No Content-Length, so the body goes out with chunked transfer encoding.
+        return Response(generate(), mimetype="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+    # Converted in parallel by the conversion pool, returned in upload order
+    converted = convert_batch(items, use_ocr, output_format)
+    for (position, _, filename), outcome in zip(to_convert, converted):
+        results[position] = batch_entry(filename, outcome)
 
     return jsonify({"results": results, "total": len(results)})
 
 
+@app.route("/api/jobs/convert", methods=["POST"])
+def api_jobs_convert():
+    """
+    Queue a document conversion and return immediately.
+
+    Form fields / multipart:
+        file            – the document to convert (required)
+        output_format   – markdown | json | yaml  (default: markdown)
+        use_ocr         – true | false             (default: true)
+
+    Returns 202 with the job id; poll GET /api/jobs/<id> and fetch the
+    output from GET /api/jobs/<id>/result once its status is "done".
+    """
+    if "file" not in request.files:
+        return jsonify({"error": "No file provided"}), 400
+
+    uploaded = request.files["file"]
+    if uploaded.filename == "":
+        return jsonify({"error": "Empty filename"}), 400
+
+    ext = uploaded.filename.rsplit(".", 1)[-1].lower() if "." in uploaded.filename else ""
+    if ext not in config.SUPPORTED_EXTENSIONS:
+        return jsonify({"error": f"Unsupported file type: .{ext}"}), 400
+
+    output_format = request.form.get("output_format", "markdown").lower()
+    if output_format not in config.OUTPUT_FORMATS:
+        return jsonify({"error": f"Unsupported output format: {output_format}"}), 400
+
+    use_ocr = request.form.get("use_ocr", "true").lower() in ("true", "1", "yes")
+
+    job = get_job_store().submit(uploaded.read(), uploaded.filename, use_ocr, output_format)
+    return jsonify({
+        "success": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/api/jobs/{job['id']}",
+        "result_url": f"/api/jobs/{job['id']}/result",
+    }), 202
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def api_job_status(job_id):
+    """Status and progress (pages done / total) of a conversion job."""
+    job = get_job_store().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if job["status"] == "done":
+        job["result_url"] = f"/api/jobs/{job_id}/result"
+    return jsonify({"success": True, "job": job})
+
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def api_job_result(job_id):
+    """Download the output of a finished conversion job (409 while it is not done)."""
+    job = get_job_store().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    result = get_job_store().result(job_id)
+    if result is None:
+        return jsonify({"error": f"Job is {job['status']}", "job": job}), 409
+    path, mimetype, download_name = result
+    return send_file(path, mimetype=mimetype, as_attachment=True, download_name=download_name)
+
+
+@app.route("/api/convert/cache", methods=["GET"])
+def api_convert_cache():
+    """Hit rate, size and input bytes saved by the document conversion cache (all processes)."""
+    return jsonify({"success": True, "cache": conversion_cache_stats()})
+
+
 @app.route("/api/formats", methods=["GET"])
 def api_formats():
     """Return supported input extensions and output formats."""
@@ -546,7 +676,18 @@ def api_extract_fields():
 
 @app.route("/api/predict", methods=["POST"])
 def api_predict():
-    """Run XGBoost prediction on user-edited fields."""
+    """
+    Run XGBoost prediction on user-edited fields.
+
+    ``"debug": true`` in the body (or ``?debug=1``) attaches per-stage
+    timings of this call as ``timings_ms``. ``include`` (body list/string or
+    ``?include=a,b``) limits the optional sections to compute and return:
+    feature_contribution, deep_analysis, negotiation_strategy,
+    legal_argumentation. Without it the full response is returned.
+    ``unknown_policy`` (reject | reserved | nearest) overrides how an unseen
+    dispute_type / jurisdiction is encoded; ``category_encoding`` in the
+    response reports the policy applied.
+    """
     data = request.get_json()
     if not data:
         return jsonify({"error": "No data provided"}), 400
@@ -557,13 +698,232 @@ def api_predict():
         document_count = int(data["document_count"])
         dt = data["dispute_type"]
         jur = data["jurisdiction"]
+        debug = bool(data.get("debug")) or request.args.get("debug") == "1"
+        include = data.get("include", request.args.get("include"))
+
+        result = run_xgb_prediction(
+            claim_amount, delay_days, document_count, dt, jur, debug_timings=debug, include=include,
+            unknown_policy=data.get("unknown_policy"),
+        )
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 400
 
-        result = run_xgb_prediction(claim_amount, delay_days, document_count, dt, jur)
+
+@app.route("/api/score", methods=["POST"])
+def api_score():
+    """
+    Lightweight scoring: probability, decision, priority and settlement range
+    only. Skips SHAP and all narrative sections; still audit-logged.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+
+    try:
+        result = run_xgb_prediction(
+            int(data["claim_amount"]),
+            int(data["delay_days"]),
+            int(data["document_count"]),
+            data["dispute_type"],
+            data["jurisdiction"],
+            include=(),
+        )
         return jsonify(result)
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 400
 
 
+@app.route("/api/similar-cases", methods=["POST"])
+def api_similar_cases():
+    """
+    The k most similar historical cases (same dispute_type and jurisdiction,
+    closest claim amount / delay / documents) with outcome and settlement
+    ratio stats.
+
+    JSON body: claim_amount, delay_days, document_count, dispute_type,
+    jurisdiction, k (default 10, max MAX_SIMILAR_CASES).
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+
+    try:
+        k = int(data.get("k", 10))
+        if k > config.MAX_SIMILAR_CASES:
+            return jsonify({"error": f"k too large (max {config.MAX_SIMILAR_CASES})"}), 400
+        result = find_similar_cases(
+            data["claim_amount"], data["delay_days"], data["document_count"],
+            data["dispute_type"], data["jurisdiction"], k=k,
+        )
+        return jsonify({"success": True, **result})
+    except RuntimeError as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+
+@app.route("/api/predict/batch", methods=["POST"])
+def api_predict_batch():
+    """
+    Score a portfolio of cases in one vectorized model call.
+
+    JSON body:
+        cases           – list of {claim_amount, delay_days, document_count,
+                          dispute_type, jurisdiction} (required)
+        contributions   – exact | approx | none  (default: exact)
+        unknown_policy  – reject | reserved | nearest  (default: reject)
+
+    Returns per-case results in input order; a case that fails validation
+    or encoding is reported with success=false without failing the batch.
+    """
+    data = request.get_json()
+    if not data or not isinstance(data.get("cases"), list) or not data["cases"]:
+        return jsonify({"error": "No cases provided"}), 400
+
+    cases = data["cases"]
+    if len(cases) > config.MAX_PREDICT_BATCH:
+        return jsonify({"error": f"Batch too large: {len(cases)} cases (max {config.MAX_PREDICT_BATCH})"}), 400
+
+    contributions = str(data.get("contributions", "exact")).lower()
+    if contributions not in BATCH_CONTRIBUTION_MODES:
+        return jsonify({"error": f"Unsupported contributions mode: {contributions}"}), 400
+    unknown_policy = str(data.get("unknown_policy", "reject")).lower()
+    if unknown_policy not in UNKNOWN_POLICIES:
+        return jsonify({"error": f"Unsupported unknown-category policy: {unknown_policy}"}), 400
+
+    try:
+        results = run_xgb_prediction_batch(cases, contributions=contributions, unknown_policy=unknown_policy)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    failed = sum(1 for r in results if not r["success"])
+    return jsonify({
+        "success": True, "results": results, "total": len(results), "failed": failed,
+        "unknown_policy": unknown_policy,
+    })
+
+
+@app.route("/api/predict/cache", methods=["GET"])
+def api_predict_cache():
+    """Return prediction cache counters (hits, misses, evictions) and model version."""
+    return jsonify({"success": True, "cache": prediction_cache_stats()})
+
+
+@app.route("/api/predict/metrics", methods=["GET"])
+def api_predict_metrics():
+    """
+    Per-stage latency of /api/predict: count, mean, p50/p95/p99, min and max
+    in milliseconds for encode, build_features, predict_proba, pred_contribs,
+    deep_analysis, negotiation_strategy, legal_argumentation, audit_write and
+    total (total_cached for cache hits). ``?reset=1`` clears the histograms
+    after reading (admin only).
+    """
+    stages = latency_stats()
+    if request.args.get("reset") == "1":
+        if not _admin_allowed():
+            return jsonify({"error": "Forbidden"}), 403
+        latency_registry.reset()
+    return jsonify({"success": True, "stages": stages})
+
+
+@app.route("/api/predict/drift", methods=["GET"])
+def api_predict_drift():
+    """
+    Drift of live /api/predict traffic against the training data: PSI (and
+    binned KS for numeric fields) per input and for the predicted
+    probability, read incrementally from the audit log. Counts are cleared
+    with POST /api/admin/drift/reset.
+    """
+    if "reset" in request.args:
+        return jsonify({"error": "Reset moved to POST /api/admin/drift/reset"}), 400
+    try:
+        report = drift_report()
+    except RuntimeError as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+    return jsonify({"success": True, "drift": report})
+
+
+@app.route("/api/predict/sensitivity", methods=["POST"])
+def api_predict_sensitivity():
+    """
+    What-if probability surface around one case.
+
+    JSON body:
+        case    – {claim_amount, delay_days, document_count, dispute_type, jurisdiction} (required)
+        ranges  – {delay_days | document_count | claim_amount: [values] or
+                   {start, stop, step}} (at least one)
+
+    The whole grid is scored in one vectorized model call; no per-point
+    explanations or audit entries. Grid size is capped by MAX_SENSITIVITY_GRID.
+    """
+    data = request.get_json()
+    if not data or not isinstance(data.get("case"), dict) or not isinstance(data.get("ranges"), dict):
+        return jsonify({"error": "Both case and ranges are required"}), 400
+
+    try:
+        return jsonify(sensitivity_surface(data["case"], data["ranges"], max_points=config.MAX_SENSITIVITY_GRID))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+def _admin_allowed():
+    """Admin calls need X-Admin-Token when ADMIN_TOKEN is set, else must come from localhost."""
+    if config.ADMIN_TOKEN:
+        return request.headers.get("X-Admin-Token") == config.ADMIN_TOKEN
+    return request.remote_addr in ("127.0.0.1", "::1")
+
+
+@app.route("/api/admin/model", methods=["GET"])
+def api_admin_model():
+    """Return the active model version, threshold and registered versions."""
+    if not _admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify({"success": True, "model": active_model_info()})
+
+
+@app.route("/api/admin/model/reload", methods=["POST"])
+def api_admin_model_reload():
+    """
+    Hot-swap the prediction model.
+
+    JSON body (optional):
+        version – registered version to activate; omitted reloads whatever
+                  model/registry/active.json points at
+
+    In-flight predictions finish on the previous version.
+    """
+    if not _admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+
+    data = request.get_json(silent=True) or {}
+    try:
+        info = reload_model(data.get("version"))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+    return jsonify({"success": True, "model": info})
+
+
+@app.route("/api/admin/drift/reset", methods=["POST"])
+def api_admin_drift_reset():
+    """
+    Clear the drift counts; counting restarts from the current end of the
+    audit log. Returns the report as it stood just before the reset.
+    """
+    if not _admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        report = drift_report()
+    except RuntimeError as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+    drift_monitor.reset()
+    return jsonify({"success": True, "drift": report})
+
+
 # @app.route("/api/generate-draft", methods=["POST"])
 # def api_generate_draft():
 #     """Generate settlement draft via LLM + rule-based template."""
@@ -963,4 +1323,8 @@ def transcribe_voice():
 # ---------------------------------------------------------------------------
 
 if __name__ == "__main__":
+    # With debug=True the reloader runs this file twice: a watcher process and
+    # the child that serves (WERKZEUG_RUN_MAIN=true). Start services in the child only.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_services()
     app.run(debug=True, host="0.0.0.0", port=5000)
@@ -1,8 +1,6 @@
 from flask import Flask, render_template, request, jsonify, make_response
 import json
 import pandas as pd
-from sklearn.preprocessing import LabelEncoder
-from xgboost import XGBClassifier
 import numpy as np
 from io import BytesIO
 from reportlab.lib.pagesizes import letter, A4
@@ -16,61 +14,17 @@ from datetime import datetime
 
 app = Flask(__name__)
 
-# ---------------- LOAD DATA & TRAIN MODEL ----------------
-with open("msme_synthetic_cases.json") as f:
-    data = json.load(f)
+# ---------------- LOAD MODEL ----------------
+# Artifacts are produced offline (python -m services.train); never train at import.
+model = joblib.load("xgb_model.pkl")
+dispute_encoder = joblib.load("dispute_encoder.pkl")
+state_encoder = joblib.load("state_encoder.pkl")
 
-df = pd.DataFrame(data)
+print("Model and encoders loaded successfully.")
 
-# Encode categorical data
-dispute_encoder = LabelEncoder()
-state_encoder = LabelEncoder()
-
-df["dispute_type_enc"] = dispute_encoder.fit_transform(df["dispute_type"])
-df["jurisdiction_enc"] = state_encoder.fit_transform(df["jurisdiction"])
-
-FEATURES = [
-    "claim_amount",
-    "delay_days",
-    "document_count",
-    "document_completeness_score",
-    "dispute_type_enc",
-    "jurisdiction_enc"
-]
-
-X = df[FEATURES]
-y = df["is_settlement"]
-
-# Train model
-model = XGBClassifier(
-    n_estimators=300,
-    max_depth=6,
-    learning_rate=0.05,
-    subsample=0.9,
-    colsample_bytree=0.9,
-    eval_metric="logloss",
-    random_state=42
-)
-model.fit(X, y)
-joblib.dump(model, "xgb_model.pkl")
-joblib.dump(dispute_encoder, "dispute_encoder.pkl")
-joblib.dump(state_encoder, "state_encoder.pkl")
-
-# model = joblib.load("xgb_model.pkl")
-# dispute_encoder = joblib.load("dispute_encoder.pkl")
-# state_encoder = joblib.load("state_encoder.pkl")
-
-# print("Model and encoders loaded successfully.")
-
-# Load data for dropdowns
-with open("msme_synthetic_cases.json") as f:
-    data = json.load(f)
-
-df = pd.DataFrame(data)
-
-# Get unique values for dropdowns
-dispute_types = sorted(df["dispute_type"].unique())
-jurisdictions = sorted(df["jurisdiction"].unique())
+# Dropdown values come straight from the fitted encoders
+dispute_types = sorted(dispute_encoder.classes_.tolist())
+jurisdictions = sorted(state_encoder.classes_.tolist())
 
 # Define features
 FEATURES = [
@@ -0,0 +1,417 @@
+"""
+Streaming bulk scoring for large case exports, outside Flask.
+
+    python -m services.bulk_score cases.jsonl scores.jsonl
+    python -m services.bulk_score cases.csv scores.csv --chunk-size 20000
+    python -m services.bulk_score cases.jsonl scores.jsonl --resume
+    python -m services.bulk_score cases.jsonl scores.jsonl --workers 8
+    python -m services.bulk_score cases.jsonl scores.jsonl --triage
+
+The input is read in fixed-size chunks of lines; each chunk is encoded and
+scored with one vectorized model call and its results are appended to the
+output before the next chunk is read, so memory stays bounded by the chunk
+size regardless of file size. After every chunk a checkpoint
+(``<output>.checkpoint.json``) records the input byte offset reached and
+the output size; ``--resume`` truncates the output back to that size and
+continues from that offset. ``--start-offset`` starts from an explicit
+input byte offset instead (it must point at the start of a line).
+
+``--triage`` only decides which side of the threshold each case is on,
+exiting early for cases far from it (services/triage.py); ``probability``
+is then taken from the partial margin and ``trees_used`` is added.
+
+Inputs are JSONL (one case object per line) or CSV with a header row, one
+record per line. Each case needs claim_amount, delay_days, document_count,
+dispute_type and jurisdiction; a ``case_id`` column is passed through.
+"""
+import gc
+import io
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.prediction import (
+    get_active_bundle,
+    encode_cases,
+    score_matrix,
+    get_triage_scorer,
+    _settlement_range,
+    _sigmoid,
+    FEATURES,
+)
+from services.profiling import peak_rss_mb
+
+FORMATS = ("jsonl", "csv")
+CONTRIBUTION_MODES = ("approx", "none")
+OUTPUT_FIELDS = [
+    "row", "case_id", "probability", "prediction", "settle_min", "settle_max", "top_feature", "error",
+]
+TRIAGE_OUTPUT_FIELDS = OUTPUT_FIELDS + ["trees_used"]
+NUMERIC_FIELDS = ("claim_amount", "delay_days", "document_count")
+INVALID_ROW = "Invalid row: expected a JSON object"
+
+
+def _csv_case(header, values):
+    """CSV cells are strings; numeric fields are parsed like JSON numbers."""
+    case = dict(zip(header, values))
+    for field in NUMERIC_FIELDS:
+        try:
+            case[field] = float(case[field])
+        except (KeyError, ValueError):
+            pass  # reported by encode_cases
+    return case
+
+
+def detect_format(path):
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def read_header(path, fmt):
+    """CSV column names (None for JSONL)."""
+    if fmt != "csv":
+        return None
+    with open(path, "rb") as f:
+        return next(csv.reader([f.readline().decode("utf-8-sig")]))
+
+
+def read_chunks(path, fmt, chunk_size, start_offset=None):
+    """
+    Yield ``(lines, end_offset)`` per chunk of up to ``chunk_size`` non-blank lines.
+
+    ``end_offset`` is the input byte offset just past the chunk, i.e. where a
+    resumed run continues. Parsing is left to ``parse_lines`` so that it can
+    run in pool workers.
+    """
+    with open(path, "rb") as f:
+        if fmt == "csv":
+            f.readline()
+        if start_offset:
+            f.seek(start_offset)
+
+        while True:
+            lines = []
+            while len(lines) < chunk_size:
+                line = f.readline()
+                if not line:
+                    break
+                if line.strip():
+                    lines.append(line.decode("utf-8"))
+            if not lines:
+                return
+            yield lines, f.tell()
+
+
+def parse_lines(lines, fmt, header=None):
+    """
+    Case dicts for one chunk of lines. Lines that cannot be parsed come back
+    as a string error message in place of the case dict.
+    """
+    if fmt == "csv":
+        return [_csv_case(header, values) for values in csv.reader(lines)]
+    cases = []
+    for line in lines:
+        try:
+            case = json.loads(line)
+        except ValueError:
+            cases.append("Invalid JSON line")
+            continue
+        cases.append(case if isinstance(case, dict) else INVALID_ROW)
+    return cases
+
+
+def score_chunk(cases, bundle, contributions="approx", triage=False):
+    """
+    Score one chunk of raw cases. With ``triage`` the decision comes from
+    the early-exit scorer and no contributions are computed.
+
+    Returns:
+        list[dict]: one output record per case (without ``row``), in order.
+    """
+    parsed = [case if isinstance(case, dict) else {} for case in cases]
+    X, positions, errors = encode_cases(parsed, bundle)
+
+    records = [
+        {"case_id": case.get("case_id"), "error": None} if isinstance(case, dict)
+        else {"case_id": None, "error": case if isinstance(case, str) else INVALID_ROW}
+        for case in cases
+    ]
+    for i, error in errors.items():
+        if records[i]["error"] is None:
+            records[i]["error"] = error
+    if not len(X):
+        return records
+
+    if triage:
+        triaged = get_triage_scorer(bundle).score(X)
+        probabilities, contribs = _sigmoid(triaged["margin"]), None
+    else:
+        probabilities, contribs = score_matrix(X, bundle, contributions)
+    if contribs is not None:
+        top = np.abs(np.asarray(contribs)[:, :len(FEATURES)]).argmax(axis=1)
+
+    dispute_classes = bundle.dispute_encoder.classes_.tolist()
+    state_classes = bundle.state_encoder.classes_.tolist()
+    for k, (i, row) in enumerate(zip(positions, X.tolist())):
+        probability = float(probabilities[k])
+        settle_min, settle_max, _ = _settlement_range(
+            int(row[0]), dispute_classes[int(row[4])], state_classes[int(row[5])], row[1], int(row[2])
+        )
+        records[i].update({
+            "probability": round(probability * 100, 2),
+            "prediction": 1 if probability >= bundle.threshold else 0,
+            "settle_min": settle_min,
+            "settle_max": settle_max,
+            "top_feature": FEATURES[top[k]] if contribs is not None else None,
+        })
+        if triage:
+            records[i]["prediction"] = int(triaged["decision"][k])
+            records[i]["trees_used"] = int(triaged["trees"][k])
+    return records
+
+
+def format_records(records, fmt, first_row, fields=OUTPUT_FIELDS):
+    """Serialize records to output bytes, numbering rows from ``first_row``."""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore", lineterminator="\n")
+        for n, record in enumerate(records):
+            writer.writerow({**record, "row": first_row + n})
+        return buffer.getvalue().encode("utf-8")
+    return "".join(
+        json.dumps({"row": first_row + n, **record}) + "\n" for n, record in enumerate(records)
+    ).encode("utf-8")
+
+
+def process_chunk(lines, input_format, header, output_format, first_row, contributions, triage, bundle):
+    """
+    Parse, score and serialize one chunk.
+
+    Returns:
+        tuple: (output bytes, rows, failed rows)
+    """
+    records = score_chunk(parse_lines(lines, input_format, header), bundle, contributions, triage)
+    failed = sum(1 for r in records if r["error"] is not None)
+    fields = TRIAGE_OUTPUT_FIELDS if triage else OUTPUT_FIELDS
+    return format_records(records, output_format, first_row, fields), len(records), failed
+
+
+# ---------------- PARALLEL MODE ---------------- #
+# Workers are forked after the parent has loaded the model, so they inherit the
+# booster, encoders and settlement tables copy-on-write instead of unpickling
+# them. Native XGBoost buffers and NumPy arrays are never written to and stay
+# shared; gc.freeze() keeps the collector from touching (and so copying) the
+# pages of every Python object that existed before the fork.
+
+_worker_bundle = None
+
+
+def _init_worker():
+    # One native thread per worker; parallelism comes from the processes.
+    _worker_bundle.model.set_params(n_jobs=1)
+    _worker_bundle.model.get_booster().set_param({"nthread": 1})
+
+
+def _process_chunk_in_worker(task):
+    return process_chunk(*task, bundle=_worker_bundle)
+
+
+def _start_pool(workers, bundle):
+    global _worker_bundle
+    if "fork" not in multiprocessing.get_all_start_methods():
+        raise RuntimeError("Parallel bulk scoring needs the fork start method (Linux/macOS)")
+    _worker_bundle = bundle
+    gc.freeze()
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_worker,
+    )
+
+
+def checkpoint_path(output_path):
+    return f"{output_path}.checkpoint.json"
+
+
+def _write_checkpoint(path, state):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def score_file(input_path, output_path, input_format=None, output_format=None, chunk_size=10000,
+               contributions="approx", resume=False, start_offset=None, workers=1, progress=True,
+               triage=False, force=False):
+    """
+    Stream ``input_path`` through the active model into ``output_path``.
+
+    Args:
+        chunk_size (int): records per vectorized scoring call.
+        contributions (str): "approx" (path attribution, fills top_feature)
+            or "none" (probability only, fastest).
+        resume (bool): continue from the checkpoint of a previous run.
+            Without a checkpoint an existing non-empty output is not
+            overwritten (ValueError); a checkpoint written by another
+            model version is refused unless ``force``.
+        start_offset (int): input byte offset to start from (appends to the output).
+        workers (int): >1 fans chunks out to that many forked processes;
+            output order and checkpoints are the same as a serial run.
+        triage (bool): early-exit threshold decisions instead of full
+            scoring; ``contributions`` is ignored.
+        force (bool): resume even though the active model differs from the
+            checkpoint's, mixing two models' scores in one output.
+
+    Returns:
+        dict: rows, failed, seconds, rows_per_second, workers, peak_rss_mb,
+        workers_peak_rss_mb, end_offset, model_version.
+    """
+    if contributions not in CONTRIBUTION_MODES:
+        raise ValueError(f"Unsupported contributions mode: {contributions}")
+    input_format = input_format or detect_format(input_path)
+    output_format = output_format or detect_format(output_path)
+    if input_format not in FORMATS or output_format not in FORMATS:
+        raise ValueError(f"Formats must be one of {FORMATS}")
+
+    bundle = get_active_bundle()
+    if triage:
+        get_triage_scorer(bundle)  # loaded before any fork, so workers share it
+    ckpt_path = checkpoint_path(output_path)
+    state = {"input": os.path.abspath(input_path), "input_offset": 0, "output_offset": 0, "rows": 0,
+             "model_version": bundle.version}
+
+    if resume and not os.path.exists(ckpt_path):
+        if os.path.exists(output_path) and os.path.getsize(output_path):
+            raise ValueError(f"Nothing to resume: {ckpt_path} does not exist and {output_path} "
+                             f"is not empty (rerun without --resume to overwrite it)")
+        print(f"No checkpoint at {ckpt_path}; starting from the beginning")
+    if resume and os.path.exists(ckpt_path):
+        with open(ckpt_path) as f:
+            previous = json.load(f)
+        if previous["input"] != state["input"]:
+            raise ValueError(f"Checkpoint belongs to {previous['input']}, not {state['input']}")
+        if previous.get("model_version") != bundle.version:
+            if not force:
+                raise ValueError(f"Checkpoint was written by model {previous.get('model_version')}, "
+                                 f"the active model is {bundle.version} (--force to mix them)")
+            print(f"Warning: resuming a run started with model {previous.get('model_version')} "
+                  f"using model {bundle.version}")
+        state.update(previous, model_version=bundle.version)
+        mode = "r+b"
+    elif start_offset is not None:
+        state["input_offset"] = start_offset
+        mode = "ab"
+    else:
+        mode = "wb"
+
+    header = read_header(input_path, input_format)
+    totals = {"rows": 0, "failed": 0}
+    start = time.perf_counter()
+
+    with open(output_path, mode) as out:
+        if mode == "r+b":
+            out.truncate(state["output_offset"])
+            out.seek(state["output_offset"])
+        if output_format == "csv" and out.tell() == 0:  # new or empty output, whatever the start offset
+            out.write((",".join(TRIAGE_OUTPUT_FIELDS if triage else OUTPUT_FIELDS) + "\n").encode("utf-8"))
+
+        def commit(outcome, end_offset):
+            """Write one finished chunk (always in input order) and checkpoint past it."""
+            data, rows, failed = outcome
+            out.write(data)
+            out.flush()
+            totals["rows"] += rows
+            totals["failed"] += failed
+            state.update(input_offset=end_offset, output_offset=out.tell(), rows=state["rows"] + rows)
+            _write_checkpoint(ckpt_path, state)
+            if progress:
+                elapsed = time.perf_counter() - start
+                print(f"{state['rows']} rows (offset {end_offset}), {totals['rows'] / elapsed:,.0f} rows/s, "
+                      f"peak RSS {peak_rss_mb()} MB")
+
+        next_row = state["rows"]
+        chunks = read_chunks(input_path, input_format, chunk_size, state["input_offset"])
+        if workers <= 1:
+            for lines, end_offset in chunks:
+                task = (lines, input_format, header, output_format, next_row, contributions, triage)
+                next_row += len(lines)
+                commit(process_chunk(*task, bundle=bundle), end_offset)
+        else:
+            # Bounded in-flight window: memory stays O(workers x chunk_size)
+            # and results are committed in submission order.
+            pending = deque()
+            with _start_pool(workers, bundle) as pool:
+                try:
+                    for lines, end_offset in chunks:
+                        task = (lines, input_format, header, output_format, next_row, contributions, triage)
+                        next_row += len(lines)
+                        pending.append((pool.submit(_process_chunk_in_worker, task), end_offset))
+                        if len(pending) >= 2 * workers:
+                            future, offset = pending.popleft()
+                            commit(future.result(), offset)
+                    while pending:
+                        future, offset = pending.popleft()
+                        commit(future.result(), offset)
+                finally:
+                    gc.unfreeze()
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": totals["rows"],
+        "failed": totals["failed"],
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(totals["rows"] / seconds, 1) if seconds else None,
+        "workers": max(1, workers),
+        "peak_rss_mb": peak_rss_mb(),
+        "workers_peak_rss_mb": peak_rss_mb(children=True) if workers > 1 else None,
+        "end_offset": state["input_offset"],
+        "model_version": bundle.version,
+        "triage": triage,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a JSONL/CSV case export with the active model.")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--input-format", choices=FORMATS, default=None, help="default: from extension")
+    parser.add_argument("--output-format", choices=FORMATS, default=None, help="default: from extension")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--contributions", choices=CONTRIBUTION_MODES, default="approx",
+                        help="'none' skips top_feature for maximum throughput")
+    resume = parser.add_mutually_exclusive_group()
+    resume.add_argument("--resume", action="store_true", help="continue from <output>.checkpoint.json")
+    resume.add_argument("--start-offset", type=int, default=None, help="input byte offset to start from")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes (chunks are scored in parallel, written in order)")
+    parser.add_argument("--triage", action="store_true",
+                        help="threshold decisions only, exiting early for clear-cut cases")
+    parser.add_argument("--quiet", action="store_true", help="no per-chunk progress lines")
+    parser.add_argument("--force", action="store_true",
+                        help="with --resume, continue even if the active model differs from the checkpoint's")
+    args = parser.parse_args(argv)
+
+    summary = score_file(
+        args.input, args.output,
+        input_format=args.input_format, output_format=args.output_format,
+        chunk_size=args.chunk_size, contributions=args.contributions,
+        resume=args.resume, start_offset=args.start_offset, workers=args.workers, progress=not args.quiet,
+        triage=args.triage, force=args.force,
+    )
+    workers_rss = (f", workers peak RSS {summary['workers_peak_rss_mb']} MB"
+                   if summary["workers_peak_rss_mb"] is not None else "")
+    print(f"Scored {summary['rows']} rows ({summary['failed']} failed) in {summary['seconds']:.1f}s "
+          f"with {summary['workers']} worker(s): {summary['rows_per_second']:,.0f} rows/s, "
+          f"peak RSS {summary['peak_rss_mb']} MB{workers_rss}, model {summary['model_version']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
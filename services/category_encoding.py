@@ -0,0 +1,134 @@
+"""
+Dictionary encoding of the model's categorical inputs.
+
+Each ModelBundle builds one ``CategoryCodes`` per encoder when it is
+loaded, so encoding a request is a dict lookup instead of a
+``LabelEncoder.transform`` call (input validation, array conversion and a
+searchsorted per value). Codes are identical to the encoder's.
+
+Values the model was not trained on are handled by an explicit policy:
+
+    reject    raise ValueError("Unknown <field>: <value>")
+    reserved  encode as missing (NaN); XGBoost sends missing values down the
+              default branch each split learned, instead of pretending the
+              value is one of the real categories
+    nearest   use the closest known category (case/spacing-insensitive match,
+              then difflib similarity); reserved when nothing is close enough
+"""
+import re
+import difflib
+
+import numpy as np
+
+UNKNOWN_POLICIES = ("reject", "reserved", "nearest")
+RESERVED_CODE = float("nan")
+NEAREST_CUTOFF = 0.6
+_NEAREST_CACHE_SIZE = 1024
+
+
+def _normalize(value):
+    return re.sub(r"[^a-z0-9]+", "_", value.lower()).strip("_")
+
+
+def check_policy(policy):
+    if policy not in UNKNOWN_POLICIES:
+        raise ValueError(f"Unsupported unknown-category policy: {policy}")
+    return policy
+
+
+class CategoryCodes:
+    """Precomputed category -> code table for one encoder."""
+
+    def __init__(self, field, classes):
+        self.field = field
+        self.classes = [str(c) for c in classes]
+        self.codes = {c: i for i, c in enumerate(self.classes)}
+        self._normalized = {_normalize(c): c for c in self.classes}
+        self._index = None  # pandas Index of the classes, built on first encode_array
+        self._nearest = {}
+
+    @classmethod
+    def from_encoder(cls, field, encoder):
+        return cls(field, encoder.classes_.tolist())
+
+    def nearest(self, value):
+        """Closest known category to ``value``, or None when nothing is close enough."""
+        if value in self._nearest:
+            return self._nearest[value]
+        key = _normalize(value)
+        match = self._normalized.get(key)
+        if match is None:
+            close = difflib.get_close_matches(key, list(self._normalized), n=1, cutoff=NEAREST_CUTOFF)
+            match = self._normalized[close[0]] if close else None
+        if len(self._nearest) < _NEAREST_CACHE_SIZE:
+            self._nearest[value] = match
+        return match
+
+    def resolve(self, value, policy):
+        """
+        Category the model will see for an unknown ``value``.
+
+        Returns:
+            str: the mapped category, or None for the reserved (missing) code.
+
+        Raises:
+            ValueError: under the reject policy.
+        """
+        if policy == "reject":
+            raise ValueError(f"Unknown {self.field}: {value}")
+        if policy == "nearest":
+            return self.nearest(value)
+        return None
+
+    def encode(self, value, policy="reject"):
+        """
+        Code of one value.
+
+        Returns:
+            tuple: (code, unknown) where ``unknown`` is None for a known value,
+            else {"value", "mapped_to"} describing how the policy handled it.
+        """
+        text = str(value).strip()
+        code = self.codes.get(text)
+        if code is not None:
+            return code, None
+        mapped = self.resolve(text, policy)
+        return (RESERVED_CODE if mapped is None else self.codes[mapped]), {"value": value, "mapped_to": mapped}
+
+    def encode_array(self, values, policy="reject"):
+        """
+        Vectorized encoding of a column via a pandas index lookup.
+
+        Every distinct unknown value is resolved once, however many rows
+        carry it. Non-string values count as unknown.
+
+        Returns:
+            tuple: (float64 codes, NaN where the value is unknown and not
+            mapped; boolean mask of the unknown rows; {unknown value: mapped
+            category or None})
+        """
+        import pandas as pd
+
+        if self._index is None:
+            self._index = pd.Index(self.classes)
+        series = pd.Series(values, dtype=object)
+        try:
+            codes = self._index.get_indexer(series).astype(np.float64)  # -1 where not found
+        except TypeError:  # unhashable values
+            series = series.where(series.map(type) == str)
+            codes = self._index.get_indexer(series).astype(np.float64)
+
+        # Only rows that missed the exact lookup are looked at one by one:
+        # first with surrounding whitespace removed, then by the policy.
+        missed = codes < 0
+        if missed.any():
+            stripped = series[missed].map(lambda v: v.strip() if isinstance(v, str) else None)
+            codes[missed] = stripped.map(lambda v: self.codes.get(v, np.nan)).astype(np.float64).to_numpy()
+        unknown_rows = np.isnan(codes)
+        mapped = {}
+        if unknown_rows.any() and policy != "reject":
+            unseen = series[unknown_rows].map(lambda v: v.strip() if isinstance(v, str) else None)
+            for value in unseen.dropna().unique():
+                mapped[value] = self.resolve(value, policy)
+            codes[unknown_rows] = unseen.map(lambda v: self.codes.get(mapped.get(v))).astype(np.float64).to_numpy()
+        return codes, unknown_rows, mapped
@@ -0,0 +1,338 @@
+"""
+Compact variants of a trained model for latency-sensitive deployments.
+
+Each variant is built from a source model (default: the active one) and
+registered as its own version in model/registry/, so a deployment picks
+its accuracy / latency tradeoff by activating it or by pinning it with
+PINNED_MODEL_VERSION (services/prediction.py):
+
+    trees-N     the first N trees of the source booster (no retraining)
+    depth-D     retrained on the labels with max_depth D
+    distill-D   retrained with max_depth D on the source model's
+                probabilities (soft labels) instead of the labels
+
+    python -m services.compress --variants trees-100 trees-150 depth-3 distill-4
+    python -m services.compress --variants distill-4 --dry-run     # report only
+
+The dataset is split once (seeded); retrained variants only see the
+training part. On the held-out part every variant is scored for AUC and
+average precision against the labels, and for agreement with the source
+model's decisions. A variant's threshold is the one that best reproduces
+the source model's decisions on the training part, so agreement is not
+lost to a shifted probability scale. Latency is measured per row (one-row
+probability and SHAP calls, and a 10k-row batch) together with the size
+of the pickled model.
+
+The shipped legacy model was trained on the whole dataset, so its own
+held-out scores are optimistic; the variants' agreement with it is the
+figure to compare.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.model_registry import ModelRegistry, FEATURES, ARTIFACT_FILES
+from services.train import BASE_PARAMS, TARGET, _score
+
+VARIANT_KINDS = ("trees", "depth", "distill")
+DEFAULT_VARIANTS = ("trees-100", "trees-150", "depth-3", "distill-4")
+HOLDOUT_FRACTION = 0.2
+LATENCY_ROWS = 300
+BATCH_ROWS = 10_000
+
+
+def parse_variant(spec):
+    """("trees" | "depth" | "distill", int) from a spec such as ``trees-100``."""
+    kind, _, value = spec.partition("-")
+    if kind not in VARIANT_KINDS or not value.isdigit() or int(value) < 1:
+        raise ValueError(f"Unsupported variant {spec!r}; expected one of "
+                         f"{', '.join(k + '-N' for k in VARIANT_KINDS)}")
+    return kind, int(value)
+
+
+def as_classifier(booster, **params):
+    """XGBClassifier around a trained booster, so it loads like any registered model."""
+    from xgboost import XGBClassifier
+
+    model = XGBClassifier()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.ubj")
+        booster.save_model(path)
+        model.load_model(path)
+    model.set_params(n_estimators=booster.num_boosted_rounds(), **params)
+    return model
+
+
+def _train_booster(X, label, max_depth, rounds):
+    import xgboost as xgb
+
+    params = {
+        "objective": "binary:logistic",
+        "max_depth": max_depth,
+        "eta": BASE_PARAMS["learning_rate"] * 2,
+        "subsample": BASE_PARAMS["subsample"],
+        "colsample_bytree": BASE_PARAMS["colsample_bytree"],
+        "tree_method": BASE_PARAMS["tree_method"],
+        "eval_metric": BASE_PARAMS["eval_metric"],
+        "seed": BASE_PARAMS["random_state"],
+    }
+    dtrain = xgb.DMatrix(X, label=label, feature_names=FEATURES)
+    return xgb.train(params, dtrain, num_boost_round=rounds)
+
+
+def build_variant(spec, booster, X_train, y_train, teacher_proba, rounds):
+    """
+    Booster of one variant.
+
+    Args:
+        booster (xgb.Booster): the source model.
+        teacher_proba (array): source probabilities for ``X_train`` (distill).
+        rounds (int): boosting rounds of the retrained variants.
+
+    Returns:
+        tuple: (xgb.Booster, max_depth)
+    """
+    kind, value = parse_variant(spec)
+    if kind == "trees":
+        if value >= booster.num_boosted_rounds():
+            raise ValueError(f"{spec}: the source model only has {booster.num_boosted_rounds()} trees")
+        depth = json.loads(booster.save_config())["learner"]["gradient_booster"]["tree_train_param"]["max_depth"]
+        return booster[:value], int(depth)
+    label = y_train if kind == "depth" else teacher_proba
+    return _train_booster(X_train, label, value, rounds), value
+
+
+def agreement_threshold(proba, decisions):
+    """
+    Threshold on ``proba`` that reproduces the most of ``decisions``.
+
+    Returns:
+        float: cases with ``proba >= threshold`` are positive.
+    """
+    order = np.argsort(proba, kind="stable")
+    p = proba[order]
+    d = decisions[order].astype(np.int64)
+    # Agreement when rows [i:] are called positive, for every cut i.
+    negatives_below = np.concatenate([[0], np.cumsum(1 - d)])
+    positives_above = d.sum() - np.concatenate([[0], np.cumsum(d)])
+    agree = negatives_below + positives_above
+    # Only cuts between distinct values can be expressed as a threshold.
+    valid = np.ones(len(p) + 1, dtype=bool)
+    valid[1:-1] = p[1:] > p[:-1]
+    cut = int(np.argmax(np.where(valid, agree, -1)))
+    if cut == len(p):
+        return float(np.nextafter(p[-1], np.inf))
+    return float(p[cut])
+
+
+def measure_latency(booster, X, rows=LATENCY_ROWS, batch_rows=BATCH_ROWS, repeat=3):
+    """
+    Per-row latency in microseconds: one-row probability (``inplace_predict``)
+    and SHAP (``pred_contribs``) calls as on /api/predict, and a batch.
+    """
+    import xgboost as xgb
+
+    X = np.asarray(X, dtype=np.float32)
+    single = X[:rows]
+    booster.inplace_predict(single[:1])
+
+    def per_row(fn, items):
+        timings = []
+        for item in items:
+            start = time.perf_counter()
+            fn(item)
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    proba = per_row(lambda row: booster.inplace_predict(row[None, :]), single)
+    contribs = per_row(
+        lambda row: booster.predict(xgb.DMatrix(row[None, :], feature_names=FEATURES), pred_contribs=True),
+        single,
+    )
+    batch = X[:batch_rows]
+    batch_s = min(per_row(booster.inplace_predict, [batch] * repeat))
+    return {
+        "proba_p50_us": round(float(np.median(proba)) * 1e6, 1),
+        "contribs_p50_us": round(float(np.median(contribs)) * 1e6, 1),
+        "batch_us_per_row": round(batch_s / len(batch) * 1e6, 3),
+    }
+
+
+def artifact_bytes(model):
+    import joblib
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, ARTIFACT_FILES["model"])
+        joblib.dump(model, path)
+        return os.path.getsize(path)
+
+
+def evaluate_variant(booster, threshold, X_test, y_test, source_decisions):
+    """Held-out label scores plus agreement with the source model's decisions."""
+    proba = booster.inplace_predict(np.asarray(X_test, dtype=np.float32))
+    decisions = proba >= threshold
+    return {
+        **_score(y_test, proba, threshold),
+        "agreement": round(float(np.mean(decisions == source_decisions)), 5),
+        "positive_rate": round(float(decisions.mean()), 5),
+    }
+
+
+def _dataset(bundle, data=None):
+    """Encoded dataset rows (FEATURES order) with their labels."""
+    from services.dataset_store import load_cases_frame
+    from services.prediction import encode_cases
+
+    df = load_cases_frame(["claim_amount", "delay_days", "document_count", "dispute_type", "jurisdiction", TARGET], data)
+    cases = df.drop(columns=[TARGET]).astype({"dispute_type": str, "jurisdiction": str}).to_dict("records")
+    X, positions, _ = encode_cases(cases, bundle)
+    return X.astype(np.float32), df[TARGET].to_numpy(dtype=np.int32)[positions]
+
+
+def compress(bundle, specs, X, y, rounds=150, holdout=HOLDOUT_FRACTION, seed=42):
+    """
+    Build and evaluate variants of ``bundle``'s model.
+
+    Returns:
+        tuple: (report dict with a "source" row and one row per variant,
+        {spec: (XGBClassifier, threshold)})
+    """
+    from sklearn.model_selection import train_test_split
+
+    for spec in specs:
+        parse_variant(spec)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=holdout, stratify=y, random_state=seed,
+    )
+    booster = bundle.model.get_booster()
+    teacher_train = booster.inplace_predict(X_train)
+    source_test = booster.inplace_predict(X_test) >= bundle.threshold
+
+    rows = {"source": {
+        "version": bundle.version,
+        "trees": booster.num_boosted_rounds(),
+        "threshold": bundle.threshold,
+        **evaluate_variant(booster, bundle.threshold, X_test, y_test, source_test),
+        **measure_latency(booster, X_test),
+        "artifact_bytes": artifact_bytes(bundle.model),
+    }}
+    models = {}
+    for spec in specs:
+        start = time.perf_counter()
+        variant, depth = build_variant(spec, booster, X_train, y_train, teacher_train, rounds)
+        threshold = round(agreement_threshold(variant.inplace_predict(X_train), teacher_train >= bundle.threshold), 6)
+        model = as_classifier(variant, max_depth=depth)
+        rows[spec] = {
+            "trees": variant.num_boosted_rounds(),
+            "max_depth": depth,
+            "threshold": threshold,
+            **evaluate_variant(variant, threshold, X_test, y_test, source_test),
+            **measure_latency(variant, X_test),
+            "artifact_bytes": artifact_bytes(model),
+            "build_seconds": round(time.perf_counter() - start, 2),
+        }
+        models[spec] = (model, threshold)
+    report = {
+        "source_version": bundle.version,
+        "source_fingerprint": bundle.fingerprint,
+        "train_rows": int(len(y_train)),
+        "holdout_rows": int(len(y_test)),
+        "seed": seed,
+        "rounds": rounds,
+        "variants": rows,
+    }
+    return report, models
+
+
+def register_variants(registry, bundle, report, models, prefix=None):
+    """
+    Register every variant next to the source encoders.
+
+    Returns:
+        list[str]: the new versions (``<prefix>-<spec>``).
+    """
+    import joblib
+
+    prefix = prefix or bundle.version
+    versions = []
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {key: os.path.join(tmp, name) for key, name in ARTIFACT_FILES.items()}
+        joblib.dump(bundle.dispute_encoder, paths["dispute_encoder"])
+        joblib.dump(bundle.state_encoder, paths["state_encoder"])
+        for spec, (model, threshold) in models.items():
+            version = f"{prefix}-{spec}"
+            joblib.dump(model, paths["model"])
+            kind, value = parse_variant(spec)
+            compression = {
+                "method": kind,
+                "value": value,
+                "source_version": report["source_version"],
+                "source_fingerprint": report["source_fingerprint"],
+                "holdout": report["variants"][spec],
+                "source_holdout": report["variants"]["source"],
+            }
+            registry.register(
+                version, paths["model"], paths["dispute_encoder"], paths["state_encoder"],
+                threshold=threshold, features=FEATURES, extra={"compression": compression},
+            )
+            versions.append(version)
+    return versions
+
+
+def format_report(report):
+    lines = [f"{'variant':<14} {'trees':>5} {'AUC':>7} {'AP':>7} {'agree':>8} {'proba us':>9} "
+             f"{'shap us':>8} {'batch us':>9} {'size KB':>8}"]
+    for name, row in report["variants"].items():
+        lines.append(
+            f"{name:<14} {row['trees']:>5} {row['auc']:>7.4f} {row['average_precision']:>7.4f} "
+            f"{row['agreement']:>8.2%} {row['proba_p50_us']:>9.1f} {row['contribs_p50_us']:>8.1f} "
+            f"{row['batch_us_per_row']:>9.3f} {row['artifact_bytes'] / 1024:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build, evaluate and register compact model variants.")
+    parser.add_argument("--data", default=None,
+                        help="columnar store directory or JSON export (default: store if built, else JSON)")
+    parser.add_argument("--source", default=None, help="registered source version (default: active model)")
+    parser.add_argument("--variants", nargs="+", default=list(DEFAULT_VARIANTS),
+                        help="trees-N, depth-D and/or distill-D")
+    parser.add_argument("--rounds", type=int, default=150, help="boosting rounds of retrained variants")
+    parser.add_argument("--holdout", type=float, default=HOLDOUT_FRACTION)
+    parser.add_argument("--prefix", default=None, help="version prefix (default: source version)")
+    parser.add_argument("--registry", default=None, help="registry directory (default: model/registry)")
+    parser.add_argument("--report", default=None, help="also write the report as JSON")
+    parser.add_argument("--dry-run", action="store_true", help="evaluate without registering")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.registry) if args.registry else ModelRegistry()
+    if args.source:
+        bundle = registry.load(args.source)
+    else:
+        from services.prediction import get_active_bundle
+        bundle = get_active_bundle()
+
+    X, y = _dataset(bundle, args.data)
+    report, models = compress(bundle, args.variants, X, y, rounds=args.rounds, holdout=args.holdout)
+    print(f"Source {bundle.version} ({bundle.fingerprint}); {report['holdout_rows']} held-out cases")
+    print(format_report(report))
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+    if not args.dry_run:
+        for version in register_variants(registry, bundle, report, models, args.prefix):
+            print(f"Registered model version {version}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
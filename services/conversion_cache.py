@@ -0,0 +1,197 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+
+INDEX_FILE = "index.sqlite3"
+COUNTERS = ("hits", "misses", "evictions", "bytes_saved", "clock")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def content_key(data, **options):
+    """SHA-256 of ``data`` plus the conversion options that change the output."""
+    digest = hashlib.sha256(data)
+    for name in sorted(options):
+        digest.update(f"\0{name}={options[name]}".encode())
+    return digest.hexdigest()
+
+
+class DiskLRUCache:
+    """
+    Size-bounded LRU cache of byte blobs, one file per entry under ``root``.
+
+    Every process using the directory (web, pool and job workers) shares
+    one SQLite index next to the entries: each entry's size and last use,
+    and the hit / miss / eviction counters plus the input bytes whose
+    conversion a hit skipped. Writes and evictions run in a write
+    transaction against that index, so ``max_bytes`` bounds the directory
+    as a whole rather than each process's view of it, and ``stats()``
+    reports every process's lookups. Entry files go through a temp file and
+    ``os.replace``, so readers never see a partial entry.
+    """
+
+    SUFFIX = ".entry"
+
+    def __init__(self, root, max_bytes):
+        """
+        Args:
+            root (str): directory holding the entries (created if missing).
+            max_bytes (int): total size before least recently used entries
+                are evicted. 0 disables caching.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.db_path = os.path.join(root, INDEX_FILE)
+        if max_bytes > 0:
+            os.makedirs(root, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                conn.executemany("INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)",
+                                 [(name,) for name in COUNTERS])
+            self._scan()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction taken up front: one process at a time sizes and evicts."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _path(self, key):
+        return os.path.join(self.root, key + self.SUFFIX)
+
+    @staticmethod
+    def _add(conn, **amounts):
+        for name, amount in amounts.items():
+            conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (amount, name))
+
+    @classmethod
+    def _tick(cls, conn):
+        """Next value of the shared use clock (orders entries by recency)."""
+        cls._add(conn, clock=1)
+        return conn.execute("SELECT value FROM counters WHERE name = 'clock'").fetchone()[0]
+
+    def _scan(self):
+        """Index entry files the index does not know (older versions, crashed writers); drop rows without a file."""
+        found = {}
+        for entry in os.scandir(self.root):
+            if entry.name.endswith(self.SUFFIX) and entry.is_file():
+                st = entry.stat()
+                found[entry.name[:-len(self.SUFFIX)]] = (st.st_mtime, st.st_size)
+        with self._transaction() as conn:
+            known = {key for key, in conn.execute("SELECT key FROM entries")}
+            conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in known - set(found)])
+            for key in sorted(set(found) - known, key=lambda k: found[k][0]):
+                conn.execute("INSERT INTO entries (key, size, used) VALUES (?, ?, ?)",
+                             (key, found[key][1], self._tick(conn)))
+            self._evict(conn)
+
+    def get(self, key, source_bytes=0):
+        """
+        Cached blob for ``key``, or None on a miss.
+
+        Args:
+            source_bytes (int): size of the input the entry was converted
+                from, added to ``bytes_saved`` on a hit.
+        """
+        if self.max_bytes <= 0:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._add(conn, misses=1)
+            return None
+        with self._transaction() as conn:
+            conn.execute("UPDATE entries SET used = ? WHERE key = ?", (self._tick(conn), key))
+            self._add(conn, hits=1, bytes_saved=source_bytes)
+        return data
+
+    def set(self, key, data):
+        if self.max_bytes <= 0 or len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO entries (key, size, used) VALUES (?, ?, ?)",
+                         (key, len(data), self._tick(conn)))
+            self._evict(conn)
+
+    def _evict(self, conn):
+        """Remove least recently used entries until the directory fits ``max_bytes``. In a transaction."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        evicted = 0
+        while total > self.max_bytes:
+            key, size = conn.execute("SELECT key, size FROM entries ORDER BY used LIMIT 1").fetchone()
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+        if evicted:
+            self._add(conn, evictions=evicted)
+
+    def clear(self):
+        if self.max_bytes <= 0:
+            return
+        with self._transaction() as conn:
+            for key, in conn.execute("SELECT key FROM entries").fetchall():
+                try:
+                    os.remove(self._path(key))
+                except FileNotFoundError:
+                    pass
+            conn.execute("DELETE FROM entries")
+
+    def stats(self):
+        """Size and counters of the whole cache directory, across all processes using it."""
+        entries, size, counters = 0, 0, dict.fromkeys(COUNTERS, 0)
+        if self.max_bytes > 0:
+            with self._connect() as conn:
+                entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+                counters.update(conn.execute("SELECT name, value FROM counters"))
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "evictions": counters["evictions"],
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+            "bytes_saved": counters["bytes_saved"],
+        }
@@ -0,0 +1,223 @@
+"""
+Process pool for batch document conversion.
+
+Docling conversion is CPU-bound and holds the GIL for long stretches, so
+``/api/convert/batch`` hands its files to worker processes instead of
+converting them one after another in the request thread. Each worker
+builds and warms its own converters (``get_converter``) once when it
+starts, then converts and formats files, returning only the output text.
+
+At most ``workers`` files are in flight across all batches, so a file
+starts as soon as it is submitted and its timeout runs from that moment. When a file exceeds it,
+the pool is torn down (the only way to stop a conversion in progress) and
+the other in-flight files are resubmitted to a fresh pool. ``map``
+returns results in the order of the input; ``imap_unordered`` yields each
+one as soon as it is ready, for streaming responses.
+
+Workers use the ``spawn`` start method: forking a threaded Flask process
+with Docling's models loaded is not safe.
+"""
+import time
+import threading
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, CancelledError, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+# How often a batch waiting on its own files checks for slots freed by others.
+SLOT_POLL_SECONDS = 1.0
+
+
+def _warm_converters(ocr_modes=(True, False)):
+    """Pool initializer: build the converters and load their models once per worker."""
+    from docling.datamodel.base_models import InputFormat
+    from services.document import get_converter
+
+    for use_ocr in ocr_modes:
+        get_converter(use_ocr).initialize_pipeline(InputFormat.PDF)
+
+
+def _ready():
+    return True
+
+
+def convert_file(file_bytes, filename, use_ocr, output_format):
+    """
+    Worker task: convert one upload and format it.
+
+    Returns:
+        dict: {"success": True, "content", "mimetype", "ext"} or
+        {"success": False, "error"}
+    """
+    from services.document import convert_document, format_output
+
+    try:
+        result = convert_document(file_bytes, filename, use_ocr)
+        content, mimetype, ext = format_output(result, output_format)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+    return {"success": True, "content": content, "mimetype": mimetype, "ext": ext}
+
+
+class ConversionPool:
+    """Long-lived pool of warmed conversion workers (see module docstring)."""
+
+    def __init__(self, workers, timeout, task=convert_file, initializer=_warm_converters, initargs=()):
+        """
+        Args:
+            workers (int): worker processes.
+            timeout (float): seconds one file may take before it is abandoned.
+            task (callable): picklable function called with each item's
+                arguments plus the shared arguments of ``map``.
+        """
+        self.workers = workers
+        self.timeout = timeout
+        self.task = task
+        self.initializer = initializer
+        self.initargs = initargs
+        self._executor = None
+        # Guards the executor: batches share it, and a timeout in one tears it down.
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(workers)  # files in flight across all batches
+        self.restarts = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+                initargs=self.initargs,
+            )
+        return self._executor
+
+    def start(self):
+        """Spawn and warm every worker now instead of on the first batch."""
+        with self._lock:
+            executor = self._get_executor()
+            for _ in range(self.workers):
+                executor.submit(_ready)
+
+    def _restart(self, executor):
+        """Kill ``executor``'s processes, unless another batch replaced it already. Lock held."""
+        if executor is None or executor is not self._executor:
+            return
+        self._executor = None
+        # ProcessPoolExecutor cannot cancel a running task, so its processes are
+        # killed through the private ``_processes`` map (pid -> Process, present
+        # in every CPython 3 release). Should it ever go away, running files
+        # are left to finish in the background instead of being stopped.
+        processes = getattr(executor, "_processes", None) or {}
+        for process in list(processes.values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+        self.restarts += 1
+
+    def map(self, items, *args):
+        """
+        Run the task over ``items`` (tuples of per-item arguments).
+
+        Returns:
+            list[dict]: one result per item, in input order; failures and
+            timeouts are {"success": False, "error": ...}.
+        """
+        results = [None] * len(items)
+        for index, result in self.imap_unordered(items, *args):
+            results[index] = result
+        return results
+
+    def _release_slot(self, future):
+        self._slots.release()
+
+    def _take_slots(self, wanted, block):
+        """Take up to ``wanted`` worker slots; with ``block``, wait for the first one."""
+        taken = 0
+        while taken < wanted and self._slots.acquire(blocking=block and taken == 0):
+            taken += 1
+        return taken
+
+    def imap_unordered(self, items, *args):
+        """
+        Like ``map``, but yield (index, result) as soon as each item finishes.
+
+        The pool lock is held only to submit files and to restart the pool,
+        never while waiting or across a ``yield``, so a slow consumer (e.g. a
+        client reading an NDJSON stream) does not hold up other batches.
+        Concurrent batches share ``workers`` slots, each freed as soon as its
+        file finishes, so a submitted file always starts at once. A file lost
+        to a restart caused by another batch is resubmitted. Closing the
+        generator early (e.g. the client disconnected) kills the files still
+        in flight, so they do not hold workers.
+        """
+        pending = list(range(len(items)))[::-1]  # popped from the end, in input order
+        in_flight = {}  # future -> (index, deadline, executor)
+        try:
+            while pending or in_flight:
+                slots = self._take_slots(len(pending), block=not in_flight)
+                if slots:
+                    with self._lock:
+                        try:
+                            while slots:
+                                executor = self._get_executor()
+                                try:
+                                    future = executor.submit(self.task, *items[pending[-1]], *args)
+                                except BrokenProcessPool:  # a worker died since the last batch looked
+                                    self._restart(executor)
+                                    executor = self._get_executor()
+                                    future = executor.submit(self.task, *items[pending[-1]], *args)
+                                future.add_done_callback(self._release_slot)
+                                in_flight[future] = (pending.pop(), time.monotonic() + self.timeout, executor)
+                                slots -= 1
+                        finally:
+                            for _ in range(slots):  # not submitted after all
+                                self._slots.release()
+
+                timeout = min(deadline for _, deadline, _ in in_flight.values()) - time.monotonic()
+                if pending:
+                    timeout = min(timeout, SLOT_POLL_SECONDS)  # slots freed by other batches
+                done, _ = wait(in_flight, timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+                ready, lost, kill = [], [], set()
+                for future in done:
+                    index, _, executor = in_flight.pop(future)
+                    try:
+                        ready.append((index, future.result()))
+                    except (BrokenProcessPool, CancelledError):
+                        lost.append((index, executor))
+                    except Exception as e:
+                        ready.append((index, {"success": False, "error": str(e)}))
+
+                now = time.monotonic()
+                expired = [f for f, (_, deadline, _) in in_flight.items() if deadline <= now and not f.done()]
+                for future in expired:
+                    index, _, executor = in_flight.pop(future)
+                    ready.append((index, {"success": False, "error": f"Conversion timed out after {self.timeout:g}s"}))
+                    kill.add(executor)
+
+                with self._lock:
+                    current = self._executor
+                    for index, executor in lost:
+                        if executor is current:
+                            # The pool broke under one of our files: a worker died.
+                            ready.append((index, {"success": False, "error": "Conversion worker died"}))
+                            kill.add(executor)
+                        else:
+                            pending.append(index)  # killed by another batch's timeout; start over
+                    for executor in kill:
+                        self._restart(executor)
+                # Our files still running on a killed pool start over on the new one
+                # (other batches' files on it come back as lost and are resubmitted).
+                requeued = [f for f, (_, _, executor) in in_flight.items() if executor in kill]
+                pending.extend(sorted((in_flight.pop(f)[0] for f in requeued), reverse=True))
+
+                for item in ready:
+                    yield item
+        finally:
+            if in_flight:
+                with self._lock:
+                    for executor in {executor for _, _, executor in in_flight.values()}:
+                        self._restart(executor)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
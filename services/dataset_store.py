@@ -0,0 +1,231 @@
+"""
+Columnar, memory-mapped store for the case dataset.
+
+Convert the JSON export once:
+
+    python -m services.dataset_store convert
+    python -m services.dataset_store info
+
+Layout (``prediction/msme_cases_store/`` by default)::
+
+    schema.json           row count, source, and per column: kind, dtype, file
+                          (plus the sorted category list for categoricals)
+    <column>.npy          numeric values, or int8/int16 codes for categoricals,
+                          or fixed-width bytes for identifiers
+
+Columns are opened with ``np.load(mmap_mode="r")``: opening is O(1), pages
+are read on first touch and shared by every process mapping the store.
+Column views and row ranges are zero-copy slices of the maps. Category
+lists are sorted, so the codes equal sklearn LabelEncoder codes.
+"""
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_PATH = os.path.join(BASE_DIR, "prediction", "msme_synthetic_cases.json")
+STORE_DIR = os.path.join(BASE_DIR, "prediction", "msme_cases_store")
+SCHEMA_FILE = "schema.json"
+
+# Low-cardinality text columns stored as dictionary codes; identifiers and
+# other text columns are stored as fixed-width bytes.
+CATEGORICAL_MAX_CARDINALITY = 1000
+STRING_COLUMNS = ("case_id",)
+
+
+def _int_dtype(values):
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        info = np.iinfo(dtype)
+        if not len(values) or (values.min() >= info.min and values.max() <= info.max):
+            return np.dtype(dtype)
+    return values.dtype
+
+
+def write_store(df, out_dir=STORE_DIR, source=None):
+    """
+    Write a DataFrame as a columnar store.
+
+    Returns:
+        dict: the schema written to schema.json.
+    """
+    import pandas as pd
+
+    os.makedirs(out_dir, exist_ok=True)
+    columns = {}
+    for name in df.columns:
+        series = df[name]
+        entry = {"file": f"{name}.npy"}
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+            values = series.to_numpy()
+            values = values.astype(_int_dtype(values))
+            entry["kind"] = "numeric"
+        elif pd.api.types.is_float_dtype(series):
+            values = series.to_numpy(dtype=np.float64)
+            entry["kind"] = "numeric"
+        else:
+            text = series.astype(str)
+            categories = sorted(text.unique().tolist())
+            if name not in STRING_COLUMNS and len(categories) <= CATEGORICAL_MAX_CARDINALITY:
+                codes = pd.Categorical(text, categories=categories).codes
+                values = codes.astype(np.int8 if len(categories) < 128 else np.int16)
+                entry.update(kind="category", categories=categories)
+            else:
+                width = max(1, int(text.str.len().max()))
+                values = text.to_numpy().astype(f"S{width}")
+                entry["kind"] = "string"
+        np.save(os.path.join(out_dir, entry["file"]), values)
+        entry["dtype"] = values.dtype.str
+        columns[name] = entry
+
+    schema = {
+        "rows": int(len(df)),
+        "source": source,
+        "built_at": datetime.now().isoformat(),
+        "columns": columns,
+    }
+    tmp_path = os.path.join(out_dir, f"{SCHEMA_FILE}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(schema, f, indent=2)
+    os.replace(tmp_path, os.path.join(out_dir, SCHEMA_FILE))
+    return schema
+
+
+def convert(json_path=DATASET_PATH, out_dir=STORE_DIR):
+    """Convert the JSON array export into a store (parses the JSON once)."""
+    import pandas as pd
+
+    with open(json_path) as f:
+        df = pd.DataFrame(json.load(f))
+    return write_store(df, out_dir, source=os.path.basename(json_path))
+
+
+class DatasetStore:
+    """Read-only, memory-mapped view of a store directory."""
+
+    def __init__(self, path=STORE_DIR):
+        self.path = path
+        with open(os.path.join(path, SCHEMA_FILE)) as f:
+            self.schema = json.load(f)
+        self.columns = self.schema["columns"]
+        self._maps = {}
+
+    def __len__(self):
+        return self.schema["rows"]
+
+    @classmethod
+    def exists(cls, path=STORE_DIR):
+        return os.path.exists(os.path.join(path, SCHEMA_FILE))
+
+    def column(self, name):
+        """Zero-copy memory-mapped array (codes for categorical columns)."""
+        if name not in self._maps:
+            if name not in self.columns:
+                raise KeyError(f"Unknown column: {name}")
+            self._maps[name] = np.load(os.path.join(self.path, self.columns[name]["file"]), mmap_mode="r")
+        return self._maps[name]
+
+    def categories(self, name):
+        """Sorted category list of a categorical column."""
+        return self.columns[name]["categories"]
+
+    def code(self, name, value):
+        """Code of ``value`` in categorical column ``name``, or -1 if absent."""
+        categories = self.categories(name)
+        index = int(np.searchsorted(categories, value))
+        return index if index < len(categories) and categories[index] == value else -1
+
+    def rows(self, start, stop, columns=None):
+        """{column: array} for rows [start, stop); slices of the maps, no copy."""
+        return {name: self.column(name)[start:stop] for name in (columns or self.columns)}
+
+    def where(self, **conditions):
+        """
+        Row indices matching every ``column=value`` condition. Categorical
+        columns are compared on their codes, so no strings are materialized.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for name, value in conditions.items():
+            if self.columns[name]["kind"] == "category":
+                value = self.code(name, value)
+            mask &= self.column(name) == value
+        return np.flatnonzero(mask)
+
+    def take(self, indices, columns=None):
+        """{column: array} for the given row indices (copies only those rows)."""
+        return {name: self.column(name)[indices] for name in (columns or self.columns)}
+
+    def decode(self, name, values):
+        """Category strings (or str for string columns) of raw column values."""
+        kind = self.columns[name]["kind"]
+        if kind == "category":
+            return np.asarray(self.categories(name), dtype=object)[values]
+        if kind == "string":
+            return np.char.decode(values)
+        return values
+
+    def to_frame(self, columns=None, rows=None):
+        """
+        pandas DataFrame of ``columns`` (default: all) for ``rows`` (a slice,
+        an index array or None for all). Categorical columns become
+        pd.Categorical over the stored codes rather than Python strings.
+        """
+        import pandas as pd
+
+        data = {}
+        for name in columns or self.columns:
+            values = self.column(name)
+            if rows is not None:
+                values = values[rows]
+            entry = self.columns[name]
+            if entry["kind"] == "category":
+                data[name] = pd.Categorical.from_codes(np.asarray(values), categories=entry["categories"])
+            elif entry["kind"] == "string":
+                data[name] = np.char.decode(values)
+            else:
+                data[name] = values
+        return pd.DataFrame(data)
+
+
+def load_cases_frame(columns=None, path=None):
+    """
+    The case dataset as a DataFrame: from the columnar store when it has
+    been built (or ``path`` is a store directory), else from the JSON export.
+    """
+    import pandas as pd
+
+    path = path or (STORE_DIR if DatasetStore.exists(STORE_DIR) else DATASET_PATH)
+    if os.path.isdir(path):
+        return DatasetStore(path).to_frame(columns)
+    with open(path) as f:
+        df = pd.DataFrame(json.load(f))
+    return df[columns] if columns else df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Columnar store for the case dataset.")
+    parser.add_argument("--store", default=STORE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    conv = sub.add_parser("convert", help="convert the JSON export into a columnar store")
+    conv.add_argument("--data", default=DATASET_PATH)
+    sub.add_parser("info", help="print the store schema")
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        schema = convert(args.data, args.store)
+        size = sum(os.path.getsize(os.path.join(args.store, c["file"])) for c in schema["columns"].values())
+        print(f"Wrote {schema['rows']} rows, {len(schema['columns'])} columns "
+              f"({size / 1e6:.1f} MB) to {args.store}")
+    else:
+        store = DatasetStore(args.store)
+        print(f"{len(store)} rows from {store.schema['source']} (built {store.schema['built_at']})")
+        for name, entry in store.columns.items():
+            extra = f", {len(entry['categories'])} categories" if entry["kind"] == "category" else ""
+            print(f"  {name:<30} {entry['kind']:<9} {entry['dtype']}{extra}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
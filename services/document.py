@@ -1,14 +1,24 @@
 import os
 import sys
-import uuid
+import json
+import time
 import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from importlib.metadata import version as package_version
 from io import BytesIO
 from pathlib import Path
 from typing import Dict
 
+import yaml
+
 # Add parent directory to path to allow importing config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import config
+from services.conversion_cache import DiskLRUCache, content_key
+from services.conversion_pool import ConversionPool, convert_file
 
 from docling.datamodel.pipeline_options import PdfPipelineOptions
 from docling.document_converter import (
@@ -16,10 +26,11 @@ from docling.document_converter import (
     PdfFormatOption,
     WordFormatOption,
 )
-from docling.datamodel.base_models import DocumentStream, InputFormat
+from docling.datamodel.base_models import ConversionStatus, DocumentStream, InputFormat
 from docling.backend.pypdfium2_backend import PyPdfiumDocumentBackend
 from docling.pipeline.simple_pipeline import SimplePipeline
 from docling.pipeline.standard_pdf_pipeline import StandardPdfPipeline
+from docling_core.types.doc import DoclingDocument
 
 # ---------------------------------------------------------------------------
 # Docling converter (cached)
@@ -68,35 +79,291 @@ def get_converter(use_ocr: bool = True) -> DocumentConverter:
         )
     return _converters[use_ocr]
 
-def convert_document(file_bytes, filename, use_ocr=True):
+@contextmanager
+def _document_source(file_bytes, filename):
     """
-    Converts a document (PDF, DOCX, HTML, etc.) to Docling structure.
-    Returns: ConversionResult or None on failure
+    Docling input for uploaded bytes.
+
+    Up to ``config.MAX_STREAM_BYTES`` the bytes are wrapped in an in-memory
+    DocumentStream (no disk round trip). Larger uploads go to a temporary
+    file in ``config.UPLOAD_FOLDER``, removed when the block exits, whether
+    the conversion succeeded or not.
     """
-    file_ext = os.path.splitext(filename)[1].lower()
-    temp_path = os.path.join(config.UPLOAD_FOLDER, f"{uuid.uuid4()}{file_ext}")
+    if len(file_bytes) <= config.MAX_STREAM_BYTES:
+        yield DocumentStream(name=os.path.basename(filename), stream=BytesIO(file_bytes))
+        return
 
+    file_ext = os.path.splitext(filename)[1].lower()
+    os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix="upload-", suffix=file_ext, dir=config.UPLOAD_FOLDER)
     try:
-        with open(temp_path, "wb") as f:
+        with os.fdopen(fd, "wb") as f:
             f.write(file_bytes)
+        yield Path(temp_path)
+    finally:
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
 
-        converter = get_converter(use_ocr=use_ocr)
-        
-        # docling can parse from path
-        result = converter.convert(
-            Path(temp_path),
-            max_num_pages=config.MAX_PAGES,
-            max_file_size=config.MAX_FILE_SIZE,
-        )
-        
-        return result
 
+# ---------------------------------------------------------------------------
+# Conversion cache
+# ---------------------------------------------------------------------------
+
+# Part of every cache key: bump it when get_converter()'s pipeline settings
+# change, so documents converted by the old pipeline are not served.
+PIPELINE_PROFILE = "pdfium-standard-no-tables-1"
+DOCLING_VERSION = package_version("docling")
+
+# Serialized DoclingDocuments keyed by the upload's SHA-256 and the options,
+# so /api/extract-fields, /api/analyze-case and /api/summarize on the same
+# file run the OCR pipeline once. Size budget and counters are shared by every
+# process using the directory (pool and job workers included).
+conversion_cache = DiskLRUCache(
+    os.path.join(config.RESULT_FOLDER, "conversion_cache"), config.CONVERSION_CACHE_BYTES,
+)
+
+
+@dataclass
+class CachedConversion:
+    """Stands in for a ConversionResult (cache hits, paged conversions); callers only read ``document``."""
+    document: DoclingDocument
+    cache_key: str
+
+
+def conversion_cache_key(file_bytes, filename, use_ocr):
+    return content_key(
+        file_bytes,
+        ext=os.path.splitext(filename)[1].lower(),
+        use_ocr=bool(use_ocr),
+        max_pages=config.MAX_PAGES,
+        profile=PIPELINE_PROFILE,
+        docling=DOCLING_VERSION,
+    )
+
+
+def conversion_cache_stats():
+    """Hit rate, size and input bytes whose conversion was skipped."""
+    return conversion_cache.stats()
+
+
+def convert_document(file_bytes, filename, use_ocr=True):
+    """
+    Converts a document (PDF, DOCX, HTML, etc.) to Docling structure.
+    Returns: ConversionResult, or a CachedConversion when the same bytes were
+    already converted with the same options
+    """
+    cache_key = conversion_cache_key(file_bytes, filename, use_ocr)
+    cached = conversion_cache.get(cache_key, source_bytes=len(file_bytes))
+    if cached is not None:
+        try:
+            return CachedConversion(DoclingDocument.model_validate_json(cached), cache_key)
+        except ValueError as e:
+            print(f"Ignoring unreadable cached conversion {cache_key}: {e}")
+
+    try:
+        converter = get_converter(use_ocr=use_ocr)
+        with _document_source(file_bytes, filename) as source:
+            result = converter.convert(
+                source,
+                max_num_pages=config.MAX_PAGES,
+                max_file_size=config.MAX_FILE_SIZE,
+            )
     except Exception as e:
         print(f"Error converting document: {e}")
-        # Try to cleanup if failed
-        if os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-            except:
-                pass
         raise e
+
+    if result.status == ConversionStatus.SUCCESS:
+        conversion_cache.set(cache_key, json.dumps(result.document.export_to_dict()).encode("utf-8"))
+    return result
+
+
+def count_pages(file_bytes, filename):
+    """Page count of a PDF upload; None for other formats."""
+    if os.path.splitext(filename)[1].lower() != ".pdf":
+        return None
+    import pypdfium2
+
+    pdf = pypdfium2.PdfDocument(file_bytes)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def convert_document_paged(file_bytes, filename, use_ocr=True, chunk_pages=None, progress=None):
+    """
+    ``convert_document`` in page ranges, for progress reporting.
+
+    PDFs longer than ``chunk_pages`` (default ``config.JOB_PAGE_CHUNK``) are
+    converted ``chunk_pages`` at a time and the parts concatenated; other
+    documents in one call. Results go through the same conversion cache.
+
+    Args:
+        progress (callable): called as progress(pages_done, pages_total)
+            before the first range and after each one; pages_total is None
+            for formats without pages.
+
+    Returns:
+        ConversionResult or CachedConversion (both expose ``document``)
+    """
+    chunk_pages = chunk_pages or config.JOB_PAGE_CHUNK
+    progress = progress or (lambda done, total: None)
+    total = count_pages(file_bytes, filename)
+    # Documents over MAX_PAGES are refused by Docling as a whole; let convert_document report it.
+    if total is None or total <= chunk_pages or total > config.MAX_PAGES:
+        progress(0, total)
+        result = convert_document(file_bytes, filename, use_ocr)
+        progress(total, total)
+        return result
+
+    cache_key = conversion_cache_key(file_bytes, filename, use_ocr)
+    cached = conversion_cache.get(cache_key, source_bytes=len(file_bytes))
+    if cached is not None:
+        progress(total, total)
+        return CachedConversion(DoclingDocument.model_validate_json(cached), cache_key)
+
+    progress(0, total)
+    converter = get_converter(use_ocr=use_ocr)
+    parts = []
+    with _document_source(file_bytes, filename) as source:
+        for first in range(1, total + 1, chunk_pages):
+            last = min(first + chunk_pages - 1, total)
+            if isinstance(source, DocumentStream):
+                source.stream.seek(0)
+            result = converter.convert(
+                source,
+                max_num_pages=config.MAX_PAGES,
+                max_file_size=config.MAX_FILE_SIZE,
+                page_range=(first, last),
+            )
+            if result.status != ConversionStatus.SUCCESS:
+                raise RuntimeError(f"Conversion of pages {first}-{last} ended with status {result.status}")
+            parts.append(result.document)
+            progress(last, total)
+
+    document = DoclingDocument.concatenate(parts)
+    conversion_cache.set(cache_key, json.dumps(document.export_to_dict()).encode("utf-8"))
+    return CachedConversion(document, cache_key)
+
+
+def format_output(result, output_format: str):
+    """Return (content_string, mimetype, extension)."""
+    fmt = output_format.lower()
+    if fmt == "markdown":
+        content = result.document.export_to_markdown()
+        return content, "text/markdown", "md"
+    elif fmt == "json":
+        data = result.document.export_to_dict()
+        content = json.dumps(data, indent=2, default=str)
+        return content, "application/json", "json"
+    elif fmt == "yaml":
+        data = result.document.export_to_dict()
+        content = yaml.safe_dump(data, default_flow_style=False)
+        return content, "text/yaml", "yaml"
+    else:
+        raise ValueError(f"Unsupported output format: {fmt}")
+
+
+# ---------------------------------------------------------------------------
+# Batch conversion
+# ---------------------------------------------------------------------------
+
+# Warmed worker processes for /api/convert/batch (services/conversion_pool.py);
+# created lazily, or up front by start_conversion_pool().
+conversion_pool = ConversionPool(config.CONVERSION_WORKERS, config.CONVERSION_TIMEOUT_SECONDS)
+
+
+def start_conversion_pool():
+    if config.CONVERSION_WORKERS > 0:
+        conversion_pool.start()
+
+
+def convert_batch(files, use_ocr=True, output_format="markdown"):
+    """
+    Convert and format several uploads, in parallel when CONVERSION_WORKERS > 0.
+
+    Args:
+        files (list): (file_bytes, filename) tuples.
+
+    Returns:
+        list[dict]: per file, in order, {"success": True, "content",
+        "mimetype", "ext"} or {"success": False, "error"}.
+    """
+    if config.CONVERSION_WORKERS <= 0:
+        return [convert_file(file_bytes, filename, use_ocr, output_format) for file_bytes, filename in files]
+    return conversion_pool.map(files, use_ocr, output_format)
+
+
+def iter_convert_batch(files, use_ocr=True, output_format="markdown"):
+    """
+    ``convert_batch`` as a generator of (index, result) in completion order,
+    so each output can be sent and dropped before the next one is held.
+    """
+    if config.CONVERSION_WORKERS <= 0:
+        for index, (file_bytes, filename) in enumerate(files):
+            yield index, convert_file(file_bytes, filename, use_ocr, output_format)
+        return
+    yield from conversion_pool.imap_unordered(files, use_ocr, output_format)
+
+
+# ---------------------------------------------------------------------------
+# Upload folder janitor
+# ---------------------------------------------------------------------------
+
+def purge_stale_uploads(max_age=None, folder=None):
+    """
+    Delete files in the upload folder older than ``max_age`` seconds
+    (leftovers of crashed workers and of older versions, which kept every
+    upload).
+
+    Returns:
+        tuple: (files removed, bytes freed)
+    """
+    max_age = config.UPLOAD_MAX_AGE_SECONDS if max_age is None else max_age
+    folder = folder or config.UPLOAD_FOLDER
+    cutoff = time.time() - max_age
+    removed = freed = 0
+    try:
+        entries = list(os.scandir(folder))
+    except FileNotFoundError:
+        return 0, 0
+    for entry in entries:
+        try:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            st = entry.stat(follow_symlinks=False)
+            if st.st_mtime >= cutoff:
+                continue
+            os.remove(entry.path)
+        except FileNotFoundError:
+            continue  # removed concurrently
+        except OSError as e:
+            print(f"Could not remove stale upload {entry.path}: {e}")
+            continue
+        removed += 1
+        freed += st.st_size
+    return removed, freed
+
+
+_janitor = None
+
+
+def start_upload_janitor(interval=None):
+    """Purge stale uploads now and then every ``interval`` seconds in a daemon thread (once per process)."""
+    global _janitor
+    if _janitor is not None:
+        return _janitor
+    interval = config.UPLOAD_JANITOR_INTERVAL if interval is None else interval
+
+    def run():
+        while True:
+            removed, freed = purge_stale_uploads()
+            if removed:
+                print(f"Upload janitor removed {removed} stale files ({freed / 1e6:.1f} MB)")
+            time.sleep(interval)
+
+    _janitor = threading.Thread(target=run, name="upload-janitor", daemon=True)
+    _janitor.start()
+    return _janitor
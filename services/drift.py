@@ -0,0 +1,370 @@
+"""
+Online input / score drift monitor over the prediction audit log.
+
+The reference distribution is built once offline from the training data
+(and the active model's probabilities on it):
+
+    python -m services.drift build-reference
+    python -m services.drift status
+
+Every monitored field has fixed bins taken from the reference: decile
+edges for numeric inputs and the probability, one bin per known category
+(plus ``__other__``) for dispute_type and jurisdiction. Live traffic is
+counted into the same bins by tailing ``logs/prediction_audit.jsonl`` from
+the last byte offset read, so memory is constant and each update only
+parses the entries appended since the previous one. PSI and a binned KS
+statistic are computed from the counts on demand.
+
+Counts and the audit offset are saved to a small state file after each
+update, so a restarted process resumes where it stopped instead of
+re-reading the whole log.
+"""
+import os
+import sys
+import json
+import math
+import time
+import bisect
+import argparse
+import threading
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REFERENCE_PATH = os.path.join(BASE_DIR, "model", "drift_reference.json")
+STATE_PATH = os.path.join(BASE_DIR, "logs", "drift_state.json")
+AUDIT_LOG_PATH = os.path.join(BASE_DIR, "logs", "prediction_audit.jsonl")
+
+NUMERIC_FIELDS = ("claim_amount", "delay_days", "document_count")
+CATEGORICAL_FIELDS = ("dispute_type", "jurisdiction")
+SCORE_FIELD = "probability"
+OTHER = "__other__"
+
+# Conventional PSI reading: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 major shift.
+PSI_WARN = 0.1
+PSI_ALERT = 0.25
+MIN_OBSERVATIONS = 100
+_EPSILON = 1e-4  # floor for empty bins in PSI
+
+
+def _decile_edges(values):
+    import numpy as np
+
+    edges = np.unique(np.quantile(np.asarray(values, dtype=np.float64), np.linspace(0.1, 0.9, 9)))
+    return [round(float(e), 6) for e in edges]
+
+
+def _numeric_reference(values, edges):
+    import numpy as np
+
+    counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+    return {"kind": "numeric", "edges": edges, "proportions": _proportions(counts.tolist())}
+
+
+def _categorical_reference(series):
+    counts = series.astype(str).value_counts()
+    categories = sorted(counts.index.tolist())
+    return {
+        "kind": "categorical",
+        "categories": categories,
+        "proportions": _proportions([int(counts[c]) for c in categories] + [0]),
+    }
+
+
+def _proportions(counts):
+    total = sum(counts)
+    return [round(c / total, 6) if total else 0.0 for c in counts]
+
+
+def build_reference(df, probabilities, model_version=None):
+    """
+    Reference bins and proportions for every monitored field.
+
+    Args:
+        df (DataFrame): training cases with the NUMERIC_FIELDS and CATEGORICAL_FIELDS.
+        probabilities (array): the model's probability for each row of ``df``.
+
+    Returns:
+        dict: JSON-serializable reference artifact.
+    """
+    fields = {}
+    for name in NUMERIC_FIELDS:
+        values = df[name].to_numpy(dtype=float)
+        fields[name] = _numeric_reference(values, _decile_edges(values))
+    for name in CATEGORICAL_FIELDS:
+        fields[name] = _categorical_reference(df[name])
+    fields[SCORE_FIELD] = _numeric_reference(probabilities, _decile_edges(probabilities))
+    return {
+        "built_at": datetime.now().isoformat(),
+        "rows": int(len(df)),
+        "model_version": model_version,
+        "fields": fields,
+    }
+
+
+def psi(expected, actual):
+    """Population stability index between two proportion vectors."""
+    total = 0.0
+    for e, a in zip(expected, actual):
+        e, a = max(e, _EPSILON), max(a, _EPSILON)
+        total += (a - e) * math.log(a / e)
+    return total
+
+
+def binned_ks(expected, actual):
+    """Largest CDF gap over the bin edges (KS statistic on the binned data)."""
+    gap = cdf_e = cdf_a = 0.0
+    for e, a in zip(expected, actual):
+        cdf_e += e
+        cdf_a += a
+        gap = max(gap, abs(cdf_e - cdf_a))
+    return gap
+
+
+class DriftMonitor:
+    """Streaming bin counts of live traffic against a reference artifact."""
+
+    def __init__(self, reference, state_path=STATE_PATH, audit_path=AUDIT_LOG_PATH):
+        self.reference = reference
+        self.fields = reference["fields"]
+        self.state_path = state_path
+        self.audit_path = audit_path
+        self._category_index = {
+            name: {c: i for i, c in enumerate(spec["categories"])}
+            for name, spec in self.fields.items() if spec["kind"] == "categorical"
+        }
+        self._lock = threading.Lock()
+        self._last_update = 0.0
+        self._reset_counts()
+        self.offset = 0
+        self._load_state()
+
+    @classmethod
+    def load(cls, reference_path=REFERENCE_PATH, **kwargs):
+        """Monitor for the reference at ``reference_path``, or None when it has not been built."""
+        if not os.path.exists(reference_path):
+            return None
+        with open(reference_path) as f:
+            return cls(json.load(f), **kwargs)
+
+    def _reset_counts(self):
+        self.counts = {name: [0] * len(spec["proportions"]) for name, spec in self.fields.items()}
+        self.observations = 0
+        self.skipped = 0
+        self.since = datetime.now().isoformat()
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable drift state {self.state_path}: {e}")
+            return
+        # Counts are only meaningful against the bins they were taken with.
+        if state.get("reference_built_at") != self.reference["built_at"]:
+            return
+        self.counts = state["counts"]
+        self.observations = state["observations"]
+        self.skipped = state.get("skipped", 0)
+        self.since = state["since"]
+        self.offset = state["audit_offset"]
+
+    def _save_state(self):
+        state = {
+            "reference_built_at": self.reference["built_at"],
+            "audit_offset": self.offset,
+            "observations": self.observations,
+            "skipped": self.skipped,
+            "since": self.since,
+            "counts": self.counts,
+        }
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp_path, self.state_path)
+
+    def _bin(self, name, value):
+        spec = self.fields[name]
+        if spec["kind"] == "categorical":
+            return self._category_index[name].get(str(value), len(spec["categories"]))
+        return bisect.bisect_right(spec["edges"], float(value))
+
+    def observe(self, inputs, probability):
+        """Count one prediction (audit ``inputs`` dict plus its probability)."""
+        try:
+            bins = {name: self._bin(name, inputs[name]) for name in NUMERIC_FIELDS + CATEGORICAL_FIELDS}
+            bins[SCORE_FIELD] = self._bin(SCORE_FIELD, probability)
+        except (KeyError, TypeError, ValueError):
+            self.skipped += 1
+            return
+        for name, index in bins.items():
+            self.counts[name][index] += 1
+        self.observations += 1
+
+    def update(self):
+        """
+        Count the audit entries appended since the last update and save the state.
+
+        Returns:
+            int: number of entries read.
+        """
+        with self._lock:
+            self._last_update = time.monotonic()
+            if not os.path.exists(self.audit_path):
+                return 0
+            if os.path.getsize(self.audit_path) < self.offset:
+                self.offset = 0  # log was truncated or rotated
+            read = 0
+            with open(self.audit_path, "rb") as f:
+                f.seek(self.offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # partially written entry; picked up next time
+                    self.offset += len(line)
+                    try:
+                        entry = json.loads(line)
+                        self.observe(entry["inputs"], entry["prediction"]["probability"])
+                    except (ValueError, KeyError, TypeError):
+                        self.skipped += 1
+                    read += 1
+            if read:
+                self._save_state()
+            return read
+
+    def maybe_update(self, interval):
+        """
+        Start ``update()`` in a background thread if more than ``interval``
+        seconds passed since the last one. Never blocks: called from the
+        prediction path, which must not wait on the log tail.
+
+        Returns:
+            threading.Thread or None: the update thread, if one was started.
+        """
+        if time.monotonic() - self._last_update < interval:
+            return None
+        if not self._lock.acquire(blocking=False):
+            return None  # an update is running
+        try:
+            if time.monotonic() - self._last_update < interval:
+                return None
+            self._last_update = time.monotonic()  # claims this interval for one thread
+        finally:
+            self._lock.release()
+        thread = threading.Thread(target=self._background_update, name="drift-update", daemon=True)
+        thread.start()
+        return thread
+
+    def _background_update(self):
+        try:
+            self.update()
+        except Exception as e:
+            print(f"Drift update failed: {e}")
+
+    def reset(self):
+        """Drop the live counts; counting restarts from the current end of the log."""
+        with self._lock:
+            self._reset_counts()
+            self.offset = os.path.getsize(self.audit_path) if os.path.exists(self.audit_path) else 0
+            self._save_state()
+
+    def report(self):
+        """
+        Drift scores per field.
+
+        Returns:
+            dict: observations, overall status and, per field, psi, ks (None
+            for categorical fields), status and the live vs reference
+            proportions per bin.
+        """
+        with self._lock:
+            counts = {name: list(c) for name, c in self.counts.items()}
+            observations, skipped, since = self.observations, self.skipped, self.since
+
+        fields = {}
+        for name, spec in self.fields.items():
+            actual = _proportions(counts[name])
+            expected = spec["proportions"]
+            score = psi(expected, actual) if observations else None
+            if observations < MIN_OBSERVATIONS:
+                status = "insufficient_data"
+            else:
+                status = "alert" if score > PSI_ALERT else "warn" if score > PSI_WARN else "ok"
+            fields[name] = {
+                "psi": None if score is None else round(score, 4),
+                "ks": round(binned_ks(expected, actual), 4) if observations and spec["kind"] == "numeric" else None,
+                "status": status,
+                "bins": spec["categories"] + [OTHER] if spec["kind"] == "categorical" else spec["edges"],
+                "live": actual,
+                "reference": expected,
+            }
+
+        statuses = {f["status"] for f in fields.values()}
+        overall = next((s for s in ("alert", "warn", "ok") if s in statuses), "insufficient_data")
+        return {
+            "status": overall,
+            "observations": observations,
+            "skipped": skipped,
+            "since": since,
+            "reference": {
+                "built_at": self.reference["built_at"],
+                "rows": self.reference["rows"],
+                "model_version": self.reference["model_version"],
+            },
+            "thresholds": {"psi_warn": PSI_WARN, "psi_alert": PSI_ALERT, "min_observations": MIN_OBSERVATIONS},
+            "fields": fields,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Input / score drift monitor.")
+    parser.add_argument("--reference", default=REFERENCE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build-reference", help="bin the training data and the model's scores on it")
+    build.add_argument("--data", default=None,
+                       help="columnar store directory or JSON export (default: store if built, else JSON)")
+    build.add_argument("--sample", type=int, default=50_000, help="rows to score (0 = all)")
+    build.add_argument("--seed", type=int, default=0)
+    sub.add_parser("status", help="read new audit entries and print the drift report")
+    sub.add_parser("reset", help="clear the live counts")
+    args = parser.parse_args(argv)
+
+    if args.command == "build-reference":
+        from services.dataset_store import load_cases_frame
+        from services.prediction import get_active_bundle, encode_cases, score_matrix
+
+        df = load_cases_frame(list(NUMERIC_FIELDS + CATEGORICAL_FIELDS), args.data)
+        if args.sample and args.sample < len(df):
+            df = df.sample(n=args.sample, random_state=args.seed)
+        bundle = get_active_bundle()
+        cases = df.astype({name: str for name in CATEGORICAL_FIELDS}).to_dict("records")
+        X, positions, errors = encode_cases(cases, bundle)
+        probabilities, _ = score_matrix(X, bundle, contributions="none")
+        reference = build_reference(df.iloc[positions], probabilities, model_version=bundle.version)
+        with open(args.reference, "w") as f:
+            json.dump(reference, f, indent=1)
+        print(f"Wrote {args.reference} from {reference['rows']} cases "
+              f"(model {bundle.version}, {len(errors)} skipped)")
+        return 0
+
+    monitor = DriftMonitor.load(args.reference)
+    if monitor is None:
+        print(f"No drift reference at {args.reference}; run `python -m services.drift build-reference` first.")
+        return 1
+    if args.command == "reset":
+        monitor.reset()
+        print("Drift counts cleared.")
+        return 0
+
+    read = monitor.update()
+    report = monitor.report()
+    print(f"{report['status']}: {report['observations']} predictions since {report['since']} "
+          f"({read} new, {report['skipped']} skipped)")
+    for name, field in report["fields"].items():
+        ks = "" if field["ks"] is None else f"  ks={field['ks']:.3f}"
+        print(f"  {name:<16} psi={field['psi'] if field['psi'] is not None else '-'}{ks}  {field['status']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
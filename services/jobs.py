@@ -0,0 +1,422 @@
+"""
+Asynchronous document conversion jobs on a persistent SQLite queue.
+
+``POST /api/jobs/convert`` stores the upload under
+``RESULT_FOLDER/jobs/<id>/`` and inserts a queued row into
+``RESULT_FOLDER/jobs/jobs.sqlite3``, then returns at once. Worker
+processes, separate from the web server's request threads, claim the
+oldest queued job in a write transaction, convert it in page ranges
+(``convert_document_paged``), record pages done / total after each range
+and write the formatted result next to the input. ``GET /api/jobs/<id>``
+reads the row; ``GET /api/jobs/<id>/result`` sends the result file.
+
+Every progress update renews the job's lease. A running job whose lease
+expired (its worker crashed, was restarted or hangs) goes back to the
+queue, up to JOB_MAX_ATTEMPTS claims; updates from a worker that lost its
+claim are ignored. Since the queue and the files are on disk, queued and
+interrupted jobs survive a restart of the web app or the workers.
+
+Workers run separately from the web processes:
+
+    python -m services.jobs worker --workers 2
+    python -m services.jobs list
+
+or, with JOB_WORKERS > 0, are spawned by the web app's
+``start_background_services()`` (never at import).
+"""
+import os
+import sys
+import time
+import uuid
+import shutil
+import socket
+import sqlite3
+import argparse
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+
+JOBS_DIR = os.path.join(config.RESULT_FOLDER, "jobs")
+DB_FILE = "jobs.sqlite3"
+JOB_STATUSES = ("queued", "running", "done", "failed")
+POLL_SECONDS = 1.0
+SUPERVISE_SECONDS = 5.0
+PURGE_SECONDS = 3600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    input_file TEXT NOT NULL,
+    use_ocr INTEGER NOT NULL,
+    output_format TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    pages_done INTEGER NOT NULL DEFAULT 0,
+    pages_total INTEGER,
+    result_file TEXT,
+    result_mimetype TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+class ClaimLost(Exception):
+    """Raised from a job's progress callback once its lease was given to another worker."""
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobStore:
+    """Job rows in SQLite plus one directory of files per job; safe to share between processes."""
+
+    def __init__(self, root=JOBS_DIR):
+        self.root = root
+        self.db_path = os.path.join(root, DB_FILE)
+        os.makedirs(root, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # Autocommit; multi-statement updates open their own transaction.
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction taken up front, so two workers never claim the same job."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def job_dir(self, job_id):
+        return os.path.join(self.root, job_id)
+
+    def submit(self, file_bytes, filename, use_ocr=True, output_format="markdown"):
+        """Store the upload and queue a job for it; returns the job dict."""
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id))
+        input_file = "input" + os.path.splitext(filename)[1].lower()
+        tmp_path = os.path.join(self.job_dir(job_id), input_file + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(file_bytes)
+        os.replace(tmp_path, os.path.join(self.job_dir(job_id), input_file))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, filename, input_file, use_ocr, output_format, created_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, filename, input_file, int(bool(use_ocr)), output_format, time.time()),
+            )
+        return self.get(job_id)
+
+    def _row(self, job_id):
+        with self._connect() as conn:
+            return conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def get(self, job_id):
+        """
+        Job status as returned by GET /api/jobs/<id>, or None for an unknown id.
+
+        Returns:
+            dict: id, status, filename, output_format, attempts, progress
+            {pages_done, pages_total}, error and timestamps.
+        """
+        row = self._row(job_id)
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "status": row["status"],
+            "filename": row["filename"],
+            "output_format": row["output_format"],
+            "use_ocr": bool(row["use_ocr"]),
+            "attempts": row["attempts"],
+            "progress": {"pages_done": row["pages_done"], "pages_total": row["pages_total"]},
+            "error": row["error"],
+            "created_at": _iso(row["created_at"]),
+            "started_at": _iso(row["started_at"]),
+            "finished_at": _iso(row["finished_at"]),
+        }
+
+    def list(self, limit=50):
+        with self._connect() as conn:
+            ids = [r["id"] for r in conn.execute("SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))]
+        return [self.get(job_id) for job_id in ids]
+
+    def counts(self):
+        with self._connect() as conn:
+            found = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: found.get(status, 0) for status in JOB_STATUSES}
+
+    def claim(self, worker):
+        """
+        Mark the oldest queued job as running for ``worker``.
+
+        Returns:
+            sqlite3.Row: the claimed job, or None when the queue is empty.
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                "started_at = ?, heartbeat_at = ?, error = NULL WHERE id = ?",
+                (worker, now, now, row["id"]),
+            )
+        return self._row(row["id"])
+
+    def _update_claimed(self, job_id, worker, assignments, values):
+        """UPDATE a running job only while ``worker`` still holds it; False if it lost the claim."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND worker = ? AND status = 'running'",
+                (*values, job_id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def progress(self, job_id, worker, pages_done, pages_total):
+        return self._update_claimed(
+            job_id, worker, "pages_done = ?, pages_total = ?, heartbeat_at = ?",
+            (pages_done or 0, pages_total, time.time()),
+        )
+
+    def finish(self, job_id, worker, result_file, mimetype):
+        return self._update_claimed(
+            job_id, worker, "status = 'done', result_file = ?, result_mimetype = ?, finished_at = ?",
+            (result_file, mimetype, time.time()),
+        )
+
+    def fail(self, job_id, worker, error):
+        return self._update_claimed(
+            job_id, worker, "status = 'failed', error = ?, finished_at = ?", (error, time.time()),
+        )
+
+    def result(self, job_id):
+        """(path, mimetype, download name) of a finished job, None otherwise."""
+        row = self._row(job_id)
+        if row is None or row["status"] != "done":
+            return None
+        stem = os.path.splitext(row["filename"])[0]
+        ext = os.path.splitext(row["result_file"])[1]
+        return os.path.join(self.job_dir(job_id), row["result_file"]), row["result_mimetype"], stem + ext
+
+    def requeue_stale(self, lease, max_attempts):
+        """
+        Release running jobs whose lease expired: back to the queue, or
+        failed after ``max_attempts`` claims.
+
+        Returns:
+            list[tuple]: (job id, worker that held it) per released job.
+        """
+        with self._transaction() as conn:
+            stale = conn.execute(
+                "SELECT id, worker, attempts FROM jobs WHERE status = 'running' AND heartbeat_at < ?",
+                (time.time() - lease,),
+            ).fetchall()
+            for row in stale:
+                if row["attempts"] >= max_attempts:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', worker = NULL, finished_at = ?, error = ? WHERE id = ?",
+                        (time.time(), f"Gave up after {row['attempts']} attempts (no progress for {lease:g}s)",
+                         row["id"]),
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'queued', worker = NULL, pages_done = 0, pages_total = NULL "
+                        "WHERE id = ?",
+                        (row["id"],),
+                    )
+        return [(row["id"], row["worker"]) for row in stale]
+
+    def purge(self, retention):
+        """Delete finished jobs older than ``retention`` seconds with their files; returns how many."""
+        with self._connect() as conn:
+            ids = [r["id"] for r in conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (time.time() - retention,),
+            )]
+            for job_id in ids:
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        for job_id in ids:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+        return len(ids)
+
+
+def convert_job(file_bytes, filename, use_ocr, output_format, progress):
+    """Convert and format one job's upload; returns (content, mimetype, ext)."""
+    from services.document import convert_document_paged, format_output
+
+    result = convert_document_paged(file_bytes, filename, use_ocr, progress=progress)
+    return format_output(result, output_format)
+
+
+def process_next(store, worker=None, convert=convert_job):
+    """
+    Claim and run one queued job. ``convert``'s progress callback raises
+    ClaimLost once the job's lease has been released, so a worker that was
+    presumed dead stops converting instead of finishing the whole document.
+
+    Returns:
+        bool: False when the queue was empty.
+    """
+    worker = worker or worker_id()
+    job = store.claim(worker)
+    if job is None:
+        return False
+    job_dir = store.job_dir(job["id"])
+
+    def progress(done, total):
+        if not store.progress(job["id"], worker, done, total):
+            raise ClaimLost(job["id"])
+
+    try:
+        with open(os.path.join(job_dir, job["input_file"]), "rb") as f:
+            file_bytes = f.read()
+        content, mimetype, ext = convert(
+            file_bytes, job["filename"], bool(job["use_ocr"]), job["output_format"], progress,
+        )
+        result_file = f"result.{ext}"
+        tmp_path = os.path.join(job_dir, result_file + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, os.path.join(job_dir, result_file))
+        store.finish(job["id"], worker, result_file, mimetype)
+    except ClaimLost:
+        # Requeued (or failed) by the supervisor: another attempt owns it now.
+        print(f"Conversion job {job['id']} lost its lease; abandoned")
+    except Exception as e:
+        print(f"Conversion job {job['id']} failed: {e}")
+        store.fail(job["id"], worker, str(e))
+    return True
+
+
+def worker_main(root=JOBS_DIR, poll=POLL_SECONDS, warm=True):
+    """Worker process loop: warm the converters once, then take jobs until killed."""
+    if warm:
+        from services.conversion_pool import _warm_converters
+        _warm_converters()
+    store = JobStore(root)
+    while True:
+        if not process_next(store):
+            time.sleep(poll)
+
+
+class JobRunner:
+    """
+    Starts the worker processes and supervises them: releases jobs with an
+    expired lease (killing our own worker if it still holds one), respawns
+    workers that died and purges old jobs.
+    """
+
+    def __init__(self, root=JOBS_DIR, workers=None, lease=None, max_attempts=None, retention=None):
+        self.root = root
+        self.workers = config.JOB_WORKERS if workers is None else workers
+        self.lease = config.JOB_LEASE_SECONDS if lease is None else lease
+        self.max_attempts = config.JOB_MAX_ATTEMPTS if max_attempts is None else max_attempts
+        self.retention = config.JOB_RETENTION_SECONDS if retention is None else retention
+        self.store = JobStore(root)
+        self._context = multiprocessing.get_context("spawn")
+        self._processes = []
+        self._supervisor = None
+        self._last_purge = 0.0
+
+    def _spawn(self):
+        process = self._context.Process(target=worker_main, args=(self.root,), name="conversion-job-worker",
+                                        daemon=True)
+        process.start()
+        return process
+
+    def supervise_once(self):
+        host = socket.gethostname()
+        ours = {f"{host}:{p.pid}": p for p in self._processes}
+        for job_id, worker in self.store.requeue_stale(self.lease, self.max_attempts):
+            print(f"Conversion job {job_id} lost its lease (worker {worker}); released")
+            if worker in ours and ours[worker].is_alive():
+                ours[worker].terminate()  # hung: it would keep the slot forever
+        for i, process in enumerate(self._processes):
+            if not process.is_alive():
+                process.join(timeout=0)
+                self._processes[i] = self._spawn()
+        if time.monotonic() - self._last_purge >= PURGE_SECONDS:
+            self._last_purge = time.monotonic()
+            self.store.purge(self.retention)
+
+    def start(self):
+        """Spawn the workers and the supervisor thread (no-op with 0 workers or when started)."""
+        if self.workers <= 0 or self._supervisor is not None:
+            return
+        self._processes = [self._spawn() for _ in range(self.workers)]
+
+        def run():
+            while True:
+                time.sleep(SUPERVISE_SECONDS)
+                try:
+                    self.supervise_once()
+                except Exception as e:
+                    print(f"Job supervisor error: {e}")
+
+        self._supervisor = threading.Thread(target=run, name="conversion-job-supervisor", daemon=True)
+        self._supervisor.start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Asynchronous conversion jobs.")
+    parser.add_argument("--root", default=JOBS_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("worker", help="run conversion workers in the foreground")
+    run.add_argument("--workers", type=int, default=max(1, config.JOB_WORKERS))
+    sub.add_parser("list", help="show recent jobs")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        store = JobStore(args.root)
+        print(", ".join(f"{status}: {n}" for status, n in store.counts().items()))
+        for job in store.list():
+            progress = job["progress"]
+            print(f"{job['id']}  {job['status']:<8} {progress['pages_done']}/{progress['pages_total'] or '?'}  "
+                  f"{job['filename']}{'  ' + job['error'] if job['error'] else ''}")
+        return 0
+
+    runner = JobRunner(args.root, workers=args.workers)
+    runner.start()
+    print(f"{args.workers} conversion job workers running on {args.root}; Ctrl-C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
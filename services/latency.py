@@ -0,0 +1,122 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Bucket upper bounds in milliseconds: 10µs to ~5.6 minutes, four buckets per
+# doubling, so a reported percentile is within ~19% of the true value.
+_MIN_MS = 0.01
+_BUCKETS_PER_DOUBLING = 4
+_N_BUCKETS = 25 * _BUCKETS_PER_DOUBLING + 1
+BUCKET_BOUNDS_MS = [_MIN_MS * 2 ** (i / _BUCKETS_PER_DOUBLING) for i in range(_N_BUCKETS)]
+
+
+class LatencyHistogram:
+    """Fixed log-spaced latency buckets with count, sum, min and max."""
+
+    def __init__(self):
+        self.counts = [0] * (_N_BUCKETS + 1)   # last bucket catches overflow
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = math.inf
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        if ms <= _MIN_MS:
+            index = 0
+        else:
+            index = min(_N_BUCKETS, math.ceil(math.log2(ms / _MIN_MS) * _BUCKETS_PER_DOUBLING))
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.min_ms = min(self.min_ms, ms)
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile (0-1), clamped to the observed range."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                bound = BUCKET_BOUNDS_MS[index] if index < _N_BUCKETS else self.max_ms
+                return min(max(bound, self.min_ms), self.max_ms)
+        return self.max_ms
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3),
+            "p50_ms": round(self.percentile(0.50), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "p99_ms": round(self.percentile(0.99), 3),
+            "min_ms": round(self.min_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class LatencyRegistry:
+    """
+    Named latency histograms shared by all request threads.
+
+    Memory is fixed per stage name (one bucket array), however many
+    observations are recorded.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, ms):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.observe(ms)
+
+    def snapshot(self):
+        """{stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, min_ms, max_ms}}"""
+        with self._lock:
+            return {name: h.summary() for name, h in sorted(self._histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+class StageTimer:
+    """
+    Monotonic per-request stage timings.
+
+    Each finished stage is kept in ``timings`` (milliseconds) and, when a
+    registry is given, recorded in its histogram under ``<prefix><stage>``.
+    """
+
+    def __init__(self, registry=None, prefix=""):
+        self.registry = registry
+        self.prefix = prefix
+        self.timings = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def record(self, name, ms):
+        self.timings[name] = round(self.timings.get(name, 0.0) + ms, 3)
+        if self.registry is not None:
+            self.registry.observe(self.prefix + name, ms)
+
+    def finish(self, name="total"):
+        """Record the time since the timer was created as ``name``; returns it in ms."""
+        ms = (time.perf_counter() - self._start) * 1000
+        self.record(name, ms)
+        return ms
@@ -0,0 +1,287 @@
+"""
+Versioned model registry.
+
+Layout under ``model/registry/``::
+
+    active.json                 {"version": "<version>", "activated_at": ...}
+    <version>/manifest.json     version, artifact hashes, features, threshold, class lists
+    <version>/xgb_model.pkl
+    <version>/dispute_encoder.pkl
+    <version>/state_encoder.pkl
+    <version>/xgb_forest.npz    optional, see services/tree_evaluator.py
+
+``active.json`` is replaced atomically (write + os.replace), so a reader
+either sees the old pointer or the new one. The prediction service watches
+it and swaps its in-memory bundle when it changes.
+
+    python -m services.model_registry list
+    python -m services.model_registry register --version 2026.10.1 --activate
+    python -m services.model_registry activate 2026.10.1
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from services.category_encoding import CategoryCodes
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REGISTRY_DIR = os.path.join(BASE_DIR, "model", "registry")
+ACTIVE_FILE = "active.json"
+MANIFEST_FILE = "manifest.json"
+
+# Feature order the service builds rows in; every registered model must match it.
+FEATURES = [
+    "claim_amount",
+    "delay_days",
+    "document_count",
+    "document_completeness_score",
+    "dispute_type_enc",
+    "jurisdiction_enc"
+]
+DEFAULT_THRESHOLD = 0.607
+
+ARTIFACT_FILES = {
+    "model": "xgb_model.pkl",
+    "dispute_encoder": "dispute_encoder.pkl",
+    "state_encoder": "state_encoder.pkl",
+}
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+@dataclass
+class ModelBundle:
+    """Everything one prediction needs, swapped as a single reference."""
+    version: str
+    fingerprint: str            # short hash of the model artifact
+    model: Any
+    dispute_encoder: Any
+    state_encoder: Any
+    threshold: float
+    features: List[str]
+    dispute_types: List[str]
+    jurisdictions: List[str]
+    forest_path: Optional[str] = None
+    forest: Any = None
+    triage: Any = None          # TriageScorer, loaded on first use (services/triage.py)
+    manifest: Dict[str, Any] = field(default_factory=dict)
+    loaded_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    # Dict lookup tables derived from the encoders (services/category_encoding.py)
+    dispute_codes: Any = None
+    state_codes: Any = None
+
+    def __post_init__(self):
+        if self.dispute_codes is None:
+            self.dispute_codes = CategoryCodes.from_encoder("dispute_type", self.dispute_encoder)
+        if self.state_codes is None:
+            self.state_codes = CategoryCodes.from_encoder("jurisdiction", self.state_encoder)
+
+
+def load_bundle(version, model_path, dispute_enc_path, state_enc_path, threshold, features,
+                forest_path=None, manifest=None, expected_hashes=None):
+    """
+    Load pickled artifacts into a ModelBundle.
+
+    Args:
+        expected_hashes (dict): optional sha256 per artifact key; a mismatch
+            raises ValueError before anything is unpickled.
+    """
+    import joblib
+
+    if list(features) != FEATURES:
+        raise ValueError(f"Model version {version} expects features {features}, service builds {FEATURES}")
+
+    paths = {"model": model_path, "dispute_encoder": dispute_enc_path, "state_encoder": state_enc_path}
+    hashes = {key: file_sha256(path) for key, path in paths.items()}
+    for key, expected in (expected_hashes or {}).items():
+        if hashes.get(key) != expected:
+            raise ValueError(f"Hash mismatch for {key} in model version {version}")
+
+    dispute_encoder = joblib.load(dispute_enc_path)
+    state_encoder = joblib.load(state_enc_path)
+    return ModelBundle(
+        version=version,
+        fingerprint=hashes["model"][:12],
+        model=joblib.load(model_path),
+        dispute_encoder=dispute_encoder,
+        state_encoder=state_encoder,
+        threshold=float(threshold),
+        features=list(features),
+        dispute_types=sorted(dispute_encoder.classes_.tolist()),
+        jurisdictions=sorted(state_encoder.classes_.tolist()),
+        forest_path=forest_path,
+        manifest=manifest or {},
+    )
+
+
+class ModelRegistry:
+    """Directory of immutable model versions plus an atomically swapped active pointer."""
+
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+
+    @property
+    def active_path(self):
+        return os.path.join(self.root, ACTIVE_FILE)
+
+    def version_dir(self, version):
+        return os.path.join(self.root, version)
+
+    def list_versions(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, MANIFEST_FILE))
+        )
+
+    def active_version(self):
+        """Version named in active.json, or None when the registry is empty."""
+        try:
+            with open(self.active_path) as f:
+                return json.load(f).get("version")
+        except FileNotFoundError:
+            return None
+
+    def active_stamp(self):
+        """Cheap change marker for active.json (mtime + size), None if absent."""
+        try:
+            st = os.stat(self.active_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def read_manifest(self, version):
+        with open(os.path.join(self.version_dir(version), MANIFEST_FILE)) as f:
+            return json.load(f)
+
+    def load(self, version):
+        """Load and hash-verify one registered version."""
+        manifest = self.read_manifest(version)
+        vdir = self.version_dir(version)
+        artifacts = manifest["artifacts"]
+        forest_path = os.path.join(vdir, "xgb_forest.npz")
+        return load_bundle(
+            version=manifest["version"],
+            model_path=os.path.join(vdir, artifacts["model"]["file"]),
+            dispute_enc_path=os.path.join(vdir, artifacts["dispute_encoder"]["file"]),
+            state_enc_path=os.path.join(vdir, artifacts["state_encoder"]["file"]),
+            threshold=manifest["threshold"],
+            features=manifest["features"],
+            forest_path=forest_path,
+            manifest=manifest,
+            expected_hashes={key: meta["sha256"] for key, meta in artifacts.items()},
+        )
+
+    def load_active(self):
+        version = self.active_version()
+        return self.load(version) if version else None
+
+    def register(self, version, model_path, dispute_enc_path, state_enc_path, threshold, features,
+                 extra=None, activate=False):
+        """
+        Copy artifacts into a new version directory and write its manifest.
+
+        Args:
+            extra (dict): additional manifest fields (training metrics, params).
+        """
+        import joblib
+
+        vdir = self.version_dir(version)
+        if os.path.exists(os.path.join(vdir, MANIFEST_FILE)):
+            raise ValueError(f"Model version already registered: {version}")
+        os.makedirs(vdir, exist_ok=True)
+
+        sources = {"model": model_path, "dispute_encoder": dispute_enc_path, "state_encoder": state_enc_path}
+        artifacts = {}
+        for key, src in sources.items():
+            dest = os.path.join(vdir, ARTIFACT_FILES[key])
+            shutil.copyfile(src, dest)
+            artifacts[key] = {"file": ARTIFACT_FILES[key], "sha256": file_sha256(dest)}
+
+        dispute_encoder = joblib.load(sources["dispute_encoder"])
+        state_encoder = joblib.load(sources["state_encoder"])
+        manifest = {
+            "version": version,
+            "created_at": datetime.now().isoformat(),
+            "artifacts": artifacts,
+            "features": list(features),
+            "threshold": float(threshold),
+            "dispute_types": sorted(dispute_encoder.classes_.tolist()),
+            "jurisdictions": sorted(state_encoder.classes_.tolist()),
+            **(extra or {}),
+        }
+        _write_json_atomic(os.path.join(vdir, MANIFEST_FILE), manifest)
+
+        if activate:
+            self.activate(version)
+        return manifest
+
+    def activate(self, version):
+        """Point active.json at ``version`` (atomic replace)."""
+        if version not in self.list_versions():
+            raise ValueError(f"Unknown model version: {version}")
+        os.makedirs(self.root, exist_ok=True)
+        _write_json_atomic(self.active_path, {
+            "version": version,
+            "activated_at": datetime.now().isoformat(),
+        })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage versioned model artifacts.")
+    parser.add_argument("--root", default=REGISTRY_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="list registered versions")
+
+    reg = sub.add_parser("register", help="register pickled artifacts as a new version")
+    reg.add_argument("--version", required=True)
+    reg.add_argument("--model", default=os.path.join(BASE_DIR, "model", "xgb_model.pkl"))
+    reg.add_argument("--dispute-encoder", default=os.path.join(BASE_DIR, "model", "dispute_encoder.pkl"))
+    reg.add_argument("--state-encoder", default=os.path.join(BASE_DIR, "model", "state_encoder.pkl"))
+    reg.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    reg.add_argument("--activate", action="store_true")
+
+    act = sub.add_parser("activate", help="make a registered version the active one")
+    act.add_argument("version")
+
+    args = parser.parse_args(argv)
+    registry = ModelRegistry(args.root)
+
+    if args.command == "list":
+        active = registry.active_version()
+        for version in registry.list_versions():
+            print(f"{'*' if version == active else ' '} {version}")
+    elif args.command == "register":
+        registry.register(
+            args.version, args.model, args.dispute_encoder, args.state_encoder,
+            threshold=args.threshold, features=FEATURES, activate=args.activate,
+        )
+        print(f"Registered model version {args.version}")
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"Activated model version {args.version}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb(children=False):
+    """
+    Peak resident set size of this process (or of its reaped children) in MB.
+
+    Returns None where the ``resource`` module is unavailable.
+    """
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    # ru_maxrss is reported in kilobytes on Linux
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+def current_rss_mb():
+    """
+    Resident set size of this process right now, in MB.
+
+    Returns None where /proc is unavailable (non-Linux).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2, 1)
+
+
+class StageRecorder:
+    """
+    Records wall-clock time and memory for named pipeline stages.
+
+    ``rss_delta_mb`` is the change in current RSS across the stage (memory the
+    stage left allocated). ``process_peak_rss_mb`` is the process-lifetime
+    high-water mark at the end of the stage, so it only grows from stage to
+    stage and is not attributable to one of them.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            rss_after = current_rss_mb()
+            delta = round(rss_after - rss_before, 1) if rss_before is not None and rss_after is not None else None
+            self.stages[name] = {
+                "wall_seconds": round(time.perf_counter() - start, 3),
+                "rss_mb": rss_after,
+                "rss_delta_mb": delta,
+                "process_peak_rss_mb": peak_rss_mb(),
+                "children_peak_rss_mb": peak_rss_mb(children=True),
+            }
+            print(f"[{name}] {self.stages[name]['wall_seconds']:.2f}s, RSS {rss_after} MB "
+                  f"({'+' if delta is not None and delta >= 0 else ''}{delta} MB), "
+                  f"process peak {self.stages[name]['process_peak_rss_mb']} MB")
@@ -0,0 +1,161 @@
+"""
+Empirical settlement-ratio tables.
+
+Built offline from the settled cases in the synthetic dataset:
+
+    python -m services.settlement_tables build
+
+Each segment (dispute_type x jurisdiction x delay bucket x document_count)
+stores the case count and quantiles of ``settlement_min_ratio`` /
+``settlement_max_ratio``. Cells with fewer than ``min_cases`` settled cases
+are not stored; lookups fall back through coarser segments down to the
+global distribution, so every lookup is a handful of dict probes.
+"""
+import os
+import sys
+import json
+import bisect
+import argparse
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TABLES_PATH = os.path.join(BASE_DIR, "model", "settlement_ratios.json")
+
+# Upper edges (days, exclusive) of the delay buckets; the last bucket is open-ended.
+DELAY_BUCKET_EDGES = [90, 180, 365, 540, 730]
+MIN_CASES = 30
+COLUMNS = ["cases", "min_p25", "min_p50", "max_p50", "max_p75"]
+
+# Finest to coarsest; each level lists the key fields it groups by.
+LEVELS = [
+    ("segment", ["dispute_type", "jurisdiction", "delay_bucket", "document_count"]),
+    ("dispute_delay_documents", ["dispute_type", "delay_bucket", "document_count"]),
+    ("dispute_documents", ["dispute_type", "document_count"]),
+    ("dispute", ["dispute_type"]),
+    ("global", []),
+]
+
+
+def delay_bucket(delay_days, edges=DELAY_BUCKET_EDGES):
+    return bisect.bisect_right(edges, delay_days)
+
+
+def _key(values):
+    return "|".join(str(v) for v in values)
+
+
+def build_tables(df, min_cases=MIN_CASES, delay_edges=DELAY_BUCKET_EDGES):
+    """
+    Aggregate settled cases into the quantile tables.
+
+    Args:
+        df (DataFrame): cases with is_settlement and the settlement ratio columns.
+        min_cases (int): smallest cell that is stored (the global cell is always kept).
+
+    Returns:
+        dict: JSON-serializable table artifact.
+    """
+    import pandas as pd
+
+    settled = df[df["is_settlement"] == 1].dropna(subset=["settlement_min_ratio", "settlement_max_ratio"])
+    settled = settled.assign(
+        delay_bucket=pd.cut(
+            settled["delay_days"], [-float("inf")] + list(delay_edges) + [float("inf")],
+            right=False, labels=False,
+        ).astype(int),
+    )
+
+    tables = {}
+    for level, fields in LEVELS:
+        grouped = settled.groupby(fields, observed=True) if fields else settled.groupby(lambda _: 0)
+        stats = grouped.agg(
+            cases=("settlement_min_ratio", "size"),
+            min_p25=("settlement_min_ratio", lambda s: s.quantile(0.25)),
+            min_p50=("settlement_min_ratio", "median"),
+            max_p50=("settlement_max_ratio", "median"),
+            max_p75=("settlement_max_ratio", lambda s: s.quantile(0.75)),
+        )
+        if fields:
+            stats = stats[stats["cases"] >= min_cases]
+        cells = {}
+        for index, row in stats.iterrows():
+            key = _key(index if isinstance(index, tuple) else (index,)) if fields else ""
+            cells[key] = [int(row["cases"])] + [round(float(row[c]), 4) for c in COLUMNS[1:]]
+        tables[level] = cells
+
+    return {
+        "built_at": datetime.now().isoformat(),
+        "settled_cases": int(len(settled)),
+        "min_cases": min_cases,
+        "delay_bucket_edges": list(delay_edges),
+        "columns": COLUMNS,
+        "levels": [{"name": level, "fields": fields} for level, fields in LEVELS],
+        "tables": tables,
+    }
+
+
+class SettlementTables:
+    """Loaded table artifact with hierarchical O(1) lookups."""
+
+    def __init__(self, artifact):
+        self.artifact = artifact
+        self.delay_edges = artifact["delay_bucket_edges"]
+        self.levels = [(level["name"], level["fields"]) for level in artifact["levels"]]
+        self.tables = artifact["tables"]
+
+    @classmethod
+    def load(cls, path=TABLES_PATH):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def lookup(self, dispute_type, jurisdiction, delay_days, document_count):
+        """
+        Ratio statistics for the finest populated segment.
+
+        Returns:
+            dict: cases, min_p25, min_p50, max_p50, max_p75 and the ``level``
+            the values came from.
+        """
+        values = {
+            "dispute_type": dispute_type,
+            "jurisdiction": jurisdiction,
+            "delay_bucket": delay_bucket(delay_days, self.delay_edges),
+            "document_count": int(document_count),
+        }
+        for level, fields in self.levels:
+            cell = self.tables[level].get(_key(values[f] for f in fields))
+            if cell is not None:
+                return {"level": level, **dict(zip(COLUMNS, cell))}
+        raise KeyError("Settlement tables have no global cell")
+
+    def settlement_range(self, claim_amount, dispute_type, jurisdiction, delay_days, document_count):
+        """(settle_min, settle_max, stats) from the segment's median ratios."""
+        stats = self.lookup(dispute_type, jurisdiction, delay_days, document_count)
+        return int(claim_amount * stats["min_p50"]), int(claim_amount * stats["max_p50"]), stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build empirical settlement-ratio tables.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="aggregate the dataset into a table artifact")
+    build.add_argument("--data", default=None,
+                       help="columnar store directory or JSON export (default: store if built, else JSON)")
+    build.add_argument("--out", default=TABLES_PATH)
+    build.add_argument("--min-cases", type=int, default=MIN_CASES)
+    args = parser.parse_args(argv)
+
+    from services.dataset_store import load_cases_frame
+    df = load_cases_frame([
+        "dispute_type", "jurisdiction", "delay_days", "document_count",
+        "is_settlement", "settlement_min_ratio", "settlement_max_ratio",
+    ], args.data)
+    artifact = build_tables(df, min_cases=args.min_cases)
+    with open(args.out, "w") as f:
+        json.dump(artifact, f, separators=(",", ":"))
+
+    counts = ", ".join(f"{name}={len(cells)}" for name, cells in artifact["tables"].items())
+    print(f"Wrote {args.out} from {artifact['settled_cases']} settled cases ({counts})")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Comparable-case index over the historical dataset.
+
+Built once offline from the columnar dataset store:
+
+    python -m services.dataset_store convert
+    python -m services.similar_cases build
+
+Cases are partitioned by (dispute_type, jurisdiction) and sorted by
+claim_amount inside each partition; every column is stored as its own
+``.npy`` file under ``model/similar_cases/`` plus an ``index.json`` with the
+partition offsets. At startup the arrays are memory-mapped, so loading is
+instant and the pages are shared by every worker process.
+
+A query binary-searches the claim amount inside its partition, scores at
+most ``MAX_SCAN`` neighbouring rows with a scaled distance over
+log(claim_amount), delay_days and document_count, and returns the k
+closest cases with outcome and settlement-ratio statistics.
+"""
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from services.dataset_store import DatasetStore, STORE_DIR
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX_DIR = os.path.join(BASE_DIR, "model", "similar_cases")
+INDEX_FILE = "index.json"
+
+# Distance scales: one unit = a claim ~1.65x larger/smaller (0.5 in log
+# space), 90 days of delay, or one document.
+SCALES = {"log_claim": 0.5, "delay_days": 90.0, "document_count": 1.0}
+MAX_SCAN = 4096
+COLUMNS = {
+    "case_id": None,  # fixed-width bytes, width taken from the store
+    "claim_amount": np.float64,
+    "log_claim": np.float64,
+    "delay_days": np.int32,
+    "document_count": np.int8,
+    "outcome": np.int8,
+    "settlement_min_ratio": np.float32,
+    "settlement_max_ratio": np.float32,
+}
+
+
+def build_index(store, out_dir=INDEX_DIR):
+    """
+    Write the partitioned, claim-sorted column arrays from a dataset store.
+
+    Args:
+        store (DatasetStore): columnar case dataset (services/dataset_store.py);
+            partitions and outcomes are computed on its category codes.
+
+    Returns:
+        dict: the index metadata written to index.json.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    dispute_types = store.categories("dispute_type")
+    jurisdictions = store.categories("jurisdiction")
+    claims = store.column("claim_amount")
+    partition = store.column("dispute_type").astype(np.int32) * len(jurisdictions) + store.column("jurisdiction")
+    order = np.lexsort((claims, partition))
+
+    partitions = {}
+    sorted_partition = partition[order]
+    starts = np.flatnonzero(np.r_[True, sorted_partition[1:] != sorted_partition[:-1]])
+    ends = np.r_[starts[1:], len(order)]
+    for start, end in zip(starts, ends):
+        dispute, state = divmod(int(sorted_partition[start]), len(jurisdictions))
+        partitions[f"{dispute_types[dispute]}|{jurisdictions[state]}"] = [int(start), int(end)]
+
+    sources = {
+        "case_id": store.column("case_id"),
+        "claim_amount": claims,
+        "log_claim": np.log1p(claims),
+        "delay_days": store.column("delay_days"),
+        "document_count": store.column("document_count"),
+        "outcome": store.column("final_outcome"),
+        "settlement_min_ratio": store.column("settlement_min_ratio"),
+        "settlement_max_ratio": store.column("settlement_max_ratio"),
+    }
+    for column, values in sources.items():
+        dtype = values.dtype if column == "case_id" else COLUMNS[column]
+        np.save(os.path.join(out_dir, f"{column}.npy"), values[order].astype(dtype))
+
+    meta = {
+        "built_at": datetime.now().isoformat(),
+        "rows": int(len(order)),
+        "outcomes": store.categories("final_outcome"),
+        "settlement_outcome": "settlement",
+        "scales": SCALES,
+        "partitions": partitions,
+    }
+    with open(os.path.join(out_dir, INDEX_FILE), "w") as f:
+        json.dump(meta, f)
+    return meta
+
+
+class SimilarCaseIndex:
+    """Memory-mapped comparable-case index (see module docstring)."""
+
+    def __init__(self, index_dir=INDEX_DIR, mmap=True):
+        with open(os.path.join(index_dir, INDEX_FILE)) as f:
+            self.meta = json.load(f)
+        mode = "r" if mmap else None
+        self.columns = {
+            column: np.load(os.path.join(index_dir, f"{column}.npy"), mmap_mode=mode)
+            for column in COLUMNS
+        }
+        self.partitions = self.meta["partitions"]
+        self.outcomes = self.meta["outcomes"]
+        self.scales = self.meta["scales"]
+        self._settlement = self.outcomes.index(self.meta["settlement_outcome"])
+
+    @classmethod
+    def load(cls, index_dir=INDEX_DIR):
+        """Index at ``index_dir``, or None when it has not been built."""
+        if not os.path.exists(os.path.join(index_dir, INDEX_FILE)):
+            return None
+        return cls(index_dir)
+
+    def query(self, claim_amount, delay_days, document_count, dispute_type, jurisdiction, k=10):
+        """
+        The ``k`` historical cases closest to the given one.
+
+        Returns:
+            dict: partition size, neighbours (closest first) and summary
+            stats (outcome counts, settlement rate, median settlement ratios
+            of the settled neighbours).
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        bounds = self.partitions.get(f"{dispute_type}|{jurisdiction}")
+        if bounds is None:
+            raise ValueError(f"No historical cases for {dispute_type} in {jurisdiction}")
+        lo, hi = bounds
+
+        # Rows are claim-sorted within the partition: scan a window around the claim.
+        claims = self.columns["claim_amount"]
+        if hi - lo > MAX_SCAN:
+            centre = lo + int(np.searchsorted(claims[lo:hi], claim_amount))
+            lo = max(lo, min(centre - MAX_SCAN // 2, hi - MAX_SCAN))
+            hi = lo + MAX_SCAN
+
+        distance = np.sqrt(
+            ((self.columns["log_claim"][lo:hi] - np.log1p(claim_amount)) / self.scales["log_claim"]) ** 2
+            + ((self.columns["delay_days"][lo:hi] - delay_days) / self.scales["delay_days"]) ** 2
+            + ((self.columns["document_count"][lo:hi] - document_count) / self.scales["document_count"]) ** 2
+        )
+        k = min(k, hi - lo)
+        nearest = np.argpartition(distance, k - 1)[:k]
+        nearest = nearest[np.argsort(distance[nearest], kind="stable")]
+        rows = nearest + lo
+
+        outcome = self.columns["outcome"][rows]
+        min_ratio = self.columns["settlement_min_ratio"][rows]
+        max_ratio = self.columns["settlement_max_ratio"][rows]
+        settled = outcome == self._settlement
+
+        neighbours = [
+            {
+                "case_id": case_id.decode(),
+                "claim_amount": round(float(claim), 2),
+                "delay_days": int(delay),
+                "document_count": int(docs),
+                "final_outcome": self.outcomes[int(out)],
+                "settlement_min_ratio": None if np.isnan(lo_r) else round(float(lo_r), 4),
+                "settlement_max_ratio": None if np.isnan(hi_r) else round(float(hi_r), 4),
+                "distance": round(float(d), 4),
+            }
+            for case_id, claim, delay, docs, out, lo_r, hi_r, d in zip(
+                self.columns["case_id"][rows], claims[rows], self.columns["delay_days"][rows],
+                self.columns["document_count"][rows], outcome, min_ratio, max_ratio, distance[nearest],
+            )
+        ]
+        counts = np.bincount(outcome, minlength=len(self.outcomes))
+        return {
+            "partition_size": bounds[1] - bounds[0],
+            "k": int(k),
+            "neighbours": neighbours,
+            "stats": {
+                "outcome_counts": {name: int(n) for name, n in zip(self.outcomes, counts)},
+                "settlement_rate": round(float(settled.mean()), 4),
+                "median_settlement_min_ratio": round(float(np.median(min_ratio[settled])), 4) if settled.any() else None,
+                "median_settlement_max_ratio": round(float(np.median(max_ratio[settled])), 4) if settled.any() else None,
+            },
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the comparable-case index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="partition and sort the dataset store into .npy columns")
+    build.add_argument("--store", default=STORE_DIR)
+    build.add_argument("--out", default=INDEX_DIR)
+    args = parser.parse_args(argv)
+
+    if not DatasetStore.exists(args.store):
+        print(f"No dataset store at {args.store}; run `python -m services.dataset_store convert` first.")
+        return 1
+    meta = build_index(DatasetStore(args.store), args.out)
+    print(f"Indexed {meta['rows']} cases in {len(meta['partitions'])} partitions under {args.out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
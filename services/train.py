@@ -0,0 +1,236 @@
+"""
+Offline training pipeline for the settlement model.
+
+Web processes never train; they only load registered artifacts. Run this
+once per model refresh:
+
+    python -m services.train --folds 5 --workers 4 --activate
+
+It loads the dataset once, runs stratified k-fold cross-validation across a
+process pool (histogram tree building with early stopping per fold), fits
+the final model with the median best iteration, and registers the artifacts
+plus a metrics.json (fold scores, chosen threshold, wall-clock and peak
+memory per stage) as a new version in model/registry/.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score, roc_curve, average_precision_score, log_loss, f1_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import LabelEncoder
+from xgboost import XGBClassifier
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.model_registry import ModelRegistry, FEATURES, ARTIFACT_FILES
+from services.profiling import StageRecorder
+from services.dataset_store import load_cases_frame
+
+TARGET = "is_settlement"
+RAW_COLUMNS = [
+    "claim_amount", "delay_days", "document_count", "document_completeness_score",
+    "dispute_type", "jurisdiction", TARGET,
+]
+
+# Same capacity as the original model; n_estimators is the early-stopping ceiling.
+BASE_PARAMS = {
+    "n_estimators": 300,
+    "max_depth": 6,
+    "learning_rate": 0.05,
+    "subsample": 0.9,
+    "colsample_bytree": 0.9,
+    "tree_method": "hist",
+    "eval_metric": "logloss",
+    "random_state": 42,
+}
+
+# Fold data shared with pool workers (inherited on fork, sent once per worker otherwise)
+_X = None
+_y = None
+
+
+def load_dataset(path=None, sample=None, seed=42):
+    """
+    Training columns from the columnar store (services/dataset_store.py)
+    when built, else from the JSON export; ``path`` may name either.
+    """
+    df = load_cases_frame(RAW_COLUMNS, path)
+    if sample and sample < len(df):
+        df = df.sample(n=sample, random_state=seed).reset_index(drop=True)
+    return df
+
+
+def _label_encode(series):
+    """(fitted LabelEncoder, codes). Sorted categoricals reuse their codes directly."""
+    encoder = LabelEncoder()
+    if isinstance(series.dtype, pd.CategoricalDtype) and series.cat.categories.is_monotonic_increasing:
+        encoder.classes_ = np.array(series.cat.categories.tolist(), dtype=object)
+        return encoder, series.cat.codes.to_numpy()
+    return encoder, encoder.fit_transform(series)
+
+
+def encode_dataset(df):
+    """Fit the category encoders and return (X float32 matrix, y, encoders)."""
+    dispute_encoder, dispute_codes = _label_encode(df["dispute_type"])
+    state_encoder, state_codes = _label_encode(df["jurisdiction"])
+    df = df.assign(dispute_type_enc=dispute_codes, jurisdiction_enc=state_codes)
+    X = df[FEATURES].to_numpy(dtype=np.float32)
+    y = df[TARGET].to_numpy(dtype=np.int32)
+    return X, y, dispute_encoder, state_encoder
+
+
+def _init_worker(X, y):
+    global _X, _y
+    _X, _y = X, y
+
+
+def _fit_fold(task):
+    fold, train_idx, val_idx, params, early_stopping_rounds = task
+    model = XGBClassifier(**params, early_stopping_rounds=early_stopping_rounds)
+    model.fit(_X[train_idx], _y[train_idx], eval_set=[(_X[val_idx], _y[val_idx])], verbose=False)
+    proba = model.predict_proba(_X[val_idx], iteration_range=(0, model.best_iteration + 1))[:, 1]
+    return fold, val_idx, proba, int(model.best_iteration) + 1
+
+
+def cross_validate(X, y, params, folds=5, workers=1, early_stopping_rounds=30, seed=42):
+    """
+    Stratified k-fold CV, one fold per pool task.
+
+    Returns:
+        tuple: (per-fold metrics list, out-of-fold probabilities)
+    """
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    fold_params = {**params, "n_jobs": max(1, (os.cpu_count() or 1) // max(1, workers))}
+    tasks = [
+        (fold, train_idx, val_idx, fold_params, early_stopping_rounds)
+        for fold, (train_idx, val_idx) in enumerate(splitter.split(X, y))
+    ]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y)) as pool:
+            outcomes = list(pool.map(_fit_fold, tasks))
+    else:
+        _init_worker(X, y)
+        outcomes = [_fit_fold(task) for task in tasks]
+
+    oof = np.zeros(len(y), dtype=np.float64)
+    fold_metrics = []
+    for fold, val_idx, proba, best_iteration in sorted(outcomes, key=lambda o: o[0]):
+        oof[val_idx] = proba
+        fold_metrics.append({
+            "fold": fold,
+            "best_iteration": best_iteration,
+            **_score(y[val_idx], proba),
+        })
+    return fold_metrics, oof
+
+
+def _score(y_true, proba, threshold=None):
+    scores = {
+        "auc": round(float(roc_auc_score(y_true, proba)), 5),
+        "average_precision": round(float(average_precision_score(y_true, proba)), 5),
+        "logloss": round(float(log_loss(y_true, proba, labels=[0, 1])), 5),
+    }
+    if threshold is not None:
+        scores["f1"] = round(float(f1_score(y_true, proba >= threshold)), 5)
+        scores["accuracy"] = round(float(np.mean((proba >= threshold) == y_true)), 5)
+    return scores
+
+
+def choose_threshold(y, proba):
+    """
+    Decision threshold maximizing Youden's J (TPR - FPR) on out-of-fold
+    probabilities, the criterion behind the original 0.607 cut-off.
+    """
+    fpr, tpr, thresholds = roc_curve(y, proba)
+    return round(float(thresholds[int(np.argmax(tpr - fpr))]), 3)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train and register the settlement model.")
+    parser.add_argument("--data", default=None,
+                        help="columnar store directory or JSON export (default: store if built, else JSON)")
+    parser.add_argument("--sample", type=int, default=None, help="train on a random subset (quick runs)")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=min(5, os.cpu_count() or 1))
+    parser.add_argument("--max-rounds", type=int, default=BASE_PARAMS["n_estimators"])
+    parser.add_argument("--early-stopping", type=int, default=30)
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="fixed decision threshold (default: Youden-optimal on out-of-fold predictions)")
+    parser.add_argument("--version", default=None, help="registry version (default: timestamp)")
+    parser.add_argument("--registry", default=None, help="registry directory (default: model/registry)")
+    parser.add_argument("--activate", action="store_true", help="make the new version active")
+    args = parser.parse_args(argv)
+
+    version = args.version or datetime.now().strftime("%Y%m%d-%H%M%S")
+    registry = ModelRegistry(args.registry) if args.registry else ModelRegistry()
+    params = {**BASE_PARAMS, "n_estimators": args.max_rounds}
+    stages = StageRecorder()
+
+    with stages.stage("load_data"):
+        df = load_dataset(args.data, sample=args.sample)
+
+    with stages.stage("encode"):
+        X, y, dispute_encoder, state_encoder = encode_dataset(df)
+        del df
+
+    with stages.stage("cross_validate"):
+        fold_metrics, oof = cross_validate(
+            X, y, params, folds=args.folds, workers=args.workers,
+            early_stopping_rounds=args.early_stopping,
+        )
+        threshold = args.threshold if args.threshold is not None else choose_threshold(y, oof)
+        n_estimators = int(np.median([m["best_iteration"] for m in fold_metrics]))
+
+    with stages.stage("fit_final"):
+        model = XGBClassifier(**{**params, "n_estimators": n_estimators})
+        model.fit(pd.DataFrame(X, columns=FEATURES), y)
+
+    with stages.stage("register"):
+        import joblib
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = {key: os.path.join(tmp, name) for key, name in ARTIFACT_FILES.items()}
+            joblib.dump(model, paths["model"])
+            joblib.dump(dispute_encoder, paths["dispute_encoder"])
+            joblib.dump(state_encoder, paths["state_encoder"])
+            training = {
+                "rows": int(len(y)),
+                "params": {**params, "n_estimators": n_estimators},
+                "early_stopping_rounds": args.early_stopping,
+                "folds": args.folds,
+                "cv": _score(y, oof, threshold),
+            }
+            registry.register(
+                version, paths["model"], paths["dispute_encoder"], paths["state_encoder"],
+                threshold=threshold, features=FEATURES, extra={"training": training},
+            )
+
+    metrics = {
+        "version": version,
+        "threshold": threshold,
+        "n_estimators": n_estimators,
+        "cv_out_of_fold": training["cv"],
+        "folds": fold_metrics,
+        "stages": stages.stages,
+    }
+    metrics_path = os.path.join(registry.version_dir(version), "metrics.json")
+    with open(metrics_path, "w") as f:
+        json.dump(metrics, f, indent=2)
+
+    if args.activate:
+        registry.activate(version)
+
+    print(f"Registered model version {version}: {n_estimators} trees, threshold {threshold:.3f}, "
+          f"OOF AUC {training['cv']['auc']:.4f}{' (active)' if args.activate else ''}")
+    print(f"Metrics written to {metrics_path}")
+    return version
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+NumPy evaluator for the XGBoost settlement model.
+
+The booster's trees are flattened into contiguous (n_trees, max_nodes) node
+arrays once, either at model load or ahead of time with
+
+    python -m services.tree_evaluator export --out model/xgb_forest.npz
+    python -m services.tree_evaluator export --model model/registry/<v>/xgb_model.pkl \
+        --out model/registry/<v>/xgb_forest.npz
+
+A batch of rows is then scored level by level with pure array ops: every
+row walks every tree in lock-step, one depth per iteration, so scoring cost
+is ``max_depth`` vectorized gathers instead of a call into XGBoost (DMatrix
+construction, thread pool wakeups, feature-name validation).
+"""
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+
+LEAF = -1
+
+
+class CompiledForest:
+    """Flattened binary:logistic tree ensemble."""
+
+    def __init__(self, feature, threshold, left, right, default_left, value, mean_value,
+                 base_margin, max_depth, feature_names, source_version=None):
+        self.feature = feature              # int32, LEAF for leaves
+        self.threshold = threshold          # float32, split condition (x < t goes left)
+        self.left = left                    # int32, leaves point to themselves
+        self.right = right                  # int32, leaves point to themselves
+        self.default_left = default_left    # bool, branch taken for missing values
+        self.value = value                  # float32, leaf values (0 for internal nodes)
+        self.mean_value = mean_value        # float64, hessian-weighted subtree mean
+        self.base_margin = float(base_margin)
+        self.max_depth = int(max_depth)
+        self.feature_names = list(feature_names)
+        self.source_version = source_version  # version of the model it was compiled from
+
+        n_trees, max_nodes = feature.shape
+        self.n_trees = n_trees
+        self._tree_offset = (np.arange(n_trees, dtype=np.int64) * max_nodes)[None, :]
+
+        # Flat views used by the evaluator: one gather per attribute per level.
+        # ``_children[node, go_right]`` holds global (tree-offset) child ids.
+        offset = self._tree_offset.reshape(-1, 1)
+        self._feature = np.maximum(feature, 0).ravel()
+        self._threshold = threshold.ravel()
+        self._default_right = (~default_left).ravel()
+        self._children = np.stack([(left + offset).ravel(), (right + offset).ravel()], axis=1)
+        self._value = value.ravel()
+        self._mean_value = mean_value.ravel()
+
+    # ---------------- CONSTRUCTION ---------------- #
+
+    @classmethod
+    def from_booster(cls, booster, source_version=None):
+        """Compile an ``xgboost.Booster`` (binary:logistic, numeric splits only)."""
+        model = json.loads(booster.save_raw("json"))
+        learner = model["learner"]
+        if learner["objective"]["name"] != "binary:logistic":
+            raise ValueError(f"Unsupported objective: {learner['objective']['name']}")
+
+        base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+        base_margin = float(np.log(base_score / (1.0 - base_score)))
+
+        trees = learner["gradient_booster"]["model"]["trees"]
+        max_nodes = max(int(t["tree_param"]["num_nodes"]) for t in trees)
+        shape = (len(trees), max_nodes)
+
+        feature = np.full(shape, LEAF, dtype=np.int32)
+        threshold = np.zeros(shape, dtype=np.float32)
+        left = np.tile(np.arange(max_nodes, dtype=np.int32), (len(trees), 1))
+        right = left.copy()
+        default_left = np.zeros(shape, dtype=bool)
+        value = np.zeros(shape, dtype=np.float32)
+        mean_value = np.zeros(shape, dtype=np.float64)
+        max_depth = 0
+
+        for t, tree in enumerate(trees):
+            if any(tree["split_type"]):
+                raise ValueError("Categorical splits are not supported")
+
+            lc = np.asarray(tree["left_children"], dtype=np.int32)
+            rc = np.asarray(tree["right_children"], dtype=np.int32)
+            cond = np.asarray(tree["split_conditions"], dtype=np.float32)
+            hess = np.asarray(tree["sum_hessian"], dtype=np.float64)
+            n = len(lc)
+            is_leaf = lc == -1
+
+            feature[t, :n] = np.where(is_leaf, LEAF, tree["split_indices"])
+            threshold[t, :n] = np.where(is_leaf, 0.0, cond)
+            left[t, :n] = np.where(is_leaf, np.arange(n), lc)
+            right[t, :n] = np.where(is_leaf, np.arange(n), rc)
+            default_left[t, :n] = np.asarray(tree["default_left"], dtype=bool)
+            value[t, :n] = np.where(is_leaf, cond, 0.0)
+
+            # Children always have larger ids than their parent, so a reverse
+            # sweep fills subtree means bottom-up (same as XGBoost's
+            # FillNodeMeanValues used for approximate contributions).
+            means = np.where(is_leaf, cond, 0.0).astype(np.float64)
+            depth = np.zeros(n, dtype=np.int32)
+            for node in range(n):
+                if not is_leaf[node]:
+                    depth[lc[node]] = depth[rc[node]] = depth[node] + 1
+            for node in range(n - 1, -1, -1):
+                if not is_leaf[node]:
+                    means[node] = (means[lc[node]] * hess[lc[node]]
+                                   + means[rc[node]] * hess[rc[node]]) / hess[node]
+            mean_value[t, :n] = means
+            max_depth = max(max_depth, int(depth.max()))
+
+        return cls(feature, threshold, left, right, default_left, value, mean_value,
+                   base_margin, max_depth, learner.get("feature_names") or [], source_version)
+
+    def save(self, path):
+        np.savez(
+            path,
+            feature=self.feature, threshold=self.threshold,
+            left=self.left, right=self.right, default_left=self.default_left,
+            value=self.value, mean_value=self.mean_value,
+            base_margin=self.base_margin, max_depth=self.max_depth,
+            feature_names=np.asarray(self.feature_names),
+            source_version=np.asarray(self.source_version or ""),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data["feature"], data["threshold"], data["left"], data["right"],
+                data["default_left"], data["value"], data["mean_value"],
+                float(data["base_margin"]), int(data["max_depth"]),
+                data["feature_names"].tolist(),
+                str(data["source_version"]) or None,
+            )
+
+    # ---------------- SCORING ---------------- #
+
+    def predict_margin(self, X, return_contribs=False):
+        """
+        Score a batch of rows.
+
+        Args:
+            X (array-like): (n_rows, n_features) matrix ordered as ``feature_names``.
+                NaN marks a missing value and follows the learned default branch.
+            return_contribs (bool): also return per-feature path contributions
+                (Saabas attribution, identical to XGBoost's
+                ``pred_contribs=True, approx_contribs=True``).
+
+        Returns:
+            np.ndarray margins of shape (n_rows,), or a (margins, contribs)
+            tuple where contribs has shape (n_rows, n_features + 1) and the
+            last column is the bias term.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        n_rows, n_features = X.shape
+        has_missing = bool(np.isnan(X).any())
+
+        node = np.repeat(self._tree_offset, n_rows, axis=0)
+        row_base = (np.arange(n_rows, dtype=np.int64) * n_features)[:, None]
+        X_flat = X.ravel()
+
+        if return_contribs:
+            contribs = np.zeros(n_rows * n_features, dtype=np.float64)
+
+        for _ in range(self.max_depth):
+            x = X_flat[row_base + self._feature[node]]
+            go_right = ~(x < self._threshold[node])
+            if has_missing:
+                missing = np.isnan(x)
+                go_right[missing] = self._default_right[node[missing]]
+            child = self._children[node, go_right.view(np.int8)]
+
+            if return_contribs:
+                # Leaves point to themselves, so their delta is zero.
+                delta = self._mean_value[child] - self._mean_value[node]
+                contribs += np.bincount(
+                    (row_base + self._feature[node]).ravel(),
+                    weights=delta.ravel(),
+                    minlength=n_rows * n_features,
+                )
+
+            node = child
+
+        margin = self._value[node].sum(axis=1, dtype=np.float64) + self.base_margin
+        if not return_contribs:
+            return margin
+
+        bias = self._mean_value[self._tree_offset[0]].sum() + self.base_margin
+        contribs = np.hstack([contribs.reshape(n_rows, n_features), np.full((n_rows, 1), bias)])
+        return margin, contribs
+
+    def predict_proba(self, X):
+        """Positive-class probability for each row."""
+        return 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the XGBoost model as NumPy node arrays.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="flatten a pickled XGBClassifier into an .npz")
+    export.add_argument("--model", default=os.path.join("model", "xgb_model.pkl"))
+    export.add_argument("--out", default=os.path.join("model", "xgb_forest.npz"))
+    args = parser.parse_args(argv)
+
+    import joblib
+    from services.model_registry import file_sha256
+    forest = CompiledForest.from_booster(
+        joblib.load(args.model).get_booster(),
+        source_version=file_sha256(args.model)[:12],
+    )
+    forest.save(args.out)
+    print(f"Exported {forest.n_trees} trees (max depth {forest.max_depth}) to {args.out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+Early-exit triage: which side of the decision threshold is a case on?
+
+The booster is evaluated in stages over growing tree prefixes
+(``iteration_range``). After each stage, cases whose partial margin is
+further from the threshold margin than that stage's band are decided;
+only the rest go on to the next block of trees, continuing from their
+partial margin (``base_margin``), and the borderline ones end with the
+full model.
+
+Bands are calibrated per model: for a sample of dataset cases, the band
+of a stage is a high quantile of |full margin - prefix margin|, i.e. how
+far the remaining trees can still move a margin. (A worst-case bound from
+the leaf values is valid but useless here: the last half of the trees can
+still move a margin by more than ±6, so nothing would ever exit early.)
+
+    python -m services.triage calibrate
+    python -m services.triage evaluate      # agreement and speedup vs full scoring
+
+The bands are stored in ``model/triage_bands.json`` with the model
+fingerprint; for any other model triage falls back to full evaluation.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRIAGE_PATH = os.path.join(BASE_DIR, "model", "triage_bands.json")
+
+# Exit checks after these fractions of the trees; the last stage is always the full model.
+STAGE_FRACTIONS = (1 / 6, 1 / 3, 1 / 2, 2 / 3, 5 / 6)
+BAND_QUANTILE = 0.999
+CALIBRATION_ROWS = 50_000
+
+
+def _logit(p):
+    return float(np.log(p / (1 - p)))
+
+
+def stage_trees(n_trees, fractions=STAGE_FRACTIONS):
+    return sorted({int(round(n_trees * f)) for f in fractions} - {0, n_trees})
+
+
+class TriageScorer:
+    """Staged threshold decisions over one booster (see module docstring)."""
+
+    def __init__(self, booster, threshold, bands, fingerprint=None):
+        """
+        Args:
+            booster (xgb.Booster): the full model.
+            threshold (float): probability threshold of the decision.
+            bands (list): [[trees, band], ...] exit stages in increasing
+                tree count; empty means always evaluate the full model.
+        """
+        self.booster = booster
+        self.threshold = threshold
+        self.threshold_margin = _logit(threshold)
+        self.n_trees = booster.num_boosted_rounds()
+        self.bands = [(int(trees), float(band)) for trees, band in bands if int(trees) < self.n_trees]
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def calibrate(cls, booster, X, threshold, quantile=BAND_QUANTILE, fractions=STAGE_FRACTIONS,
+                  fingerprint=None):
+        """Bands from the margin residuals of ``X`` (float32 rows in FEATURES order)."""
+        full = booster.inplace_predict(X, predict_type="margin")
+        bands = []
+        for trees in stage_trees(booster.num_boosted_rounds(), fractions):
+            partial = booster.inplace_predict(X, predict_type="margin", iteration_range=(0, trees))
+            bands.append([trees, round(float(np.quantile(np.abs(full - partial), quantile)), 6)])
+        return cls(booster, threshold, bands, fingerprint)
+
+    def to_dict(self, **extra):
+        return {
+            "fingerprint": self.fingerprint,
+            "threshold": self.threshold,
+            "n_trees": self.n_trees,
+            "bands": [[trees, band] for trees, band in self.bands],
+            **extra,
+        }
+
+    def score(self, X):
+        """
+        Threshold decisions for a float32 matrix.
+
+        Returns:
+            dict: ``decision`` (int8 0/1), ``margin`` (margin at exit;
+            exact for cases that ran the full model) and ``trees`` (trees
+            evaluated per case).
+        """
+        X = np.asarray(X, dtype=np.float32)
+        n = len(X)
+        margin = np.zeros(n, dtype=np.float64)
+        trees = np.full(n, self.n_trees, dtype=np.int32)
+        decision = np.zeros(n, dtype=np.int8)
+        pending = np.arange(n)
+        done = 0
+        for stage, band in self.bands + [(self.n_trees, None)]:
+            if not len(pending):
+                break
+            rows = X[pending]
+            if done:
+                partial = self.booster.inplace_predict(
+                    rows, predict_type="margin", iteration_range=(done, stage), base_margin=margin[pending],
+                )
+            else:
+                partial = self.booster.inplace_predict(rows, predict_type="margin", iteration_range=(0, stage))
+            margin[pending] = partial
+            distance = partial - self.threshold_margin
+            exits = np.ones(len(pending), dtype=bool) if band is None else np.abs(distance) > band
+            decided = pending[exits]
+            decision[decided] = distance[exits] >= 0
+            trees[decided] = stage
+            pending = pending[~exits]
+            done = stage
+        return {"decision": decision, "margin": margin, "trees": trees}
+
+
+def load_scorer(bundle, path=TRIAGE_PATH):
+    """
+    Triage scorer for ``bundle``; bands only apply when they were calibrated
+    for the same model fingerprint, otherwise every case runs the full model.
+    """
+    bands = []
+    if os.path.exists(path):
+        with open(path) as f:
+            artifact = json.load(f)
+        if artifact.get("fingerprint") == bundle.fingerprint:
+            bands = artifact["bands"]
+        else:
+            print(f"Triage bands in {path} belong to another model; triage will run the full model.")
+    return TriageScorer(bundle.model.get_booster(), bundle.threshold, bands, bundle.fingerprint)
+
+
+def _dataset_matrix(bundle, data=None, seed=0):
+    """Encoded dataset rows in a seeded order (calibration takes the head, evaluation the rest)."""
+    from services.dataset_store import load_cases_frame
+    from services.prediction import encode_cases
+
+    df = load_cases_frame(["claim_amount", "delay_days", "document_count", "dispute_type", "jurisdiction"], data)
+    cases = df.astype({"dispute_type": str, "jurisdiction": str}).to_dict("records")
+    X, _, _ = encode_cases(cases, bundle)
+    return X.astype(np.float32)[np.random.default_rng(seed).permutation(len(X))]
+
+
+def evaluate(scorer, X, repeat=3):
+    """
+    Agreement with full scoring and speedup over it.
+
+    Returns:
+        dict: rows, agreement, disagreements, speedup, mean trees and the
+        share of cases decided at each stage.
+    """
+    booster = scorer.booster
+
+    def best(fn):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            out = fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings), out
+
+    full_s, full = best(lambda: booster.inplace_predict(X, predict_type="margin"))
+    triage_s, result = best(lambda: scorer.score(X))
+    truth = full >= scorer.threshold_margin
+    agree = result["decision"] == truth
+    stages, counts = np.unique(result["trees"], return_counts=True)
+    return {
+        "rows": int(len(X)),
+        "agreement": round(float(agree.mean()), 6),
+        "disagreements": int((~agree).sum()),
+        "full_seconds": round(full_s, 4),
+        "triage_seconds": round(triage_s, 4),
+        "speedup": round(full_s / triage_s, 2),
+        "mean_trees": round(float(result["trees"].mean()), 1),
+        "decided_at": {int(s): round(float(c) / len(X), 4) for s, c in zip(stages, counts)},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Early-exit threshold triage.")
+    parser.add_argument("--data", default=None,
+                        help="columnar store directory or JSON export (default: store if built, else JSON)")
+    parser.add_argument("--bands", default=TRIAGE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    cal = sub.add_parser("calibrate", help="fit the exit bands of the active model")
+    cal.add_argument("--rows", type=int, default=CALIBRATION_ROWS)
+    cal.add_argument("--quantile", type=float, default=BAND_QUANTILE)
+    sub.add_parser("evaluate", help="agreement and speedup on the dataset rows not used for calibration")
+    args = parser.parse_args(argv)
+
+    from services.prediction import get_active_bundle
+
+    bundle = get_active_bundle()
+    X = _dataset_matrix(bundle, args.data)
+
+    if args.command == "calibrate":
+        scorer = TriageScorer.calibrate(
+            bundle.model.get_booster(), X[:args.rows], bundle.threshold,
+            quantile=args.quantile, fingerprint=bundle.fingerprint,
+        )
+        with open(args.bands, "w") as f:
+            json.dump(scorer.to_dict(
+                model_version=bundle.version, quantile=args.quantile, calibration_rows=min(args.rows, len(X)),
+                built_at=datetime.now().isoformat(),
+            ), f, indent=2)
+        bands = ", ".join(f"{trees} trees: ±{band:.3f}" for trees, band in scorer.bands)
+        print(f"Wrote {args.bands} for model {bundle.version} ({bands})")
+        return 0
+
+    scorer = load_scorer(bundle, args.bands)
+    calibrated = 0
+    if os.path.exists(args.bands):
+        with open(args.bands) as f:
+            calibrated = json.load(f).get("calibration_rows", 0)
+    report = evaluate(scorer, X[calibrated:])
+    print(f"{report['rows']} held-out cases: agreement {report['agreement']:.4%} "
+          f"({report['disagreements']} disagreements), speedup {report['speedup']}x "
+          f"({report['full_seconds']}s full vs {report['triage_seconds']}s triage), "
+          f"mean trees {report['mean_trees']} of {scorer.n_trees}")
+    for trees, share in report["decided_at"].items():
+        print(f"  decided after {trees:>4} trees: {share:.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
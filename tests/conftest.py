@@ -0,0 +1,23 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+
+@pytest.fixture
+def private_audit_log(tmp_path, monkeypatch):
+    """
+    Send run_xgb_prediction's audit entries to a temporary file, keeping test
+    cases out of logs/prediction_audit.jsonl (the drift monitor's input).
+
+    Returns:
+        str: path of the temporary audit log.
+    """
+    from services import prediction
+
+    log_file = str(tmp_path / "prediction_audit.jsonl")
+    monkeypatch.setattr(prediction.audit_logger, "log_file", log_file)
+    return log_file
@@ -0,0 +1,30 @@
+import sys
+import os
+
+# Add project root and benchmarks to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "benchmarks")))
+
+from bench_prediction import compare, synthetic_cases
+
+
+def _run(**values):
+    better = {"single_p50_ms": "lower", "batch_100_rows_per_s": "higher"}
+    return {"metrics": {name: {"value": v, "unit": "", "better": better[name]} for name, v in values.items()}}
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = _run(single_p50_ms=10.0, batch_100_rows_per_s=1000.0)
+
+    rows = {r["metric"]: r for r in compare(baseline, _run(single_p50_ms=12.0, batch_100_rows_per_s=1500.0), 0.25)}
+    assert not any(r["regressed"] for r in rows.values())
+    assert rows["batch_100_rows_per_s"]["change"] == -0.5  # faster is negative
+
+    rows = {r["metric"]: r for r in compare(baseline, _run(single_p50_ms=13.0, batch_100_rows_per_s=700.0), 0.25)}
+    assert rows["single_p50_ms"]["regressed"] and rows["batch_100_rows_per_s"]["regressed"]
+
+
+def test_synthetic_cases_are_deterministic():
+    first = synthetic_cases(50, ["goods", "services"], ["Goa", "Delhi"], seed=3)
+    assert first == synthetic_cases(50, ["goods", "services"], ["Goa", "Delhi"], seed=3)
+    assert {c["dispute_type"] for c in first} <= {"goods", "services"}
@@ -0,0 +1,135 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+
+import pytest
+
+from services import bulk_score
+from services.bulk_score import score_file
+from services.prediction import run_xgb_prediction_batch
+
+CASES = [
+    {"case_id": f"C{i}", "claim_amount": 100000 + 50000 * i, "delay_days": 30 + 40 * i,
+     "document_count": i % 5, "dispute_type": "invoice_non_payment", "jurisdiction": "Maharashtra"}
+    for i in range(7)
+]
+
+
+def _write_jsonl(path, cases, extra_lines=()):
+    with open(path, "w") as f:
+        for case in cases:
+            f.write(json.dumps(case) + "\n")
+        for line in extra_lines:
+            f.write(line + "\n")
+
+
+def _read_jsonl(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_streamed_scores_match_batch_api(tmp_path):
+    input_path, output_path = tmp_path / "cases.jsonl", tmp_path / "scores.jsonl"
+    bad_case = {**CASES[0], "case_id": "BAD", "jurisdiction": "Atlantis"}
+    _write_jsonl(input_path, CASES + [bad_case], extra_lines=["{not json", "[1, 2]", "5"])
+
+    summary = score_file(str(input_path), str(output_path), chunk_size=3, progress=False)
+    assert summary["rows"] == 11
+    assert summary["failed"] == 4
+
+    records = _read_jsonl(output_path)
+    assert [r["row"] for r in records] == list(range(11))
+    assert records[7]["case_id"] == "BAD" and "jurisdiction" in records[7]["error"]
+    assert records[8]["error"] == "Invalid JSON line"
+    assert records[9]["error"] == records[10]["error"] == "Invalid row: expected a JSON object"
+
+    expected = run_xgb_prediction_batch(CASES, contributions="approx")
+    for record, result in zip(records, expected):
+        assert record["probability"] == result["probability"]
+        assert record["prediction"] == result["prediction"]
+        assert f"{record['settle_min']:,}" == result["settle_min"]
+        contribs = {k: abs(v) for k, v in result["feature_contribution"].items() if k != "bias"}
+        assert record["top_feature"] == max(contribs, key=contribs.get)
+
+
+def test_resume_continues_from_checkpoint(tmp_path, monkeypatch):
+    input_path = tmp_path / "cases.jsonl"
+    _write_jsonl(input_path, CASES)
+    score_file(str(input_path), str(tmp_path / "full.jsonl"), chunk_size=2, progress=False)
+
+    read_chunks = bulk_score.read_chunks
+
+    def interrupted(*args, **kwargs):
+        for n, chunk in enumerate(read_chunks(*args, **kwargs)):
+            if n == 2:
+                raise KeyboardInterrupt
+            yield chunk
+
+    partial = tmp_path / "partial.jsonl"
+    monkeypatch.setattr(bulk_score, "read_chunks", interrupted)
+    try:
+        score_file(str(input_path), str(partial), chunk_size=2, progress=False)
+    except KeyboardInterrupt:
+        pass
+    with open(partial, "a") as f:
+        f.write('{"row": 4, "trunc')  # half-written chunk from the interrupted run
+
+    monkeypatch.setattr(bulk_score, "read_chunks", read_chunks)
+    summary = score_file(str(input_path), str(partial), chunk_size=2, resume=True, progress=False)
+
+    assert summary["rows"] == 3
+    assert _read_jsonl(partial) == _read_jsonl(tmp_path / "full.jsonl")
+
+
+def test_parallel_workers_write_same_output_in_order(tmp_path):
+    input_path = tmp_path / "cases.jsonl"
+    _write_jsonl(input_path, CASES * 3, extra_lines=["{not json"])
+
+    serial = score_file(str(input_path), str(tmp_path / "serial.jsonl"), chunk_size=2, progress=False)
+    parallel = score_file(str(input_path), str(tmp_path / "parallel.jsonl"), chunk_size=2, workers=2,
+                          progress=False)
+
+    assert parallel["workers"] == 2
+    assert (parallel["rows"], parallel["failed"]) == (serial["rows"], serial["failed"])
+    assert _read_jsonl(tmp_path / "parallel.jsonl") == _read_jsonl(tmp_path / "serial.jsonl")
+
+
+def test_start_offset_into_new_csv_writes_header_once(tmp_path):
+    input_path = tmp_path / "cases.jsonl"
+    _write_jsonl(input_path, CASES)
+    with open(input_path, "rb") as f:
+        offset = sum(len(f.readline()) for _ in range(3))
+
+    output = tmp_path / "tail.csv"
+    score_file(str(input_path), str(output), chunk_size=2, start_offset=offset, progress=False)
+    score_file(str(input_path), str(output), chunk_size=2, start_offset=offset, progress=False)
+
+    with open(output) as f:
+        lines = f.read().splitlines()
+    assert lines[0] == ",".join(bulk_score.OUTPUT_FIELDS)
+    assert len(lines) == 1 + 2 * (len(CASES) - 3)
+
+
+def test_resume_refuses_missing_checkpoint_and_other_model(tmp_path):
+    input_path, output = tmp_path / "cases.jsonl", tmp_path / "scores.jsonl"
+    _write_jsonl(input_path, CASES)
+    output.write_text('{"row": 0}\n')
+    with pytest.raises(ValueError, match="Nothing to resume"):
+        score_file(str(input_path), str(output), resume=True, progress=False)
+    assert output.read_text() == '{"row": 0}\n'  # not truncated
+
+    output.unlink()
+    assert score_file(str(input_path), str(output), chunk_size=2, resume=True, progress=False)["rows"] == 7
+
+    ckpt = bulk_score.checkpoint_path(str(output))
+    with open(ckpt) as f:
+        state = json.load(f)
+    with open(ckpt, "w") as f:
+        json.dump({**state, "input_offset": 0, "output_offset": 0, "model_version": "older"}, f)
+    with pytest.raises(ValueError, match="--force"):
+        score_file(str(input_path), str(output), resume=True, progress=False)
+    assert score_file(str(input_path), str(output), resume=True, force=True, progress=False)["rows"] == 7
@@ -0,0 +1,85 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import math
+import warnings
+
+import numpy as np
+import pytest
+
+from services import prediction
+from services.category_encoding import CategoryCodes
+from services.prediction import encode_cases, run_xgb_prediction, run_xgb_prediction_batch
+
+pytestmark = pytest.mark.usefixtures("private_audit_log")
+
+CASE = {"claim_amount": 730000, "delay_days": 180, "document_count": 3,
+        "dispute_type": "goods_rejection", "jurisdiction": "Maharashtra"}
+
+
+def test_codes_match_label_encoder():
+    bundle = prediction.get_active_bundle()
+    for codes, encoder in ((bundle.dispute_codes, bundle.dispute_encoder),
+                           (bundle.state_codes, bundle.state_encoder)):
+        assert [codes.encode(c)[0] for c in encoder.classes_] == encoder.transform(encoder.classes_).tolist()
+
+
+def test_unknown_policies():
+    codes = CategoryCodes("jurisdiction", ["Delhi", "Goa", "Maharashtra"])
+    assert codes.encode(" Goa ") == (1, None)
+    with pytest.raises(ValueError, match="Unknown jurisdiction: Kerala"):
+        codes.encode("Kerala", "reject")
+
+    code, unknown = codes.encode("Kerala", "reserved")
+    assert math.isnan(code) and unknown == {"value": "Kerala", "mapped_to": None}
+    assert codes.encode("maharastra", "nearest") == (2, {"value": "maharastra", "mapped_to": "Maharashtra"})
+    assert math.isnan(codes.encode("Kerala", "nearest")[0])  # nothing close: reserved
+
+    values, unknown_rows, mapped = codes.encode_array(["Goa", "maharastra", "Kerala", None, "Goa"], "nearest")
+    assert values[[0, 1, 4]].tolist() == [1, 2, 1] and np.isnan(values[[2, 3]]).all()
+    assert unknown_rows.tolist() == [False, True, True, True, False]
+    assert mapped == {"maharastra": "Maharashtra", "Kerala": None}
+
+
+def test_encode_array_unknown_and_unhashable_values():
+    codes = CategoryCodes("jurisdiction", ["Delhi", "Goa"])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")  # pandas deprecates unknown values in pd.Categorical
+        values, unknown_rows, _ = codes.encode_array(["Goa", "Kerala", ["Delhi"], 5], "reserved")
+    assert values[0] == 1 and np.isnan(values[1:]).all()
+    assert unknown_rows.tolist() == [False, True, True, True]
+
+
+def test_prediction_reports_policy():
+    known = run_xgb_prediction(**CASE, include=())
+    assert known["category_encoding"] == {"policy": "reserved", "unknown": {}}
+
+    reserved = run_xgb_prediction(**{**CASE, "dispute_type": "Payment Dispute"}, include=())
+    assert reserved["category_encoding"]["unknown"]["dispute_type"] == {"value": "Payment Dispute", "mapped_to": None}
+
+    nearest = run_xgb_prediction(**{**CASE, "dispute_type": "Goods Rejection"}, include=(), unknown_policy="nearest")
+    assert nearest["category_encoding"]["unknown"]["dispute_type"]["mapped_to"] == "goods_rejection"
+    assert nearest["probability"] == known["probability"]
+
+    with pytest.raises(ValueError, match="Unknown dispute_type"):
+        run_xgb_prediction(**{**CASE, "dispute_type": "Payment Dispute"}, unknown_policy="reject")
+
+
+def test_batch_policies():
+    cases = [CASE, {**CASE, "jurisdiction": "Kerala"}, {**CASE, "jurisdiction": None}]
+    rejected = run_xgb_prediction_batch(cases, contributions="none")
+    assert rejected[1]["error"] == "Unknown jurisdiction: Kerala"
+    assert rejected[2]["error"] == "Unknown jurisdiction: None"
+
+    reserved = run_xgb_prediction_batch(cases, contributions="none", unknown_policy="reserved")
+    assert reserved[1]["success"] and "category_encoding" not in reserved[0]
+    assert reserved[1]["category_encoding"] == {
+        "policy": "reserved", "unknown": {"jurisdiction": {"value": "Kerala", "mapped_to": None}},
+    }
+    assert not reserved[2]["success"]
+
+    X, positions, errors = encode_cases(cases, prediction.get_active_bundle(), "reserved")
+    assert positions == [0, 1] and np.isnan(X[1, 5]) and list(errors) == [2]
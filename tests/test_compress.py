@@ -0,0 +1,64 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pytest
+
+from services import prediction
+from services.compress import agreement_threshold, compress, parse_variant, register_variants
+from services.model_registry import ModelRegistry
+
+
+def _matrix(n, seed):
+    rng = np.random.default_rng(seed)
+    document_count = rng.integers(0, 5, n)
+    return np.column_stack([
+        rng.uniform(10_000, 5_000_000, n),
+        rng.integers(0, 900, n),
+        document_count,
+        document_count / 4,
+        rng.integers(0, len(prediction.dispute_encoder.classes_), n),
+        rng.integers(0, len(prediction.state_encoder.classes_), n),
+    ]).astype(np.float32)
+
+
+def test_agreement_threshold_reproduces_decisions():
+    proba = np.array([0.1, 0.2, 0.2, 0.4, 0.7, 0.9])
+    assert agreement_threshold(proba, proba >= 0.3) == 0.4
+    assert agreement_threshold(proba, np.zeros(6, dtype=bool)) > 0.9
+    with pytest.raises(ValueError):
+        parse_variant("prune-3")
+
+
+def test_variants_are_registered_and_selectable(tmp_path, monkeypatch):
+    bundle = prediction.get_active_bundle()
+    X = _matrix(4000, seed=0)
+    teacher = bundle.model.get_booster().inplace_predict(X)
+    y = (np.random.default_rng(1).uniform(size=len(X)) < teacher).astype(np.int32)
+
+    report, models = compress(bundle, ["trees-50", "distill-3"], X, y, rounds=30)
+    rows = report["variants"]
+    assert rows["source"]["agreement"] == 1.0
+    assert rows["trees-50"]["trees"] == 50 and rows["distill-3"]["max_depth"] == 3
+    assert rows["distill-3"]["agreement"] > 0.85
+    assert rows["distill-3"]["artifact_bytes"] < rows["source"]["artifact_bytes"]
+
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    versions = register_variants(registry, bundle, report, models, prefix="compact")
+    assert versions == ["compact-trees-50", "compact-distill-3"]
+    assert registry.read_manifest("compact-trees-50")["compression"]["source_fingerprint"] == bundle.fingerprint
+
+    monkeypatch.setattr(prediction, "model_registry", registry)
+    monkeypatch.setattr(prediction, "PINNED_MODEL_VERSION", "compact-distill-3")
+    try:
+        prediction.reload_model()
+        assert prediction.get_active_bundle().version == "compact-distill-3"
+        prediction.reload_model("compact-trees-50")  # replaces the pin, active.json untouched
+        assert prediction.active_model_info()["version"] == "compact-trees-50"
+        assert registry.active_version() is None
+    finally:
+        monkeypatch.undo()
+        prediction.reload_model()
@@ -0,0 +1,68 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.conversion_cache import DiskLRUCache, content_key
+
+
+def test_key_covers_bytes_and_options():
+    key = content_key(b"%PDF-1.7", use_ocr=True, max_pages=100)
+    assert key == content_key(b"%PDF-1.7", max_pages=100, use_ocr=True)
+    assert key != content_key(b"%PDF-1.7", use_ocr=False, max_pages=100)
+    assert key != content_key(b"%PDF-1.8", use_ocr=True, max_pages=100)
+
+
+def test_size_bounded_lru_eviction(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=250)
+    cache.set("a", b"x" * 100)
+    cache.set("b", b"y" * 100)
+    assert cache.get("a", source_bytes=5000) == b"x" * 100   # "a" becomes most recently used
+    cache.set("c", b"z" * 100)                                 # evicts "b"
+
+    assert cache.get("b") is None
+    assert not os.path.exists(tmp_path / "b.entry")
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["bytes"] == 200
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["evictions"] == 1
+    assert stats["hit_rate"] == 0.5 and stats["bytes_saved"] == 5000
+
+
+def test_restart_and_shared_directory(tmp_path):
+    first = DiskLRUCache(str(tmp_path), max_bytes=1000)
+    first.set("a", b"1" * 100)
+
+    second = DiskLRUCache(str(tmp_path), max_bytes=1000)  # e.g. another worker process
+    assert second.stats()["bytes"] == 100
+    second.set("b", b"2" * 100)
+    assert first.get("b") == b"2" * 100
+
+    second.clear()
+    assert first.get("a") is None
+    assert DiskLRUCache(str(tmp_path), max_bytes=0).get("a") is None
+
+
+def test_processes_share_one_budget_and_counters(tmp_path):
+    # Two instances stand in for two worker processes: neither keeps state of its own.
+    web = DiskLRUCache(str(tmp_path), max_bytes=250)
+    worker = DiskLRUCache(str(tmp_path), max_bytes=250)
+    web.set("a", b"1" * 100)
+    worker.set("b", b"2" * 100)
+    assert web.get("a", source_bytes=700) is not None   # "b" is now least recently used
+    worker.set("c", b"3" * 100)                          # evicts "b" although "web" never saw it
+
+    entries = sorted(p.name for p in tmp_path.glob("*.entry"))
+    assert entries == ["a.entry", "c.entry"]
+    stats = web.stats()
+    assert stats["bytes"] == 200 and stats["evictions"] == 1
+    assert worker.get("b") is None
+    assert web.stats()["misses"] == 1 and web.stats()["bytes_saved"] == 700
+
+
+def test_unindexed_files_are_adopted(tmp_path):
+    (tmp_path / "old.entry").write_bytes(b"x" * 300)  # written before the index existed
+    cache = DiskLRUCache(str(tmp_path), max_bytes=1000)
+    assert cache.stats()["bytes"] == 300
+    cache.set("new", b"y" * 800)
+    assert not (tmp_path / "old.entry").exists()
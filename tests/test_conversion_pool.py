@@ -0,0 +1,111 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+import threading
+
+from services.conversion_pool import ConversionPool
+
+
+def _fake_convert(name, seconds, output_format):
+    time.sleep(seconds)
+    if name == "broken.pdf":
+        raise ValueError("cannot parse")
+    return {"success": True, "content": f"{name}:{output_format}"}
+
+
+def _logged_convert(name, seconds, log_path):
+    """Logs each start; sleeps only on a file's first attempt, so a resubmitted file finishes at once."""
+    first_attempt = not os.path.exists(log_path) or name not in open(log_path).read().split()
+    with open(log_path, "a") as f:
+        f.write(name + "\n")
+    if name == "crash.pdf":
+        os._exit(1)  # the worker process dies, as on a segfault in a parser
+    if first_attempt:
+        time.sleep(seconds)
+    return {"success": True, "content": name}
+
+
+def test_timeout_resubmits_files_running_on_the_killed_pool(tmp_path):
+    log_path = str(tmp_path / "starts.log")
+    pool = ConversionPool(workers=2, timeout=2.5, task=_logged_convert, initializer=None)
+    # "late.pdf" starts at ~1s and is still running when "stuck.pdf" expires.
+    items = [("stuck.pdf", 30, log_path), ("early.pdf", 1.0, log_path), ("late.pdf", 30, log_path)]
+    try:
+        pool.map([("warm-1", 0, log_path), ("warm-2", 0, log_path)])  # workers spawned before timing starts
+        results = pool.map(items)
+    finally:
+        pool.shutdown()
+
+    assert "timed out" in results[0]["error"]
+    assert [r.get("content") for r in results[1:]] == ["early.pdf", "late.pdf"]
+    assert pool.restarts == 1
+    with open(log_path) as f:
+        assert f.read().split().count("late.pdf") == 2  # started again on the fresh pool
+
+
+def test_dead_worker_fails_its_file_and_pool_recovers(tmp_path):
+    log_path = str(tmp_path / "starts.log")
+    pool = ConversionPool(workers=1, timeout=30, task=_logged_convert, initializer=None)
+    try:
+        results = pool.map([("crash.pdf", 0, log_path), ("after.pdf", 0, log_path)])
+    finally:
+        pool.shutdown()
+
+    assert results == [{"success": False, "error": "Conversion worker died"},
+                       {"success": True, "content": "after.pdf"}]
+    assert pool.restarts == 1
+
+
+def test_results_in_input_order_with_timeouts():
+    pool = ConversionPool(workers=2, timeout=2, task=_fake_convert, initializer=None)
+    items = [("a.pdf", 0.5), ("stuck.pdf", 30), ("b.pdf", 0.0), ("broken.pdf", 0.0), ("c.pdf", 0.2)]
+    try:
+        start = time.monotonic()
+        results = pool.map(items, "markdown")
+        elapsed = time.monotonic() - start
+    finally:
+        pool.shutdown()
+
+    assert [r.get("content") for r in results] == ["a.pdf:markdown", None, "b.pdf:markdown", None, "c.pdf:markdown"]
+    assert "timed out" in results[1]["error"]
+    assert results[3] == {"success": False, "error": "cannot parse"}
+    assert pool.restarts == 1
+    assert elapsed < 15
+
+
+def test_imap_unordered_yields_as_files_finish():
+    pool = ConversionPool(workers=2, timeout=30, task=_fake_convert, initializer=None)
+    items = [("slow.pdf", 1.5), ("fast.pdf", 0.0), ("next.pdf", 0.0), ("last.pdf", 5)]
+    try:
+        stream = pool.imap_unordered(items, "json")
+        assert [next(stream)[0], next(stream)[0], next(stream)[0]] == [1, 2, 0]
+        stream.close()  # client went away: "last.pdf" is abandoned
+        assert pool.restarts == 1
+        assert pool.map(items[1:3], "json") == [
+            {"success": True, "content": "fast.pdf:json"}, {"success": True, "content": "next.pdf:json"},
+        ]
+    finally:
+        pool.shutdown()
+
+
+def test_paused_consumer_does_not_block_other_batches():
+    pool = ConversionPool(workers=2, timeout=30, task=_fake_convert, initializer=None)
+    try:
+        stream = pool.imap_unordered([("first.pdf", 0.0), ("second.pdf", 0.5)], "json")
+        assert next(stream)[0] == 0  # the consumer stops reading here, like a stalled client
+
+        results = []
+        other = threading.Thread(target=lambda: results.extend(pool.map([("other.pdf", 0.0)] * 3, "json")))
+        other.start()
+        other.join(timeout=20)
+        assert not other.is_alive()
+        assert [r["content"] for r in results] == ["other.pdf:json"] * 3
+
+        assert list(stream) == [(1, {"success": True, "content": "second.pdf:json"})]
+        assert pool.restarts == 0
+    finally:
+        pool.shutdown()
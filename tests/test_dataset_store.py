@@ -0,0 +1,60 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+from services.dataset_store import DatasetStore, load_cases_frame, write_store
+from services.train import _label_encode
+
+
+def _frame():
+    return pd.DataFrame({
+        "case_id": ["C1", "C2", "C3", "C4"],
+        "dispute_type": ["services", "goods", "services", "others"],
+        "claim_amount": [1000.5, 250.0, 75000.0, 12.25],
+        "delay_days": [30, 400, 90, 700],
+        "settlement_min_ratio": [0.5, None, 0.7, None],
+    })
+
+
+def test_store_round_trip_and_views(tmp_path):
+    df = _frame()
+    write_store(df, tmp_path, source="test")
+    store = DatasetStore(tmp_path)
+
+    assert len(store) == 4
+    assert store.columns["dispute_type"]["kind"] == "category"
+    assert store.columns["case_id"]["kind"] == "string"
+    assert store.column("delay_days").dtype == np.int16
+    assert isinstance(store.column("claim_amount"), np.memmap)
+
+    assert store.categories("dispute_type") == ["goods", "others", "services"]
+    assert store.code("dispute_type", "services") == 2
+    assert store.code("dispute_type", "unknown") == -1
+    assert store.where(dispute_type="services").tolist() == [0, 2]
+    assert store.where(dispute_type="services", delay_days=90).tolist() == [2]
+    assert store.rows(1, 3, ["delay_days"])["delay_days"].tolist() == [400, 90]
+    assert store.decode("case_id", store.take([3], ["case_id"])["case_id"]).tolist() == ["C4"]
+
+    loaded = load_cases_frame(path=str(tmp_path))
+    assert loaded["dispute_type"].astype(str).tolist() == df["dispute_type"].tolist()
+    assert loaded["case_id"].tolist() == df["case_id"].tolist()
+    assert np.allclose(loaded["claim_amount"], df["claim_amount"])
+    assert loaded["settlement_min_ratio"].isna().tolist() == [False, True, False, True]
+
+
+def test_store_codes_match_label_encoder(tmp_path):
+    df = _frame()
+    write_store(df, tmp_path)
+    categorical = DatasetStore(tmp_path).to_frame(["dispute_type"])["dispute_type"]
+
+    encoder, codes = _label_encode(categorical)
+    expected = LabelEncoder().fit(df["dispute_type"])
+    assert codes.tolist() == expected.transform(df["dispute_type"]).tolist()
+    assert list(encoder.classes_) == list(expected.classes_)
+    assert encoder.transform(["others"]).tolist() == [1]
@@ -0,0 +1,92 @@
+import sys
+import os
+import json
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pandas as pd
+
+from services.drift import DriftMonitor, build_reference
+
+
+def _reference():
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame({
+        "claim_amount": rng.uniform(1e5, 1e6, n),
+        "delay_days": rng.integers(0, 720, n),
+        "document_count": rng.integers(0, 5, n),
+        "dispute_type": rng.choice(["goods", "services"], n),
+        "jurisdiction": rng.choice(["Goa", "Delhi"], n),
+    })
+    return df, build_reference(df, rng.uniform(0, 1, n))
+
+
+def _log(path, cases, probability):
+    with open(path, "a") as f:
+        for case in cases:
+            f.write(json.dumps({"inputs": case, "prediction": {"probability": probability(case)}}) + "\n")
+
+
+def test_matching_traffic_is_stable_and_shift_is_flagged(tmp_path):
+    df, reference = _reference()
+    audit = tmp_path / "audit.jsonl"
+    monitor = DriftMonitor(reference, state_path=str(tmp_path / "state.json"), audit_path=str(audit))
+
+    cases = df.head(500).to_dict("records")
+    _log(audit, cases, lambda c: (c["delay_days"] % 100) / 100)
+    assert monitor.update() == 500
+    report = monitor.report()
+    assert report["observations"] == 500
+    assert report["fields"]["claim_amount"]["status"] == "ok"
+    assert report["fields"]["dispute_type"]["ks"] is None
+
+    shifted = [{**c, "claim_amount": c["claim_amount"] * 10, "jurisdiction": "Kerala"} for c in cases]
+    _log(audit, shifted, lambda c: 0.99)
+    assert monitor.update() == 500
+    report = monitor.report()
+    assert report["status"] == "alert"
+    assert report["fields"]["claim_amount"]["psi"] > 0.25
+    assert report["fields"]["jurisdiction"]["live"][-1] == 0.5  # __other__ bin
+    assert report["fields"]["probability"]["ks"] > 0.3
+
+
+def test_state_resumes_from_audit_offset(tmp_path):
+    df, reference = _reference()
+    audit = tmp_path / "audit.jsonl"
+    state = str(tmp_path / "state.json")
+    cases = df.head(300).to_dict("records")
+    _log(audit, cases[:200], lambda c: 0.5)
+
+    first = DriftMonitor(reference, state_path=state, audit_path=str(audit))
+    first.update()
+    _log(audit, cases[200:], lambda c: 0.5)
+    with open(audit, "a") as f:
+        f.write('{"inputs": {"claim_amount"')  # entry still being written
+
+    restarted = DriftMonitor(reference, state_path=state, audit_path=str(audit))
+    assert restarted.observations == 200
+    assert restarted.update() == 100
+    assert restarted.report()["observations"] == 300
+    fresh = DriftMonitor(reference, state_path=str(tmp_path / "fresh.json"), audit_path=str(audit))
+    fresh.update()
+    assert restarted.counts == fresh.counts
+
+    restarted.reset()
+    assert DriftMonitor(reference, state_path=state, audit_path=str(audit)).observations == 0
+
+
+def test_maybe_update_runs_in_the_background(tmp_path):
+    df, reference = _reference()
+    audit = tmp_path / "audit.jsonl"
+    monitor = DriftMonitor(reference, state_path=str(tmp_path / "state.json"), audit_path=str(audit))
+    _log(audit, df.head(100).to_dict("records"), lambda c: 0.5)
+
+    with monitor._lock:  # an update in progress: the caller must not wait for it
+        assert monitor.maybe_update(0) is None
+    thread = monitor.maybe_update(0)
+    assert monitor.maybe_update(3600) is None  # this interval is already taken
+    thread.join(timeout=10)
+    assert monitor.observations == 100
@@ -0,0 +1,36 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import multiprocessing
+
+import pytest
+
+pytest.importorskip("docling")
+pytest.importorskip("openai")
+
+
+def _import_app(queue):
+    # Runs in a spawned process, like a conversion worker re-importing the main module.
+    import flask_app
+
+    queue.put({
+        "pool_started": flask_app.conversion_pool._executor is not None,
+        "job_store_opened": flask_app._job_store is not None,
+        "children": len(multiprocessing.active_children()),
+    })
+
+
+def test_importing_app_in_spawned_child_starts_nothing():
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    child = context.Process(target=_import_app, args=(queue,))
+    child.start()
+    try:
+        state = queue.get(timeout=300)
+    finally:
+        child.join(timeout=60)
+    assert child.exitcode == 0
+    assert state == {"pool_started": False, "job_store_opened": False, "children": 0}
@@ -0,0 +1,83 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.jobs import JobStore, process_next
+
+
+def _fake_convert(file_bytes, filename, use_ocr, output_format, progress):
+    if file_bytes == b"broken":
+        raise ValueError("cannot parse")
+    progress(0, 3)
+    for page in range(1, 4):
+        progress(page, 3)
+    return f"# {filename} ({len(file_bytes)} bytes)", "text/markdown", "md"
+
+
+def test_submit_process_and_fetch(tmp_path):
+    store = JobStore(str(tmp_path))
+    job = store.submit(b"%PDF-1.7 ...", "invoice.pdf", use_ocr=False)
+    assert job["status"] == "queued" and job["progress"] == {"pages_done": 0, "pages_total": None}
+    assert store.result(job["id"]) is None
+
+    # Queue and files are on disk: a restarted process picks the job up.
+    restarted = JobStore(str(tmp_path))
+    assert process_next(restarted, worker="w1", convert=_fake_convert)
+    assert not process_next(restarted, worker="w1", convert=_fake_convert)
+
+    done = store.get(job["id"])
+    assert done["status"] == "done" and done["attempts"] == 1
+    assert done["progress"] == {"pages_done": 3, "pages_total": 3}
+    path, mimetype, name = store.result(job["id"])
+    assert (mimetype, name) == ("text/markdown", "invoice.md")
+    with open(path) as f:
+        assert f.read() == "# invoice.pdf (12 bytes)"
+
+    failed = store.submit(b"broken", "scan.png")
+    process_next(store, worker="w1", convert=_fake_convert)
+    assert store.get(failed["id"])["status"] == "failed"
+    assert store.get(failed["id"])["error"] == "cannot parse"
+    assert store.counts() == {"queued": 0, "running": 0, "done": 1, "failed": 1}
+
+
+def test_expired_lease_requeues_then_gives_up(tmp_path):
+    store = JobStore(str(tmp_path))
+    job = store.submit(b"data", "a.pdf")
+
+    assert store.claim("crashed")["id"] == job["id"]
+    assert store.requeue_stale(lease=3600, max_attempts=2) == []
+    assert store.requeue_stale(lease=-1, max_attempts=2) == [(job["id"], "crashed")]
+    assert store.get(job["id"])["status"] == "queued"
+
+    store.claim("hung")
+    store.requeue_stale(lease=-1, max_attempts=2)
+    assert store.get(job["id"])["status"] == "failed"
+    # The worker that lost its claim cannot overwrite the outcome.
+    assert not store.finish(job["id"], "hung", "result.md", "text/markdown")
+
+    assert store.purge(retention=-1) == 1
+    assert store.get(job["id"]) is None and not os.path.exists(store.job_dir(job["id"]))
+
+
+def test_worker_abandons_job_after_losing_its_lease(tmp_path):
+    store = JobStore(str(tmp_path))
+    job = store.submit(b"%PDF-1.7 ...", "long.pdf")
+    pages_converted = []
+
+    def slow_convert(file_bytes, filename, use_ocr, output_format, progress):
+        progress(0, 40)
+        for page in range(1, 41):
+            if page == 11:
+                store.requeue_stale(lease=-1, max_attempts=3)  # supervisor: lease expired
+            progress(page, 40)
+            pages_converted.append(page)
+        return "never written", "text/markdown", "md"
+
+    assert process_next(store, worker="slow", convert=slow_convert)
+    assert pages_converted == list(range(1, 11))
+    requeued = store.get(job["id"])
+    assert requeued["status"] == "queued"
+    assert requeued["progress"] == {"pages_done": 0, "pages_total": None}
+    assert not os.path.exists(os.path.join(store.job_dir(job["id"]), "result.md"))
@@ -0,0 +1,58 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from services.latency import LatencyHistogram, StageTimer, LatencyRegistry
+from services.prediction import run_xgb_prediction, prediction_cache, latency_stats
+
+pytestmark = pytest.mark.usefixtures("private_audit_log")
+
+
+def test_histogram_percentiles_are_bucket_accurate():
+    histogram = LatencyHistogram()
+    for ms in range(1, 1001):        # 1..1000 ms, uniform
+        histogram.observe(float(ms))
+
+    summary = histogram.summary()
+    assert summary["count"] == 1000
+    assert summary["max_ms"] == 1000.0
+    assert summary["p50_ms"] == pytest.approx(500, rel=0.2)
+    assert summary["p95_ms"] == pytest.approx(950, rel=0.2)
+    assert summary["p99_ms"] == pytest.approx(990, rel=0.2)
+    assert summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"] <= summary["max_ms"]
+
+
+def test_stage_timer_feeds_registry():
+    registry = LatencyRegistry()
+    timer = StageTimer(registry)
+    with timer.stage("encode"):
+        pass
+    timer.finish()
+
+    stats = registry.snapshot()
+    assert set(stats) == {"encode", "total"}
+    assert stats["encode"]["count"] == 1
+    assert set(timer.timings) == {"encode", "total"}
+
+
+def test_prediction_reports_stage_timings():
+    prediction_cache.clear()
+    before = latency_stats().get("pred_contribs", {}).get("count", 0)
+
+    result = run_xgb_prediction(321000, 90, 2, "others", "Goa", debug_timings=True)
+    timings = result["timings_ms"]
+    assert timings["cache_hit"] is False
+    for stage in ("encode", "pred_contribs", "deep_analysis", "negotiation_strategy",
+                  "legal_argumentation", "audit_write", "total"):
+        assert timings[stage] >= 0
+
+    cached = run_xgb_prediction(321000, 90, 2, "others", "Goa", debug_timings=True)
+    assert cached["timings_ms"]["cache_hit"] is True
+    assert "pred_contribs" not in cached["timings_ms"]
+
+    assert "timings_ms" not in run_xgb_prediction(321000, 90, 2, "others", "Goa")
+    assert latency_stats()["pred_contribs"]["count"] == before + 1
@@ -0,0 +1,91 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from services import prediction
+from services.model_registry import ModelRegistry, FEATURES
+
+CASE = {"claim_amount": 500000, "delay_days": 150, "document_count": 3,
+        "dispute_type": "invoice_non_payment", "jurisdiction": "Maharashtra"}
+
+
+def _register(registry, version, threshold, activate=False):
+    return registry.register(
+        version, prediction.MODEL_PATH, prediction.DISPUTE_ENC_PATH, prediction.STATE_ENC_PATH,
+        threshold=threshold, features=FEATURES, activate=activate,
+    )
+
+
+@pytest.fixture
+def temp_registry(tmp_path, monkeypatch):
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    monkeypatch.setattr(prediction, "model_registry", registry)
+    yield registry
+    monkeypatch.undo()
+    prediction.reload_model()
+
+
+def test_manifest_records_hashes_and_classes(temp_registry):
+    manifest = _register(temp_registry, "v1", threshold=0.55)
+
+    assert manifest["features"] == FEATURES
+    assert manifest["threshold"] == 0.55
+    assert manifest["dispute_types"] == prediction.dispute_types
+    assert len(manifest["artifacts"]["model"]["sha256"]) == 64
+    assert temp_registry.active_version() is None
+
+
+def test_hot_swap_keeps_in_flight_bundle(temp_registry):
+    _register(temp_registry, "v1", threshold=0.55)
+    _register(temp_registry, "v2", threshold=0.99)
+
+    prediction.reload_model("v1")
+    in_flight = prediction.get_active_bundle()
+    assert prediction.run_xgb_prediction_batch([CASE])[0]["model_version"] == "v1"
+
+    prediction.reload_model("v2")
+    result = prediction.run_xgb_prediction_batch([CASE])[0]
+    assert result["model_version"] == "v2"
+    assert result["threshold"] == 0.99
+    assert prediction.MODEL_VERSION == "v2"
+
+    # A request that grabbed the old bundle still scores on it.
+    assert in_flight.version == "v1" and in_flight.threshold == 0.55
+    probability, _ = prediction._score_row([500000, 150, 3, 0.75, 2, 10], bundle=in_flight)
+    assert 0.0 < probability < 1.0
+
+
+def test_active_pointer_change_is_picked_up(temp_registry, monkeypatch):
+    _register(temp_registry, "v1", threshold=0.55, activate=True)
+    _register(temp_registry, "v2", threshold=0.6)
+    prediction.reload_model()
+    monkeypatch.setattr(prediction, "MODEL_RELOAD_CHECK_SECONDS", 0)
+
+    temp_registry.activate("v2")
+    assert prediction.get_active_bundle().version == "v2"
+
+
+def test_hash_mismatch_is_rejected(temp_registry):
+    _register(temp_registry, "v1", threshold=0.55)
+    with open(os.path.join(temp_registry.version_dir("v1"), "state_encoder.pkl"), "ab") as f:
+        f.write(b"tampered")
+
+    with pytest.raises(ValueError):
+        temp_registry.load("v1")
+
+
+def test_corrupt_version_is_never_activated(temp_registry):
+    _register(temp_registry, "v1", threshold=0.55, activate=True)
+    _register(temp_registry, "v2", threshold=0.6)
+    prediction.reload_model()
+    with open(os.path.join(temp_registry.version_dir("v2"), "xgb_model.pkl"), "ab") as f:
+        f.write(b"corrupt")
+
+    with pytest.raises(ValueError):
+        prediction.reload_model("v2")
+    assert temp_registry.active_version() == "v1"  # other processes keep loading v1
+    assert prediction.MODEL_VERSION == "v1"
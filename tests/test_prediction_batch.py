@@ -0,0 +1,60 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pandas as pd
+
+from services import prediction
+from services.prediction import run_xgb_prediction_batch, FEATURES
+
+
+def test_batch_matches_single_row_scoring():
+    cases = [
+        {"claim_amount": 500000, "delay_days": 150, "document_count": 3,
+         "dispute_type": "invoice_non_payment", "jurisdiction": "Maharashtra"},
+        {"claim_amount": 2500000, "delay_days": 600, "document_count": 1,
+         "dispute_type": "goods_rejection", "jurisdiction": "Delhi"},
+        {"claim_amount": 75000, "delay_days": 20, "document_count": 4,
+         "dispute_type": "others", "jurisdiction": "Kerala"},
+        {"claim_amount": 90000, "delay_days": 45},
+    ]
+
+    results = run_xgb_prediction_batch(cases)
+
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert results[0]["success"] and results[1]["success"]
+    assert not results[2]["success"] and "jurisdiction" in results[2]["error"]
+    assert not results[3]["success"] and "Missing field" in results[3]["error"]
+
+    for case, result in zip(cases[:2], results[:2]):
+        row = pd.DataFrame([{
+            "claim_amount": case["claim_amount"],
+            "delay_days": case["delay_days"],
+            "document_count": case["document_count"],
+            "document_completeness_score": case["document_count"] / 4,
+            "dispute_type_enc": int(prediction.dispute_encoder.transform([case["dispute_type"]])[0]),
+            "jurisdiction_enc": int(prediction.state_encoder.transform([case["jurisdiction"]])[0]),
+        }], columns=FEATURES)
+        expected = float(prediction.xgb_model.predict_proba(row)[0][1])
+        assert result["probability"] == round(expected * 100, 2)
+        assert abs(sum(result["feature_contribution"].values())) > 0
+
+
+def test_empty_batch():
+    assert run_xgb_prediction_batch([]) == []
+
+
+def test_batch_contribution_modes():
+    case = {"claim_amount": 500000, "delay_days": 150, "document_count": 3,
+            "dispute_type": "invoice_non_payment", "jurisdiction": "Maharashtra"}
+
+    exact = run_xgb_prediction_batch([case])[0]
+    approx = run_xgb_prediction_batch([case], contributions="approx")[0]
+    bare = run_xgb_prediction_batch([case], contributions="none")[0]
+
+    assert exact["probability"] == approx["probability"] == bare["probability"]
+    assert abs(sum(exact["feature_contribution"].values())
+               - sum(approx["feature_contribution"].values())) < 1e-4
+    assert "feature_contribution" not in bare
@@ -0,0 +1,70 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+
+from services.cache import TTLCache
+from services.prediction import run_xgb_prediction, prediction_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_ttl_expiry():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1          # "a" becomes most recently used
+    cache.set("c", 3)                   # evicts "b"
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    clock.now = 11
+    assert cache.get("a") is None       # expired
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["expirations"] == 1
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+
+
+def test_cache_hit_still_writes_audit_entry(private_audit_log):
+    prediction_cache.clear()
+    args = (640000, 210, 3, "invoice_non_payment", "Karnataka")
+
+    first = run_xgb_prediction(*args)
+    hits_before = prediction_cache.hits
+    second = run_xgb_prediction(*args)
+
+    assert prediction_cache.hits == hits_before + 1
+    assert first["probability"] == second["probability"]
+    assert first["deep_analysis"] == second["deep_analysis"]
+    assert first["case_id"] and second["case_id"]
+    assert first["case_id"] != second["case_id"]
+
+    with open(private_audit_log) as f:
+        last_entry = json.loads(f.readlines()[-1])
+    assert last_entry["case_id"] == second["case_id"]
+
+
+def test_fractional_inputs_are_not_truncated_into_one_key(private_audit_log):
+    prediction_cache.clear()
+    hits_before = prediction_cache.hits
+    run_xgb_prediction(4500000.0, 150.9, 3, "invoice_non_payment", "Karnataka")
+    whole = run_xgb_prediction(4500000.0, 150, 3, "invoice_non_payment", "Karnataka")
+    assert prediction_cache.hits == hits_before
+
+    again = run_xgb_prediction(4500000.0, 150.0, 3, "invoice_non_payment", "Karnataka")
+    assert prediction_cache.hits == hits_before + 1
+    assert again["probability"] == whole["probability"]
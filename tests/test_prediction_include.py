@@ -0,0 +1,52 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from services.prediction import run_xgb_prediction, parse_include, PREDICTION_SECTIONS
+
+pytestmark = pytest.mark.usefixtures("private_audit_log")
+
+CASE = (730000, 180, 3, "goods_rejection", "Maharashtra")
+DEFAULT_KEYS = {
+    "success", "probability", "prediction", "threshold", "priority", "priority_class",
+    "settle_min", "settle_max", "settlement_basis", "delay_days", "document_score", "claim_amount",
+    "feature_contribution", "model_version", "category_encoding", "deep_analysis", "case_id", "negotiation_strategy",
+    "legal_argumentation", "demonstrates_statutory_compliance", "explainability_level",
+}
+
+
+def test_default_response_shape_is_unchanged():
+    assert set(run_xgb_prediction(*CASE)) == DEFAULT_KEYS
+    assert set(run_xgb_prediction(*CASE, include="all")) == DEFAULT_KEYS
+
+
+def test_sections_are_only_computed_when_requested():
+    full = run_xgb_prediction(*CASE)
+    lite = run_xgb_prediction(*CASE, include=(), debug_timings=True)
+
+    assert set(lite) == DEFAULT_KEYS - set(PREDICTION_SECTIONS) | {"timings_ms"}
+    assert "pred_contribs" not in lite["timings_ms"]
+    assert "deep_analysis" not in lite["timings_ms"]
+    assert lite["probability"] == pytest.approx(full["probability"], abs=0.01)
+    assert lite["prediction"] == full["prediction"]
+    assert lite["settle_min"] == full["settle_min"]
+
+    analysis_only = run_xgb_prediction(*CASE, include="deep_analysis", debug_timings=True)
+    assert "feature_contribution" not in analysis_only
+    assert analysis_only["deep_analysis"] == full["deep_analysis"]
+    assert "pred_contribs" in analysis_only["timings_ms"]
+    assert "legal_argumentation" not in analysis_only["timings_ms"]
+
+
+def test_parse_include():
+    assert parse_include(None) == PREDICTION_SECTIONS
+    assert parse_include("none") == ()
+    assert parse_include("legal_argumentation, feature_contribution") == (
+        "feature_contribution", "legal_argumentation"
+    )
+    with pytest.raises(ValueError, match="shap"):
+        parse_include(["shap"])
@@ -0,0 +1,58 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from services.prediction import sensitivity_surface, run_xgb_prediction
+
+pytestmark = pytest.mark.usefixtures("private_audit_log")
+
+BASE_CASE = {
+    "claim_amount": 800000,
+    "delay_days": 120,
+    "document_count": 2,
+    "dispute_type": "invoice_non_payment",
+    "jurisdiction": "Maharashtra",
+}
+
+
+def test_surface_points_match_single_predictions():
+    surface = sensitivity_surface(BASE_CASE, {
+        "delay_days": {"start": 30, "stop": 180, "step": 75},
+        "document_count": [0, 4],
+    })
+
+    assert surface["axes"] == {"delay_days": [30, 105, 180], "document_count": [0, 4]}
+    assert surface["shape"] == [3, 2]
+    assert surface["base_probability"] == run_xgb_prediction(**BASE_CASE)["probability"]
+
+    for i, delay in enumerate(surface["axes"]["delay_days"]):
+        for j, docs in enumerate(surface["axes"]["document_count"]):
+            single = run_xgb_prediction(**{**BASE_CASE, "delay_days": delay, "document_count": docs})
+            assert surface["probabilities"][i][j] == pytest.approx(single["probability"], abs=0.01)
+
+
+def test_surface_rejects_oversized_and_invalid_grids():
+    with pytest.raises(ValueError, match="max 100"):
+        sensitivity_surface(BASE_CASE, {"claim_amount": {"start": 0, "stop": 1000000, "step": 1000}},
+                            max_points=100)
+    with pytest.raises(ValueError, match="Unsupported"):
+        sensitivity_surface(BASE_CASE, {"jurisdiction": ["Goa"]})
+    with pytest.raises(ValueError, match="dispute_type"):
+        sensitivity_surface({**BASE_CASE, "dispute_type": "unknown"}, {"delay_days": [10]})
+    with pytest.raises(ValueError, match="finite"):
+        sensitivity_surface(BASE_CASE, {"delay_days": [10, float("inf")]})
+    with pytest.raises(ValueError, match="finite"):
+        sensitivity_surface(BASE_CASE, {"document_count": [float("nan")]})
+    with pytest.raises(ValueError, match="finite"):
+        sensitivity_surface(BASE_CASE, {"delay_days": {"start": 0, "stop": float("inf"), "step": 10}})
+
+
+def test_listed_axis_keeps_request_order():
+    surface = sensitivity_surface(BASE_CASE, {"delay_days": [180, 30, 180, 90]})
+    assert surface["axes"] == {"delay_days": [180, 30, 90]}
+    single = run_xgb_prediction(**{**BASE_CASE, "delay_days": 30})
+    assert surface["probabilities"][1] == pytest.approx(single["probability"], abs=0.01)
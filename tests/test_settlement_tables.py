@@ -0,0 +1,56 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pandas as pd
+import pytest
+
+from services.settlement_tables import SettlementTables, build_tables
+from services.prediction import run_xgb_prediction, settlement_tables
+
+pytestmark = pytest.mark.usefixtures("private_audit_log")
+
+
+def _cases(n, dispute_type, jurisdiction, delay_days, document_count, min_ratio, max_ratio):
+    return [{
+        "dispute_type": dispute_type,
+        "jurisdiction": jurisdiction,
+        "delay_days": delay_days,
+        "document_count": document_count,
+        "is_settlement": 1,
+        "settlement_min_ratio": min_ratio,
+        "settlement_max_ratio": max_ratio,
+    }] * n
+
+
+def test_sparse_cells_fall_back_to_coarser_segments():
+    df = pd.DataFrame(
+        _cases(40, "others", "Goa", 100, 2, 0.80, 0.90)
+        + _cases(5, "others", "Kerala", 100, 2, 0.66, 0.70)
+        + [{**c, "is_settlement": 0} for c in _cases(50, "others", "Goa", 100, 2, None, None)]
+    )
+    tables = SettlementTables(build_tables(df, min_cases=30))
+
+    goa = tables.lookup("others", "Goa", 120, 2)
+    assert goa["level"] == "segment"
+    assert goa["cases"] == 40
+    assert (goa["min_p50"], goa["max_p50"]) == (0.80, 0.90)
+
+    # Only 5 Kerala cases: served by the dispute x delay x documents segment
+    kerala = tables.lookup("others", "Kerala", 120, 2)
+    assert kerala["level"] == "dispute_delay_documents"
+    assert kerala["cases"] == 45
+
+    assert tables.lookup("goods_rejection", "Delhi", 700, 0)["level"] == "global"
+
+
+def test_prediction_settlement_range_comes_from_tables():
+    assert settlement_tables is not None
+    result = run_xgb_prediction(1000000, 200, 3, "invoice_non_payment", "Maharashtra")
+
+    stats = settlement_tables.lookup("invoice_non_payment", "Maharashtra", 200, 3)
+    assert result["settlement_basis"] == {"level": stats["level"], "cases": stats["cases"]}
+    assert result["settle_min"] == f"{int(1000000 * stats['min_p50']):,}"
+    assert result["settle_max"] == f"{int(1000000 * stats['max_p50']):,}"
@@ -0,0 +1,91 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import prediction
+from services.dataset_store import DatasetStore, write_store
+from services.similar_cases import SimilarCaseIndex, build_index
+
+pytestmark = pytest.mark.usefixtures("private_audit_log")
+
+
+def _cases(n=600, seed=1):
+    rng = np.random.default_rng(seed)
+    outcome = rng.choice(["settlement", "rejected", "pending"], n)
+    settled = outcome == "settlement"
+    return pd.DataFrame({
+        "case_id": [f"T{i}" for i in range(n)],
+        "dispute_type": rng.choice(["others", "goods_rejection"], n),
+        "jurisdiction": rng.choice(["Goa", "Delhi"], n),
+        "claim_amount": rng.uniform(50_000, 5_000_000, n).round(2),
+        "delay_days": rng.integers(30, 800, n),
+        "document_count": rng.integers(0, 5, n),
+        "final_outcome": outcome,
+        "settlement_min_ratio": np.where(settled, rng.uniform(0.65, 0.85, n), np.nan),
+        "settlement_max_ratio": np.where(settled, rng.uniform(0.85, 0.95, n), np.nan),
+    })
+
+
+@pytest.fixture
+def index(tmp_path):
+    df = _cases()
+    write_store(df, str(tmp_path / "store"))
+    build_index(DatasetStore(str(tmp_path / "store")), str(tmp_path / "index"))
+    return df, SimilarCaseIndex(str(tmp_path / "index"))
+
+
+def test_query_matches_brute_force(index):
+    df, idx = index
+    query = dict(claim_amount=800_000, delay_days=200, document_count=2)
+
+    result = idx.query(**query, dispute_type="others", jurisdiction="Goa", k=7)
+
+    part = df[(df.dispute_type == "others") & (df.jurisdiction == "Goa")]
+    distance = np.sqrt(
+        ((np.log1p(part.claim_amount) - np.log1p(800_000)) / 0.5) ** 2
+        + ((part.delay_days - 200) / 90.0) ** 2
+        + (part.document_count - 2) ** 2
+    )
+    expected = part.assign(distance=distance).nsmallest(7, "distance")
+
+    assert result["partition_size"] == len(part)
+    assert [n["case_id"] for n in result["neighbours"]] == expected.case_id.tolist()
+    settled = expected[expected.final_outcome == "settlement"]
+    assert result["stats"]["settlement_rate"] == pytest.approx(len(settled) / 7, abs=1e-4)
+    assert sum(result["stats"]["outcome_counts"].values()) == 7
+
+    with pytest.raises(ValueError):
+        idx.query(**query, dispute_type="others", jurisdiction="Atlantis")
+
+
+def test_prediction_attaches_similar_cases_on_request(index, monkeypatch):
+    _, idx = index
+    monkeypatch.setattr(prediction, "similar_case_index", idx)
+    prediction.prediction_cache.clear()
+
+    result = prediction.run_xgb_prediction(800_000, 200, 2, "others", "Goa", include="all,similar_cases")
+    assert len(result["similar_cases"]["neighbours"]) == prediction.SIMILAR_CASES_IN_PREDICTION
+    assert "deep_analysis" in result
+
+    assert "similar_cases" not in prediction.run_xgb_prediction(800_000, 200, 2, "others", "Goa")
+
+
+def test_similar_cases_degrade_without_failing_the_prediction(index, monkeypatch):
+    _, idx = index
+    monkeypatch.setattr(prediction, "similar_case_index", idx)
+    prediction.prediction_cache.clear()
+    unindexed = prediction.run_xgb_prediction(800_000, 200, 2, "others", "Atlantis", include="similar_cases",
+                                              unknown_policy="reserved")
+    assert unindexed["similar_cases"] is None and "Atlantis" in unindexed["similar_cases_message"]
+    assert "probability" in unindexed
+
+    monkeypatch.setattr(prediction, "similar_case_index", None)
+    missing = prediction.run_xgb_prediction(800_000, 200, 2, "others", "Goa", include="similar_cases")
+    assert missing["similar_cases"] is None
+    assert missing["similar_cases_message"] == "Comparable-case index is not available"
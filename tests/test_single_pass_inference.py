@@ -0,0 +1,43 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from services import prediction
+from services.prediction import _score_row, OPTIMAL_THRESHOLD
+
+
+def _synthetic_rows(n=500, seed=7):
+    rng = np.random.default_rng(seed)
+    document_count = rng.integers(0, 5, n)
+    return np.column_stack([
+        rng.uniform(10_000, 5_000_000, n).round(2),
+        rng.integers(0, 900, n),
+        document_count,
+        document_count / 4,
+        rng.integers(0, len(prediction.dispute_encoder.classes_), n),
+        rng.integers(0, len(prediction.state_encoder.classes_), n),
+    ]).tolist()
+
+
+def test_single_pass_matches_two_pass_probabilities():
+    for row in _synthetic_rows():
+        p_single, c_single = _score_row(row, "single_pass")
+        p_double, c_double = _score_row(row, "two_pass")
+
+        # Contributions sum to the margin, so sigmoid(sum) is predict_proba
+        # up to float32 accumulation order.
+        assert abs(p_single - p_double) < 1e-5
+        assert (p_single >= OPTIMAL_THRESHOLD) == (p_double >= OPTIMAL_THRESHOLD)
+        assert np.allclose(c_single, c_double, atol=1e-6)
+
+
+def test_unknown_inference_mode_rejected():
+    try:
+        _score_row(_synthetic_rows(1)[0], "three_pass")
+    except ValueError:
+        return
+    raise AssertionError("expected ValueError")
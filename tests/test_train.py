@@ -0,0 +1,36 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+
+from services import train
+from services.model_registry import ModelRegistry
+
+
+def test_train_registers_version_with_metrics(tmp_path):
+    root = str(tmp_path / "registry")
+    version = train.main([
+        "--sample", "4000", "--folds", "2", "--workers", "2", "--max-rounds", "40",
+        "--early-stopping", "5", "--version", "test-v1", "--registry", root, "--activate",
+    ])
+
+    registry = ModelRegistry(root)
+    assert version == "test-v1"
+    assert registry.active_version() == "test-v1"
+
+    manifest = registry.read_manifest("test-v1")
+    assert manifest["training"]["params"]["tree_method"] == "hist"
+    assert 0.0 < manifest["threshold"] < 1.0
+
+    with open(os.path.join(registry.version_dir("test-v1"), "metrics.json")) as f:
+        metrics = json.load(f)
+    assert len(metrics["folds"]) == 2
+    assert metrics["cv_out_of_fold"]["auc"] > 0.5
+    assert set(metrics["stages"]) == {"load_data", "encode", "cross_validate", "fit_final", "register"}
+    assert {"rss_delta_mb", "process_peak_rss_mb"} <= set(metrics["stages"]["fit_final"])
+
+    bundle = registry.load("test-v1")
+    assert bundle.model.n_estimators == metrics["n_estimators"]
@@ -0,0 +1,54 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import xgboost as xgb
+
+from services import prediction
+from services.tree_evaluator import CompiledForest
+
+
+def _synthetic_matrix(n=2000, seed=11):
+    rng = np.random.default_rng(seed)
+    document_count = rng.integers(0, 5, n)
+    X = np.column_stack([
+        rng.uniform(10_000, 5_000_000, n),
+        rng.integers(0, 900, n),
+        document_count,
+        document_count / 4,
+        rng.integers(0, len(prediction.dispute_encoder.classes_), n),
+        rng.integers(0, len(prediction.state_encoder.classes_), n),
+    ]).astype(np.float32)
+    X[::37, 1] = np.nan  # exercise default (missing-value) branches
+    return X
+
+
+def test_compiled_forest_matches_booster():
+    booster = prediction.xgb_model.get_booster()
+    forest = CompiledForest.from_booster(booster)
+    X = _synthetic_matrix()
+    dmat = xgb.DMatrix(X, feature_names=prediction.FEATURES)
+
+    native_margin = booster.predict(dmat, output_margin=True)
+    native_contribs = booster.predict(dmat, pred_contribs=True, approx_contribs=True)
+    margin, contribs = forest.predict_margin(X, return_contribs=True)
+
+    assert np.abs(margin - native_margin).max() < 1e-4
+    assert np.abs(contribs - native_contribs).max() < 1e-4
+    assert np.allclose(contribs.sum(axis=1), margin, atol=1e-6)
+    assert np.allclose(forest.predict_proba(X), booster.predict(dmat), atol=1e-5)
+
+
+def test_export_roundtrip(tmp_path):
+    forest = CompiledForest.from_booster(prediction.xgb_model.get_booster(), source_version="abc")
+    path = tmp_path / "forest.npz"
+    forest.save(path)
+    loaded = CompiledForest.load(path)
+
+    X = _synthetic_matrix(200)
+    assert loaded.source_version == "abc"
+    assert loaded.feature_names == prediction.FEATURES
+    assert np.array_equal(loaded.predict_margin(X), forest.predict_margin(X))
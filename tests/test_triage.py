@@ -0,0 +1,58 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import csv
+
+import numpy as np
+
+from services import prediction
+from services.bulk_score import score_file
+from services.triage import TriageScorer, evaluate
+
+
+def _matrix(n, seed):
+    rng = np.random.default_rng(seed)
+    document_count = rng.integers(0, 5, n)
+    return np.column_stack([
+        rng.uniform(10_000, 5_000_000, n),
+        rng.integers(0, 900, n),
+        document_count,
+        document_count / 4,
+        rng.integers(0, len(prediction.dispute_encoder.classes_), n),
+        rng.integers(0, len(prediction.state_encoder.classes_), n),
+    ]).astype(np.float32)
+
+
+def test_triage_agrees_with_full_scoring():
+    bundle = prediction.get_active_bundle()
+    booster = bundle.model.get_booster()
+    scorer = TriageScorer.calibrate(booster, _matrix(5000, seed=0), bundle.threshold)
+    X = _matrix(5000, seed=1)
+
+    result = scorer.score(X)
+    full = booster.inplace_predict(X, predict_type="margin")
+    assert (result["trees"] < scorer.n_trees).mean() > 0.5
+    ran_full = result["trees"] == scorer.n_trees
+    assert np.allclose(result["margin"][ran_full], full[ran_full], atol=1e-4)
+    assert evaluate(scorer, X, repeat=1)["agreement"] >= 0.999
+
+    uncalibrated = TriageScorer(booster, bundle.threshold, bands=[])
+    assert (uncalibrated.score(X)["decision"] == (full >= uncalibrated.threshold_margin)).all()
+
+
+def test_bulk_triage_output(tmp_path):
+    input_path, output_path = tmp_path / "cases.csv", tmp_path / "scores.csv"
+    with open(input_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["case_id", "claim_amount", "delay_days", "document_count", "dispute_type", "jurisdiction"])
+        for i in range(20):
+            writer.writerow([f"C{i}", 100000 + 90000 * i, 20 * i, i % 5, "short_payment", "Goa"])
+
+    summary = score_file(str(input_path), str(output_path), chunk_size=8, progress=False, triage=True)
+    assert summary["triage"] and summary["rows"] == 20
+    with open(output_path) as f:
+        rows = list(csv.DictReader(f))
+    assert all(int(r["trees_used"]) > 0 and r["prediction"] in ("0", "1") and not r["top_feature"] for r in rows)